@@ -0,0 +1,214 @@
+"""
+Offline agent loop benchmarks.
+
+Starts the OpenAI-compatible stub (stub_openai.py) and a stub FastMCP server
+(stub_mcp.py), then drives Agent.agent_loop for fixed scenarios, several loop
+cycles each, with no network access. Reports per scenario:
+  - iterations/sec
+  - per-iteration overhead: CPU time of the agent process per iteration. The
+    stubs run in their own processes, so this is what the agent itself costs
+  - model request and MCP tool call wall time per iteration (telemetry spans)
+  - peak RSS and RSS growth from the first to the last loop cycle
+
+  python benchmarks/agent_loop.py                      # run all scenarios
+  python benchmarks/agent_loop.py --save               # also write results.json
+  python benchmarks/agent_loop.py --compare results.json --tolerance 0.2
+                                                       # exit 1 on regressions
+
+Results are machine dependent: compare against a baseline recorded on the same machine.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from otto.config import load_config
+from otto.agent import Agent
+from otto.telemetry import METRICS
+
+DEFAULT_RESULTS = os.path.join(HERE, "results.json")
+
+def echo_step(count=1):
+  return {"tool_calls": [{"name": "echo", "arguments": {"text": f"hello {i}"}} for i in range(count)]}
+
+def blob_step(size):
+  return {"tool_calls": [{"name": "blob", "arguments": {"size": size}}]}
+
+SCENARIOS = {
+  # One small tool call per iteration: mostly agent bookkeeping
+  "small": {
+    "script": {"latency": 0.0, "content_chars": 100, "steps": [echo_step() for _ in range(19)]},
+    "cycles": 10
+  },
+  # Large tool outputs, growing the request body every turn
+  "large_outputs": {
+    "script": {"latency": 0.0, "content_chars": 100, "steps": [blob_step(12000) for _ in range(19)]},
+    "config": {"tool_spill": {"enabled": False}},
+    "cycles": 5
+  },
+  # Several tool calls per iteration, dispatched concurrently
+  "parallel_tools": {
+    "script": {"latency": 0.0, "content_chars": 100, "steps": [echo_step(4) for _ in range(9)]},
+    "config": {"tool_dispatch": {"concurrent": True, "parallel_safe": ["echo"]}},
+    "cycles": 10
+  },
+  # Streamed responses with early tool dispatch
+  "streaming": {
+    "script": {"latency": 0.0, "stream_duration": 0.0, "content_chars": 400, "steps": [echo_step(2) for _ in range(19)]},
+    "config": {"client": {"stream": True}},
+    "cycles": 10
+  },
+  # Many short loop cycles to expose memory that survives reset()
+  "loop_cycles": {
+    "script": {"latency": 0.0, "content_chars": 100, "steps": [echo_step(), blob_step(2000), echo_step()]},
+    "cycles": 200
+  }
+}
+
+def current_rss():
+  """Resident set size in bytes (Linux), falling back to the peak."""
+  try:
+    with open("/proc/self/statm", "r") as f:
+      return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+  except (OSError, ValueError):
+    return peak_rss()
+
+def peak_rss():
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # KiB on Linux, bytes on macOS
+  return peak if sys.platform == "darwin" else peak * 1024
+
+def histogram_sum(name):
+  return sum(state[-2] for state in METRICS.histograms.get(name, {}).values())
+
+def deep_update(base, updates):
+  for key, value in updates.items():
+    if isinstance(value, dict) and isinstance(base.get(key), dict):
+      deep_update(base[key], value)
+    else:
+      base[key] = value
+  return base
+
+def write_config(directory, scenario, port):
+  with open(os.path.join(directory, "prompt.md"), "w", encoding="utf8") as f:
+    f.write("You are a benchmark agent.")
+  with open(os.path.join(directory, "bench.mcp.json"), "w", encoding="utf8") as f:
+    json.dump({"mcpServers": {"bench": {"command": sys.executable, "args": [os.path.join(HERE, "stub_mcp.py")], "env": {"FASTMCP_LOG_LEVEL": "WARNING"}}}}, f)
+  config = {
+    "mcp_servers": ["bench.mcp.json"],
+    "system_prompts": ["prompt.md"],
+    "max_iters": 1000,
+    "max_tools_per_iter": 10,
+    "num_retries": 0,
+    "tools": ["echo", "blob", "status"],
+    "mcp_startup": {"schema_cache_dir": "schemas"},
+    "client": {"api_key": "bench", "base_url": f"http://127.0.0.1:{port}/v1", "model": "stub", "context_length": 1000000, "max_tokens": 256}
+  }
+  deep_update(config, scenario.get("config", {}))
+  path = os.path.join(directory, "otto.yaml")
+  with open(path, "w", encoding="utf8") as f:
+    json.dump(config, f)
+  return path
+
+@contextlib.contextmanager
+def stub_server(script, directory):
+  script_path = os.path.join(directory, "script.json")
+  with open(script_path, "w", encoding="utf8") as f:
+    json.dump(script, f)
+  process = subprocess.Popen([sys.executable, os.path.join(HERE, "stub_openai.py"), script_path], stdout=subprocess.PIPE, text=True)
+  try:
+    yield int(process.stdout.readline())
+  finally:
+    process.terminate()
+    process.wait()
+
+async def run_scenario(name, scenario):
+  METRICS.histograms.clear()
+  METRICS.counters.clear()
+  with tempfile.TemporaryDirectory() as directory, stub_server(scenario["script"], directory) as port:
+    agent = Agent(load_config(write_config(directory, scenario, port)), name=name)
+    # The agent logs every step; keep benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+      async with agent.mcp_client:
+        agent.setup_tools(await agent.mcp_client.list_tools())
+        steps = 0
+        rss = []
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        for _ in range(scenario["cycles"]):
+          result = await agent.agent_loop()
+          steps += result["steps"]
+          agent.reset()
+          rss.append(current_rss())
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+
+  return {
+    "cycles": scenario["cycles"],
+    "iterations": steps,
+    "iterations_per_sec": steps / elapsed,
+    "overhead_ms_per_iteration": 1000 * cpu / steps,
+    "model_ms_per_iteration": 1000 * histogram_sum("otto_model_request_seconds") / steps,
+    "tool_ms_per_iteration": 1000 * histogram_sum("otto_tool_call_seconds") / steps,
+    "peak_rss_mb": peak_rss() / 2**20,
+    "rss_growth_mb": (rss[-1] - rss[0]) / 2**20
+  }
+
+def compare(results, baseline, tolerance):
+  """Return regressions beyond `tolerance` (a fraction) against a baseline."""
+  regressions = []
+  for name, result in results.items():
+    base = baseline.get("scenarios", {}).get(name)
+    if base is None:
+      continue
+    if result["iterations_per_sec"] < base["iterations_per_sec"] * (1 - tolerance):
+      regressions.append(f"{name}: iterations/sec {result['iterations_per_sec']:.1f} < baseline {base['iterations_per_sec']:.1f}")
+    if result["overhead_ms_per_iteration"] > base["overhead_ms_per_iteration"] * (1 + tolerance):
+      regressions.append(f"{name}: overhead {result['overhead_ms_per_iteration']:.2f} ms > baseline {base['overhead_ms_per_iteration']:.2f} ms")
+  return regressions
+
+async def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+  parser.add_argument("--save", nargs="?", const=DEFAULT_RESULTS, help="Write results as JSON (default: benchmarks/results.json)")
+  parser.add_argument("--compare", help="Baseline results JSON to compare against")
+  parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression when comparing")
+  args = parser.parse_args()
+
+  results = {}
+  print(f"{'scenario':<16} {'iters':>6} {'iters/s':>9} {'overhead ms':>12} {'model ms':>9} {'tools ms':>9} {'peak MB':>8} {'growth MB':>10}")
+  for name in args.scenarios or SCENARIOS:
+    result = results[name] = await run_scenario(name, SCENARIOS[name])
+    print(
+      f"{name:<16} {result['iterations']:>6} {result['iterations_per_sec']:>9.1f} {result['overhead_ms_per_iteration']:>12.2f} "
+      f"{result['model_ms_per_iteration']:>9.2f} {result['tool_ms_per_iteration']:>9.2f} {result['peak_rss_mb']:>8.1f} {result['rss_growth_mb']:>10.2f}"
+    )
+
+  if args.save:
+    with open(args.save, "w", encoding="utf8") as f:
+      json.dump({"python": platform.python_version(), "platform": platform.platform(), "scenarios": results}, f, indent=2)
+    print(f"Saved results to {args.save}")
+
+  if args.compare:
+    with open(args.compare, "r", encoding="utf8") as f:
+      regressions = compare(results, json.load(f), args.tolerance)
+    for regression in regressions:
+      print(f"❌ {regression}")
+    if regressions:
+      sys.exit(1)
+    print("✅ No regressions")
+
+if __name__ == "__main__":
+  asyncio.run(main())
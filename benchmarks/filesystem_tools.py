@@ -0,0 +1,129 @@
+"""
+Native in-process filesystem tools versus the same calls through an MCP server.
+
+Builds a scratch workspace, then times each call the way the agent makes it:
+  - native: argument validation plus a direct call (Agent.call_builtin_tool)
+  - mcp: a call through a fastmcp client to a stdio server. By default that is
+    stub_fs_mcp.py, which serves the very same functions, so the difference is
+    pure transport; --mcp-command runs another server instead, e.g. the
+    reference implementation:
+      --mcp-command "npx -y @modelcontextprotocol/server-filesystem {root}"
+    ({root} is replaced with the workspace path)
+Server startup is reported separately and not counted in the per-call times.
+
+  python benchmarks/filesystem_tools.py [--calls 200] [--files 500] [--save results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shlex
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from otto.filesystem_tools import make_tools
+from otto.tool_registry import call_tool_function
+from otto.utils import format_builtin_tools
+from otto.validation import ToolArgumentValidator
+
+# Calls whose argument names match the reference server too
+CALLS = {
+  "read_text_file": {"path": "src/module_0/file_0.py"},
+  "read_multiple_files": {"paths": [f"src/module_0/file_{i}.py" for i in range(5)]},
+  "write_file": {"path": "scratch.txt", "content": "scratch\n" * 100},
+  "list_directory": {"path": "src/module_0"},
+  "get_file_info": {"path": "src/module_0/file_0.py"},
+  "search_files": {"path": ".", "pattern": "file_7"},
+  "directory_tree": {"path": "src"}
+}
+
+def make_workspace(root, files, modules=10):
+  line = "def handler(request):\n    return {'status': 'ok', 'request': request}\n"
+  for i in range(files):
+    directory = os.path.join(root, "src", f"module_{i % modules}")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"file_{i // modules}.py"), "w", encoding="utf8") as f:
+      f.write(line * 40)
+
+def summarize(samples):
+  samples = sorted(samples)
+  return {"median_ms": 1000 * statistics.median(samples), "p95_ms": 1000 * samples[int(0.95 * (len(samples) - 1))]}
+
+async def time_calls(call, names, count):
+  results = {}
+  for name in names:
+    # One warm-up call, so imports and caches aren't counted
+    await call(name, CALLS[name])
+    samples = []
+    for _ in range(count):
+      start = time.perf_counter()
+      await call(name, CALLS[name])
+      samples.append(time.perf_counter() - start)
+    results[name] = summarize(samples)
+  return results
+
+async def bench_native(root, count):
+  tools = make_tools({"roots": [root]})
+  validator = ToolArgumentValidator()
+  validator.set_tools(format_builtin_tools(tools))
+  async def call(name, arguments):
+    return await call_tool_function(tools[name], validator.validate(name, arguments))
+  return await time_calls(call, CALLS, count)
+
+async def bench_mcp(root, count, command):
+  from fastmcp import Client
+  command = [part.replace("{root}", root) for part in shlex.split(command)]
+  client = Client({"mcpServers": {"filesystem": {"command": command[0], "args": command[1:]}}})
+  start = time.perf_counter()
+  async with client:
+    available = {tool.name for tool in await client.list_tools()}
+    startup_ms = 1000 * (time.perf_counter() - start)
+    async def call(name, arguments):
+      return await client.call_tool(name, arguments)
+    names = [name for name in CALLS if name in available]
+    return startup_ms, await time_calls(call, names, count)
+
+async def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--calls", type=int, default=200, help="Timed calls per tool")
+  parser.add_argument("--files", type=int, default=500, help="Files in the scratch workspace")
+  parser.add_argument("--mcp-command", default=f"{shlex.quote(sys.executable)} {shlex.quote(os.path.join(HERE, 'stub_fs_mcp.py'))} {{root}}",
+                      help="MCP server to compare against (default: the native tools served by stub_fs_mcp.py)")
+  parser.add_argument("--save", help="Write results as JSON")
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as root:
+    root = os.path.realpath(root)
+    make_workspace(root, args.files)
+    native = await bench_native(root, args.calls)
+    startup_ms, mcp = await bench_mcp(root, args.calls, args.mcp_command)
+
+  print(f"MCP server startup: {startup_ms:.0f} ms")
+  print(f"{'tool':<22} {'native ms':>10} {'p95':>8} {'mcp ms':>9} {'p95':>8} {'speedup':>8}")
+  for name, result in native.items():
+    if name not in mcp:
+      print(f"{name:<22} {result['median_ms']:>10.3f} {result['p95_ms']:>8.3f} {'n/a':>9}")
+      continue
+    result["speedup"] = mcp[name]["median_ms"] / result["median_ms"]
+    print(
+      f"{name:<22} {result['median_ms']:>10.3f} {result['p95_ms']:>8.3f} "
+      f"{mcp[name]['median_ms']:>9.3f} {mcp[name]['p95_ms']:>8.3f} {result['speedup']:>7.1f}x"
+    )
+
+  if args.save:
+    with open(args.save, "w", encoding="utf8") as f:
+      json.dump({
+        "python": platform.python_version(), "platform": platform.platform(), "mcp_command": args.mcp_command,
+        "mcp_startup_ms": startup_ms, "native": native, "mcp": mcp
+      }, f, indent=2)
+    print(f"Saved results to {args.save}")
+
+if __name__ == "__main__":
+  asyncio.run(main())
@@ -0,0 +1,146 @@
+"""
+Import time and CLI startup benchmarks.
+
+Measures, in fresh interpreters:
+  - cumulative import time (`python -X importtime`) of the otto modules on the
+    startup path, and of otto.agent, which pulls in openai and fastmcp
+  - wall time of the fast subcommands (`--help`, `check-config`, `list-tools`)
+Each figure is the best of several runs.
+
+  python benchmarks/import_time.py                     # measure and check budgets
+  python benchmarks/import_time.py --save              # also write import_times.json
+  python benchmarks/import_time.py --compare import_times.json --tolerance 0.5
+
+BUDGETS are the import-time budget for modules that must stay light, counted
+on top of importing asyncio (which the CLI needs anyway, and whose cost varies
+a lot between machines). Light modules must not load openai, fastmcp or mcp.
+Exits 1 when a budget is exceeded, a heavy module leaks into a light import,
+or (with --compare) on regressions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+DEFAULT_RESULTS = os.path.join(HERE, "import_times.json")
+
+# Module -> import time budget in ms over BASELINE_MODULE. Heavy modules have no budget, they are tracked only
+BASELINE_MODULE = "asyncio"
+BUDGETS = {
+  "otto": 10,
+  "otto.otto": 60,
+  "otto.checks": 100,
+  "otto.agent": None
+}
+HEAVY_MODULES = ("openai", "fastmcp", "mcp")
+
+def run_python(args, cwd=ROOT):
+  env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))}
+  return subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+def import_time(module):
+  """Cumulative import time of `module` in ms, and whether it loaded a heavy module."""
+  check = f"import sys, {module}; print(any(name.split('.')[0] in {HEAVY_MODULES!r} for name in sys.modules))"
+  result = run_python(["-X", "importtime", "-c", check])
+  total = 0
+  for line in result.stderr.splitlines():
+    # import time: self [us] | cumulative | imported package
+    parts = line.split("|")
+    if len(parts) == 3 and parts[2].strip() == module and not parts[2].startswith("  "):
+      total = int(parts[1])
+  return total / 1000, result.stdout.strip() == "True"
+
+def command_time(args, cwd):
+  start = time.perf_counter()
+  run_python(["-m", "otto", *args], cwd)
+  return 1000 * (time.perf_counter() - start)
+
+def write_config(directory):
+  with open(os.path.join(directory, "prompt.md"), "w", encoding="utf8") as f:
+    f.write("You are a benchmark agent.")
+  with open(os.path.join(directory, "bench.mcp.json"), "w", encoding="utf8") as f:
+    json.dump({"mcpServers": {"bench": {"command": sys.executable, "args": [os.path.join(HERE, "stub_mcp.py")]}}}, f)
+  with open(os.path.join(directory, "otto.yaml"), "w", encoding="utf8") as f:
+    json.dump({
+      "mcp_servers": ["bench.mcp.json"],
+      "system_prompts": ["prompt.md"],
+      "max_iters": 10,
+      "tools": ["echo"],
+      "client": {"model": "stub", "context_length": 100000}
+    }, f)
+
+def measure(runs):
+  results = {"imports": {}, "commands": {}}
+  for module in [BASELINE_MODULE, *BUDGETS]:
+    samples = [import_time(module) for _ in range(runs)]
+    results["imports"][module] = {"ms": min(ms for ms, _ in samples), "loads_heavy": samples[0][1]}
+  with tempfile.TemporaryDirectory() as directory:
+    write_config(directory)
+    commands = {"--help": ["--help"], "check-config": ["check-config"], "list-tools": ["list-tools"]}
+    for name, args in commands.items():
+      results["commands"][name] = {"ms": min(command_time(args, directory) for _ in range(runs))}
+  return results
+
+def check_budgets(results):
+  failures = []
+  baseline = results["imports"][BASELINE_MODULE]["ms"]
+  for module, budget in BUDGETS.items():
+    result = results["imports"][module]
+    if budget is None:
+      continue
+    if result["loads_heavy"]:
+      failures.append(f"{module}: imports one of {', '.join(HEAVY_MODULES)}")
+    if result["ms"] - baseline > budget:
+      failures.append(f"{module}: {result['ms'] - baseline:.1f} ms over {BASELINE_MODULE} > budget {budget} ms")
+  return failures
+
+def compare(results, baseline, tolerance):
+  regressions = []
+  for section in ("imports", "commands"):
+    for name, result in results[section].items():
+      base = baseline.get(section, {}).get(name)
+      if base is not None and result["ms"] > base["ms"] * (1 + tolerance):
+        regressions.append(f"{name}: {result['ms']:.1f} ms > baseline {base['ms']:.1f} ms")
+  return regressions
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--runs", type=int, default=5, help="Runs per measurement; the best is kept")
+  parser.add_argument("--save", nargs="?", const=DEFAULT_RESULTS, help="Write results as JSON (default: benchmarks/import_times.json)")
+  parser.add_argument("--compare", help="Baseline results JSON to compare against")
+  parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative regression when comparing")
+  args = parser.parse_args()
+
+  results = measure(args.runs)
+  print(f"{'import':<24} {'ms':>8} {'budget':>8}  (budgets are on top of {BASELINE_MODULE})")
+  for module, result in results["imports"].items():
+    budget = BUDGETS.get(module)
+    print(f"{module:<24} {result['ms']:>8.1f} {budget if budget is not None else '-':>8}")
+  print(f"{'command':<24} {'ms':>8}")
+  for name, result in results["commands"].items():
+    print(f"{'otto ' + name:<24} {result['ms']:>8.1f}")
+
+  if args.save:
+    with open(args.save, "w", encoding="utf8") as f:
+      json.dump({"python": platform.python_version(), "platform": platform.platform(), **results}, f, indent=2)
+    print(f"Saved results to {args.save}")
+
+  failures = check_budgets(results)
+  if args.compare:
+    with open(args.compare, "r", encoding="utf8") as f:
+      failures += compare(results, json.load(f), args.tolerance)
+  for failure in failures:
+    print(f"❌ {failure}")
+  if failures:
+    sys.exit(1)
+  print("✅ Within budget")
+
+if __name__ == "__main__":
+  main()
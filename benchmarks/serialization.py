@@ -0,0 +1,103 @@
+"""
+Per-iteration client-side overhead of building chat completion requests as history grows.
+
+Compares handing the full message list to the OpenAI SDK (which validates and
+re-encodes everything each request) with RequestEncoder (cached per-message
+fragments). Requests go to an in-process mock transport, so the numbers are
+pure client work: building, encoding and sending the request and parsing a
+small response.
+
+  python benchmarks/serialization.py [--iterations 200] [--tool-output-chars 4000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from otto.endpoints import Endpoint, sdk_http_module
+from otto.message_store import RequestEncoder
+from otto.utils import run_model
+
+RESPONSE = {
+  "id": "bench",
+  "object": "chat.completion",
+  "created": 0,
+  "model": "bench",
+  "choices": [{
+    "index": 0,
+    "finish_reason": "tool_calls",
+    "message": {
+      "role": "assistant",
+      "content": "",
+      "tool_calls": [{"id": "call", "type": "function", "function": {"name": "read_file", "arguments": "{\"path\": \"README.md\"}"}}]
+    }
+  }],
+  "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+}
+
+TOOLS = [
+  {
+    "type": "function",
+    "function": {
+      "name": f"tool_{i}",
+      "description": f"Synthetic tool number {i} used for benchmarking request encoding",
+      "parameters": {"type": "object", "properties": {"path": {"type": "string"}, "limit": {"type": "integer"}}, "required": ["path"]}
+    }
+  }
+  for i in range(20)
+]
+
+def make_client():
+  httpx = sdk_http_module()
+  def handler(request):
+    return httpx.Response(200, json=RESPONSE)
+  http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+  endpoint = Endpoint("http://bench.invalid/v1", "bench", http_client, 30)
+  # Same surface run_model expects from a client
+  return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=endpoint.create)))
+
+def add_turn(messages, index, tool_output_chars):
+  call_id = f"call_{index}"
+  messages.append({"role": "assistant", "content": "", "tool_calls": [{"id": call_id, "type": "function", "function": {"name": "tool_1", "arguments": json.dumps({"path": f"file_{index}.txt"})}}]})
+  messages.append({"role": "tool", "tool_call_id": call_id, "content": (f"line {index} of some tool output\n" * (tool_output_chars // 30 + 1))[:tool_output_chars]})
+
+async def run(encoder, iterations, tool_output_chars):
+  client = make_client()
+  messages = [{"role": "system", "content": "You are a benchmark." * 50}, {"role": "user", "content": "Go."}]
+  timings = []
+  for index in range(iterations):
+    add_turn(messages, index, tool_output_chars)
+    start = time.perf_counter()
+    await run_model(client, "bench", messages, TOOLS, 256, encoder)
+    timings.append(time.perf_counter() - start)
+  return timings
+
+def summarize(timings, iterations):
+  buckets = []
+  step = max(iterations // 5, 1)
+  for start in range(0, iterations, step):
+    window = timings[start:start + step]
+    buckets.append((start + len(window), 1000 * sum(window) / len(window)))
+  return buckets
+
+async def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--iterations", type=int, default=200)
+  parser.add_argument("--tool-output-chars", type=int, default=4000)
+  args = parser.parse_args()
+
+  sdk = await run(None, args.iterations, args.tool_output_chars)
+  cached = await run(RequestEncoder(), args.iterations, args.tool_output_chars)
+
+  print(f"{'turns':>6} {'sdk ms/iter':>12} {'cached ms/iter':>15} {'speedup':>8}")
+  for (turns, sdk_ms), (_, cached_ms) in zip(summarize(sdk, args.iterations), summarize(cached, args.iterations)):
+    print(f"{turns:>6} {sdk_ms:>12.2f} {cached_ms:>15.2f} {sdk_ms / cached_ms:>7.1f}x")
+  print(f"total: sdk {sum(sdk):.2f}s, cached {sum(cached):.2f}s")
+
+if __name__ == "__main__":
+  asyncio.run(main())
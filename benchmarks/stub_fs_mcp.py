@@ -0,0 +1,20 @@
+"""
+The native filesystem tools (otto/filesystem_tools.py) served over MCP, so
+benchmarks can separate the transport's cost from the tools' own work.
+
+  python stub_fs_mcp.py <root>
+"""
+
+import os
+import sys
+from fastmcp import FastMCP
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from otto.filesystem_tools import make_tools
+
+app = FastMCP()
+
+for tool in make_tools({"roots": [sys.argv[1]]}).values():
+    app.tool()(tool)
+
+app.run(show_banner=False)
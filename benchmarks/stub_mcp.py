@@ -0,0 +1,36 @@
+"""
+Stub FastMCP server for benchmarks, in the style of example/mcp-todo.py.
+
+  python stub_mcp.py [latency_ms]
+
+Every tool sleeps `latency_ms` (default 0) before answering.
+"""
+
+import asyncio
+import sys
+from fastmcp import FastMCP
+
+app = FastMCP()
+
+LATENCY = (float(sys.argv[1]) if len(sys.argv) > 1 else 0.0) / 1000
+
+@app.tool()
+async def echo(text: str):
+    """Return the given text"""
+    await asyncio.sleep(LATENCY)
+    return text
+
+@app.tool()
+async def blob(size: int):
+    """Return `size` characters of line-structured filler text"""
+    await asyncio.sleep(LATENCY)
+    line = "lorem ipsum dolor sit amet consectetur adipiscing elit\n"
+    return (line * (size // len(line) + 1))[:size]
+
+@app.tool()
+async def status():
+    """Report that the stub is up"""
+    await asyncio.sleep(LATENCY)
+    return "ok"
+
+app.run(show_banner=False)
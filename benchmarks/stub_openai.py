@@ -0,0 +1,122 @@
+"""
+OpenAI-compatible chat completions stub for offline benchmarks.
+
+Serves POST /v1/chat/completions (plain and streamed) from a JSON script:
+
+  {
+    "latency": 0.05,        # seconds before the response (streaming: before the first token)
+    "stream_duration": 0.0, # extra seconds spread over the streamed chunks
+    "content_chars": 200,   # size of the assistant text in each response
+    "steps": [              # tool calls per step; step = assistant messages in the request
+      {"tool_calls": [{"name": "echo", "arguments": {"text": "hi"}}]}
+    ]
+  }
+
+After the last step the stub calls the built-in `sleep` tool, ending the session.
+The stub is stateless, so any number of agents can share it.
+
+  python stub_openai.py script.json [--port 0]
+
+Prints the listening port on the first line of stdout.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+CHUNKS = 8
+
+class StubModel:
+  def __init__(self, script):
+    self.latency = script.get("latency", 0.0)
+    self.stream_duration = script.get("stream_duration", 0.0)
+    self.content = ("x" * script.get("content_chars", 0))
+    self.steps = script.get("steps", [])
+    self.requests = 0
+
+  def respond(self, body):
+    messages = body.get("messages", [])
+    step = sum(1 for message in messages if message.get("role") == "assistant")
+    if step < len(self.steps):
+      calls = self.steps[step]["tool_calls"]
+    else:
+      calls = [{"name": "sleep", "arguments": {}}]
+    tool_calls = [
+      {"id": f"call_{step}_{index}", "type": "function", "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])}}
+      for index, call in enumerate(calls)
+    ]
+    prompt_tokens = len(json.dumps(messages)) // 4
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(self.content) // 4 + 10, "total_tokens": prompt_tokens + len(self.content) // 4 + 10}
+    return tool_calls, usage
+
+  async def handle(self, reader, writer):
+    try:
+      while True:
+        request_line = await reader.readline()
+        if not request_line:
+          return
+        headers = {}
+        while True:
+          line = await reader.readline()
+          if line in (b"\r\n", b"\n", b""):
+            break
+          key, _, value = line.decode("latin1").partition(":")
+          headers[key.strip().lower()] = value.strip()
+        body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))) or b"{}")
+        self.requests += 1
+        tool_calls, usage = self.respond(body)
+        await asyncio.sleep(self.latency)
+        if body.get("stream"):
+          await self.stream(writer, tool_calls, usage)
+          return
+        payload = json.dumps({
+          "id": f"stub-{self.requests}",
+          "object": "chat.completion",
+          "created": 0,
+          "model": body.get("model", "stub"),
+          "choices": [{"index": 0, "finish_reason": "tool_calls", "message": {"role": "assistant", "content": self.content, "tool_calls": tool_calls}}],
+          "usage": usage
+        }).encode("utf8")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload)
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+      pass
+    finally:
+      writer.close()
+
+  async def stream(self, writer, tool_calls, usage):
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+    def event(delta, extra=None):
+      chunk = {"id": f"stub-{self.requests}", "object": "chat.completion.chunk", "created": 0, "model": "stub", "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+      chunk.update(extra or {})
+      return b"data: " + json.dumps(chunk).encode("utf8") + b"\n\n"
+    pieces = [self.content[i::CHUNKS] for i in range(CHUNKS)] if self.content else []
+    for piece in pieces:
+      writer.write(event({"content": piece}))
+      await writer.drain()
+      await asyncio.sleep(self.stream_duration / CHUNKS)
+    for index, tool_call in enumerate(tool_calls):
+      writer.write(event({"tool_calls": [{"index": index, **tool_call}]}))
+    writer.write(event({}, {"choices": [], "usage": usage}))
+    writer.write(b"data: [DONE]\n\n")
+    await writer.drain()
+
+async def main():
+  parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+  parser.add_argument("script", help="Path to a JSON response script")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=0)
+  args = parser.parse_args()
+  with open(args.script, "r", encoding="utf8") as f:
+    model = StubModel(json.load(f))
+  server = await asyncio.start_server(model.handle, args.host, args.port)
+  print(server.sockets[0].getsockname()[1], flush=True)
+  async with server:
+    await server.serve_forever()
+
+if __name__ == "__main__":
+  try:
+    asyncio.run(main())
+  except KeyboardInterrupt:
+    sys.exit(0)
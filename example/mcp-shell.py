@@ -1,12 +1,191 @@
+import argparse
+import asyncio
+import os
+import shlex
+import shutil
+import signal
+import uuid
+from typing import Optional
 from fastmcp import FastMCP
-import subprocess
 
 app = FastMCP()
 
+# Limits can be set from the server's args in mcp_servers/shell.mcp.json
+parser = argparse.ArgumentParser()
+parser.add_argument("--timeout", type=float, default=300, help="Default seconds before a command is killed")
+parser.add_argument("--max-output", type=int, default=20000, help="Bytes of output kept per stream (half head, half tail)")
+parser.add_argument("--concurrency", type=int, default=4, help="Commands running at once")
+args, _ = parser.parse_known_args()
+
+# Sessions need `eval` to survive syntax errors, which bash does and plain sh doesn't
+SESSION_SHELL = shutil.which("bash") or "/bin/sh"
+KILL_GRACE = 2
+
+workers = asyncio.Semaphore(args.concurrency)
+sessions = {}
+
+class CappedOutput:
+    """Keeps the first and last `limit / 2` bytes of a stream and counts the rest."""
+    def __init__(self, limit):
+        self.half = max(limit // 2, 1)
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data):
+        self.total += len(data)
+        room = self.half - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.half:
+                del self.tail[:len(self.tail) - self.half]
+
+    def text(self):
+        omitted = self.total - len(self.head) - len(self.tail)
+        head = self.head.decode("utf8", errors="replace")
+        tail = self.tail.decode("utf8", errors="replace")
+        if omitted:
+            return f"{head}\n[... {omitted:,} bytes omitted ...]\n{tail}"
+        return head + tail
+
+async def pump(stream, output):
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            return
+        output.write(chunk)
+
+def kill_group(process, sig):
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+async def stop(process):
+    """Terminate the command and everything it started."""
+    kill_group(process, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), KILL_GRACE)
+    except asyncio.TimeoutError:
+        kill_group(process, signal.SIGKILL)
+        await process.wait()
+
+async def run_command(cmd, timeout):
+    # Own process group, so a timeout also kills whatever the command spawned
+    process = await asyncio.create_subprocess_shell(
+        cmd, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True
+    )
+    stdout = CappedOutput(args.max_output)
+    stderr = CappedOutput(args.max_output)
+    pumps = asyncio.gather(pump(process.stdout, stdout), pump(process.stderr, stderr))
+    timed_out = False
+    try:
+        await asyncio.wait_for(asyncio.shield(pumps), timeout)
+        await process.wait()
+    except asyncio.TimeoutError:
+        timed_out = True
+        await stop(process)
+        await pumps
+    except asyncio.CancelledError:
+        await stop(process)
+        raise
+
+    result = stdout.text() + stderr.text()
+    if timed_out:
+        result += f"\n[timed out after {timeout:g}s, killed]"
+    elif process.returncode != 0:
+        result += f"\n[exit code {process.returncode}]"
+    return result
+
+class ShellSession:
+    """
+    A long-lived shell, so `cd`, exported variables and functions carry over between commands.
+    Each command is eval'd in it with stdin from /dev/null, followed by a marker line carrying its exit code.
+    """
+    def __init__(self):
+        self.process = None
+        self.marker = f"__otto_done_{uuid.uuid4().hex}__"
+        self.lock = asyncio.Lock()
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            SESSION_SHELL, "-s", stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, start_new_session=True
+        )
+
+    async def read_until_marker(self, output):
+        """Stream output into `output` until the marker line. Returns the exit code, or None if the shell exited."""
+        marker = self.marker.encode()
+        pending = bytearray()
+        while True:
+            chunk = await self.process.stdout.read(65536)
+            if not chunk:
+                output.write(pending)
+                return None
+            pending += chunk
+            index = pending.find(marker)
+            if index >= 0:
+                end = pending.find(b"\n", index)
+                if end < 0:
+                    continue
+                output.write(pending[:index])
+                return int(pending[index + len(marker):end] or 0)
+            # Hold back a possible partial marker at the end
+            keep = len(marker) - 1
+            output.write(pending[:-keep])
+            del pending[:-keep]
+
+    async def run(self, cmd, timeout):
+        async with self.lock:
+            if self.process is None or self.process.returncode is not None:
+                await self.start()
+            self.process.stdin.write(f"eval {shlex.quote(cmd)} < /dev/null 2>&1\nprintf '\\n{self.marker}%s\\n' $?\n".encode())
+            await self.process.stdin.drain()
+            output = CappedOutput(args.max_output)
+            try:
+                exit_code = await asyncio.wait_for(self.read_until_marker(output), timeout)
+            except asyncio.TimeoutError:
+                await self.close()
+                return output.text() + f"\n[timed out after {timeout:g}s, killed; the session was reset]"
+            except asyncio.CancelledError:
+                await self.close()
+                raise
+
+            # Drop the newline the marker line starts with
+            result = output.text()
+            result = result[:-1] if result.endswith("\n") else result
+            if exit_code is None:
+                self.process = None
+                return result + "\n[the session's shell exited; the next command starts a new one]"
+            if exit_code != 0:
+                result += f"\n[exit code {exit_code}]"
+            return result
+
+    async def close(self):
+        if self.process is not None and self.process.returncode is None:
+            await stop(self.process)
+        self.process = None
+
+@app.tool()
+async def execute_shell_command(cmd: str, timeout: Optional[float] = None, session: Optional[str] = None):
+    """Run a command in the shell. Pass a session name to keep the working directory and environment between commands. Long output is truncated in the middle."""
+    timeout = timeout or args.timeout
+    async with workers:
+        if session is None:
+            return await run_command(cmd, timeout)
+        if session not in sessions:
+            sessions[session] = ShellSession()
+        return await sessions[session].run(cmd, timeout)
+
 @app.tool()
-def execute_shell_command(cmd: str):
-    """Run a command in the shell"""
-    p = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-    return p.stdout + p.stderr
+async def close_shell_session(session: str):
+    """Close a shell session started by execute_shell_command"""
+    shell_session = sessions.pop(session, None)
+    if shell_session is None:
+        return f"No shell session named {session}"
+    await shell_session.close()
+    return f"Closed shell session {session}"
 
-app.run()
\ No newline at end of file
+app.run()
@@ -1,154 +1,297 @@
 import json
 import os
+import sqlite3
 import uuid
 import sys
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Optional
 from fastmcp import FastMCP
-import subprocess
 
 app = FastMCP()
 
-# Get the todo file path from command line argument, default to "todos.json"
+# Get the todo file path from command line argument, default to "todos.json".
+# A path ending in .db/.sqlite/.sqlite3 stores the todos in SQLite instead.
 TODO_FILE = sys.argv[1] if len(sys.argv) > 1 else "todos.json"
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+# Todos shown after a change; the full list is available through list_todos
+CHANGE_LIST_LIMIT = 50
 
-def load_todos():
-    """Load todos from JSON file"""
-    if os.path.exists(TODO_FILE):
-        with open(TODO_FILE, 'r') as f:
-            return json.load(f)
-    return []
-
-def save_todos(todos):
-    """Save todos to JSON file"""
-    with open(TODO_FILE, 'w') as f:
-        json.dump(todos, f, indent=2)
-
-def validate_todo_ids(todo_ids: list[str]) -> tuple[list[str], list[str]]:
-    todos = load_todos()
-    existing_ids = {todo["id"] for todo in todos}
-    valid_ids = [e for e in todo_ids if e in existing_ids]
-    invalid_ids = [e for e in todo_ids if e not in existing_ids]
-    
-    return valid_ids, invalid_ids
+class TodoStore(ABC):
+    """
+    Todos kept in memory in list order, with an index by id.
+    Subclasses load the list when the backing file changed underneath us and
+    persist each change.
+    """
+    def __init__(self):
+        self.todos = []
+        self.by_id = {}
+        # Identifies the loaded state of the backing file; None forces a reload
+        self.stamp = None
+        # FastMCP runs sync tools in worker threads
+        self.lock = threading.Lock()
+
+    def _set_todos(self, todos):
+        self.todos = todos
+        self.by_id = {todo["id"]: todo for todo in todos}
+
+    @abstractmethod
+    def refresh(self):
+        """Reload if another process changed the backing file."""
+
+    @contextmanager
+    def transaction(self, write=True):
+        """Run one tool call against an up-to-date list. Pass write=False for calls that only read."""
+        with self.lock:
+            self.refresh()
+            try:
+                yield
+            except BaseException:
+                # Memory may hold a change that never made it to disk
+                self.stamp = None
+                raise
+
+    def split_ids(self, todo_ids):
+        valid_ids = [e for e in todo_ids if e in self.by_id]
+        invalid_ids = [e for e in todo_ids if e not in self.by_id]
+        return valid_ids, invalid_ids
+
+    def add(self, tasks):
+        added = [{"id": str(uuid.uuid4()), "task": task, "completed": False} for task in tasks]
+        self._set_todos(self.todos + added)
+        self._save_added(added)
+        return added
+
+    def remove(self, todo_ids):
+        ids = set(todo_ids)
+        removed = [todo for todo in self.todos if todo["id"] in ids]
+        self._set_todos([todo for todo in self.todos if todo["id"] not in ids])
+        self._save_removed(removed)
+        return removed
+
+    def complete(self, todo_ids):
+        completed = [self.by_id[todo_id] for todo_id in dict.fromkeys(todo_ids)]
+        for todo in completed:
+            todo["completed"] = True
+        self._save_completed(completed)
+        return completed
+
+    def reorder(self, todo_ids, new_position):
+        ids = list(dict.fromkeys(todo_ids))
+        moved = [self.by_id[todo_id] for todo_id in ids]
+        remaining = [todo for todo in self.todos if todo["id"] not in set(ids)]
+        self._set_todos(remaining[:new_position] + moved + remaining[new_position:])
+        self._save_order()
+        return moved
+
+    def clear(self):
+        self._set_todos([])
+        self._save_order()
+
+    def page(self, pending_only=False, limit=None, offset=0):
+        """Todos matching the filter, paginated. Returns (page, number of matches)."""
+        todos = [todo for todo in self.todos if not todo["completed"]] if pending_only else self.todos
+        end = None if limit is None else offset + limit
+        return todos[offset:end], len(todos)
+
+    # Persistence hooks, called after the in-memory list has been updated
+    def _save_added(self, added):
+        self._save_order()
+
+    def _save_removed(self, removed):
+        self._save_order()
+
+    def _save_completed(self, completed):
+        self._save_order()
+
+    @abstractmethod
+    def _save_order(self):
+        """Persist the whole list in its current order."""
+
+class JsonTodoStore(TodoStore):
+    """The original todos.json format, cached until its mtime/size change and replaced atomically on write."""
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self):
+        stamp = self._stat()
+        if stamp == self.stamp:
+            return
+        todos = []
+        if stamp is not None:
+            with open(self.path, 'r') as f:
+                todos = json.load(f)
+        self._set_todos(todos)
+        self.stamp = stamp
+
+    def _save_order(self):
+        # Write to a temp file and rename, so readers never see a half-written list
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.todos, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.stamp = self._stat()
+
+class SqliteTodoStore(TodoStore):
+    """Todos in SQLite: changes touch only their own rows, except reorders and clears which rewrite the order."""
+    def __init__(self, path):
+        super().__init__()
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS todos (id TEXT PRIMARY KEY, task TEXT NOT NULL, completed INTEGER NOT NULL DEFAULT 0, position INTEGER NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS todos_position ON todos (position)")
+
+    def refresh(self):
+        # data_version changes whenever another connection commits
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self.stamp:
+            return
+        rows = self.conn.execute("SELECT id, task, completed FROM todos ORDER BY position").fetchall()
+        self._set_todos([{"id": id, "task": task, "completed": bool(completed)} for id, task, completed in rows])
+        self.stamp = data_version
+
+    @contextmanager
+    def transaction(self, write=True):
+        with self.lock:
+            # Writes take the write lock up front, so other servers sharing the database can't
+            # commit between our read and our write; reads stay deferred and don't block writers
+            self.conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                self.refresh()
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                self.stamp = None
+                raise
+            self.conn.execute("COMMIT")
+
+    def _save_added(self, added):
+        next_position = (self.conn.execute("SELECT MAX(position) FROM todos").fetchone()[0] or 0) + 1
+        self.conn.executemany("INSERT INTO todos (id, task, completed, position) VALUES (?, ?, 0, ?)",
+                              [(todo["id"], todo["task"], next_position + i) for i, todo in enumerate(added)])
+
+    def _save_removed(self, removed):
+        self.conn.executemany("DELETE FROM todos WHERE id = ?", [(todo["id"],) for todo in removed])
+
+    def _save_completed(self, completed):
+        self.conn.executemany("UPDATE todos SET completed = 1 WHERE id = ?", [(todo["id"],) for todo in completed])
+
+    def _save_order(self):
+        self.conn.execute("DELETE FROM todos")
+        self.conn.executemany("INSERT INTO todos (id, task, completed, position) VALUES (?, ?, ?, ?)",
+                              [(todo["id"], todo["task"], int(todo["completed"]), i) for i, todo in enumerate(self.todos)])
+
+def open_store(path):
+    if path.endswith(SQLITE_EXTENSIONS):
+        return SqliteTodoStore(path)
+    return JsonTodoStore(path)
+
+store = open_store(TODO_FILE)
+
+def format_todos(pending_only=False, limit=None, offset=0):
+    """Render (a page of) the todo list"""
+    todos, total = store.page(pending_only, limit, offset)
+    if total == 0:
+        return "There are no pending todos" if pending_only else "The todo list is empty"
 
-def list_todos_helper():
-    """Helper function to display current list of todos"""
-    todos = load_todos()
     if not todos:
-        return "The todo list is empty"
-    
-    result = "Current todo list:\n"
+        return f"No todos at offset {offset} ({total} in total)"
+
+    result = "Pending todos" if pending_only else "Current todo list"
+    if len(todos) < total:
+        result += f" ({offset + 1}-{offset + len(todos)} of {total})"
+    result += ":\n"
     for todo in todos:
         status = "☑️" if todo["completed"] else "☐"
         result += f"{todo['id']}: {status} {todo['task']}\n"
+    if offset + len(todos) < total:
+        result += f"... {total - offset - len(todos)} more, use list_todos with offset={offset + len(todos)}\n"
     return result
 
+def list_todos_helper():
+    """Helper function to display the current list of todos after a change"""
+    return format_todos(limit=CHANGE_LIST_LIMIT)
+
+def check_todo_ids(todo_ids):
+    """Return an error message for unknown or missing ids, or None"""
+    valid_ids, invalid_ids = store.split_ids(todo_ids)
+    if invalid_ids:
+        return f"Invalid todo IDs not found: {', '.join(invalid_ids)}"
+    if not valid_ids:
+        return "No valid todo IDs provided"
+    return None
+
 @app.tool()
 def add_todos(tasks: list[str]):
     """Add multiple todo items"""
-    todos = load_todos()
-    added_tasks = []
-    for task in tasks:
-        todo_id = str(uuid.uuid4())
-        todos.append({
-            "id": todo_id,
-            "task": task,
-            "completed": False
-        })
-        added_tasks.append(f"{task} (ID: {todo_id})")
-    save_todos(todos)
-    return f"Added todos: {', '.join(added_tasks)}\n\n{list_todos_helper()}"
+    with store.transaction():
+        added = store.add(tasks)
+        added_tasks = [f"{todo['task']} (ID: {todo['id']})" for todo in added]
+        return f"Added todos: {', '.join(added_tasks)}\n\n{list_todos_helper()}"
 
 @app.tool()
 def remove_todos(todo_ids: list[str]):
     """Remove multiple todo items by UUIDs"""
-    valid_ids, invalid_ids = validate_todo_ids(todo_ids)
-    
-    if invalid_ids:
-        return f"Invalid todo IDs not found: {', '.join(invalid_ids)}"
-    
-    if not valid_ids:
-        return "No valid todo IDs provided"
-    
-    # Remove valid todos
-    todos = load_todos()
-    removed_tasks = []
-    remaining_todos = []
-    
-    for todo in todos:
-        if todo["id"] in valid_ids:
-            removed_tasks.append(todo["task"])
-        else:
-            remaining_todos.append(todo)
-    
-    save_todos(remaining_todos)
-    return f"Removed todos: {', '.join(removed_tasks)}\n\n{list_todos_helper()}"
+    with store.transaction():
+        error = check_todo_ids(todo_ids)
+        if error:
+            return error
+
+        removed = store.remove(todo_ids)
+        return f"Removed todos: {', '.join(todo['task'] for todo in removed)}\n\n{list_todos_helper()}"
 
 @app.tool()
 def complete_todos(todo_ids: list[str]):
     """Complete multiple todo items by UUIDs"""
-    valid_ids, invalid_ids = validate_todo_ids(todo_ids)
-    
-    if invalid_ids:
-        return f"Invalid todo IDs not found: {', '.join(invalid_ids)}"
-    
-    if not valid_ids:
-        return "No valid todo IDs provided"
-    
-    # Mark valid todos as complete
-    todos = load_todos()
-    completed_tasks = []
-    
-    for todo in todos:
-        if todo["id"] in valid_ids:
-            todo["completed"] = True
-            completed_tasks.append(todo["task"])
-    
-    save_todos(todos)
-    return f"Completed todos: {', '.join(completed_tasks)}\n\n{list_todos_helper()}"
+    with store.transaction():
+        error = check_todo_ids(todo_ids)
+        if error:
+            return error
+
+        completed = store.complete(todo_ids)
+        return f"Completed todos: {', '.join(todo['task'] for todo in completed)}\n\n{list_todos_helper()}"
 
 @app.tool()
 def reorder_todos(todo_ids: list[str], new_position: int):
     """Reorder multiple todo items to a new position (0-indexed). Use -1 to move the selected todos to the end of the list."""
-    todos = load_todos()
-    
-    valid_ids, invalid_ids = validate_todo_ids(todo_ids)
-    
-    if invalid_ids:
-        return f"Invalid todo IDs not found: {', '.join(invalid_ids)}"
-    
-    if not valid_ids:
-        return "No valid todo IDs provided"
-    
-    # Handle special case: -1 means add to the end
-    if new_position == -1:
-        new_position = len(todos)
-    
-    # Validate position
-    if not (0 <= new_position <= len(todos)):
-        return f"Invalid position. Must be between 0 and {len(todos)} inclusive, or -1."
-    
-    todos_by_id = {todo["id"]: todo for todo in todos}
-    todos_to_move = [todos_by_id[id_val] for id_val in valid_ids]
-    remaining_todos = list(filter(lambda todo: todo["id"] not in valid_ids, todos))
-    
-    # Insert todos at new position in the order they appear in todo_ids
-    if new_position >= len(remaining_todos):
-        result_todos = remaining_todos + todos_to_move
-    else:
-        result_todos = remaining_todos[:new_position] + todos_to_move + remaining_todos[new_position:]
-    
-    save_todos(result_todos)
-    return f"Reordered todos to position {new_position}: {', '.join([todo['id'] for todo in todos_to_move])}\n\n{list_todos_helper()}"
+    with store.transaction():
+        error = check_todo_ids(todo_ids)
+        if error:
+            return error
+
+        # Handle special case: -1 means add to the end
+        if new_position == -1:
+            new_position = len(store.todos)
+
+        # Validate position
+        if not (0 <= new_position <= len(store.todos)):
+            return f"Invalid position. Must be between 0 and {len(store.todos)} inclusive, or -1."
+
+        moved = store.reorder(todo_ids, new_position)
+        return f"Reordered todos to position {new_position}: {', '.join([todo['id'] for todo in moved])}\n\n{list_todos_helper()}"
 
 @app.tool()
 def clear_todos():
     """Clear all todo items"""
-    save_todos([])
-    return list_todos_helper()
+    with store.transaction():
+        store.clear()
+        return list_todos_helper()
 
 @app.tool()
-def list_todos():
-    """List all todo items"""
-    return list_todos_helper()
+def list_todos(pending_only: bool = False, limit: Optional[int] = None, offset: int = 0):
+    """List todo items. Optionally only pending ones, and a page of `limit` items starting at `offset`."""
+    with store.transaction(write=False):
+        return format_todos(pending_only, limit, max(offset, 0))
 
 app.run()
@@ -1,5 +1,5 @@
-import asyncio
-from .otto import main as _async_main
-
 def main():
+    import asyncio
+    # Imported here so importing the package stays cheap and side-effect free
+    from .otto import main as _async_main
     asyncio.run(_async_main())
@@ -0,0 +1,746 @@
+import os
+import copy
+import json
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fastmcp.exceptions import ToolError
+
+from .config import load_config, load_system_prompt, load_mcp_servers, ConfigError
+from .utils import run_model, run_model_streaming, print_message, format_tools, print_tools, extract_tool_results, format_builtin_tools, format_tool_call, has_valid_tool_calls
+from .builtin_tools import BUILTIN_TOOLS
+from .dispatch import ToolDispatcher, BUILTIN_SERVER
+from .compaction import ContextCompactor
+from .tool_cache import ToolResultCache
+from .lazy_mcp import LazyMCPClient, resolve_schema_cache_dir
+from .tool_router import ToolRouter, make_search_tools
+from .triggers import Triggers, FileWatcher
+from .endpoints import EndpointPool, RAW_BODY_SUPPORTED
+from .quotas import QuotaClient
+from .journal import Journal
+from .spill import ToolSpill, make_read_spill
+from .message_store import RequestEncoder
+from .telemetry import Tracer
+from .validation import ToolArgumentValidator, ArgumentError
+from .tool_registry import load_tool_modules, call_tool_function
+from .model_routing import ModelRouter
+from .delegation import make_delegate, PARENT_ONLY_TOOLS
+from .reload import ConfigWatcher, restart_required, DEFAULT_POLL_INTERVAL as DEFAULT_RELOAD_POLL_INTERVAL
+
+#TODO: use as default in config.py
+USER_PROMPT = "Execute your given tasks autonomously without any further user input. Use the built-in task completion tool when you are finished."
+NO_TOOL_CALL_PROMPT = "No tool call detected. Please ensure that your message contains a tool call and is properly formatted."
+
+class Agent:
+  """
+  One otto agent: its config, conversation, tools and model client.
+  Several agents can run concurrently on one event loop, sharing MCP server sessions through an MCPServerPool.
+  """
+  def __init__(self, config, name=None, pool=None, resume=False):
+    self.config = config
+    self.config_dir = config.get("_config_dir", ".")
+    self.name = name or config.get("name") or os.path.basename(self.config_dir)
+    # Set by the supervisor so interleaved output can be told apart
+    self.log_prefix = ""
+
+    self.model = config["client"]["model"]
+    self.context_length = config["client"]["context_length"]
+    self.max_tokens = config["client"].get("max_tokens", 256)
+    self.stream = config["client"].get("stream", False)
+    self.loop = config.get("loop", False)
+    self.apply_settings(config)
+    quotas = config.get("quotas", {}) or {}
+
+    self.messages = []
+    self.tools = []
+    # Names of the tools offered to the model; calls to anything else are refused
+    self.tool_names = set()
+    # Opened in run(), once the supervisor has settled the agent's name
+    self.journal = None
+    self.compactor = ContextCompactor(self.context_length, config.get("compaction", {}) or {})
+    self.endpoint_pool = EndpointPool(config["client"], self.log)
+    self.client = QuotaClient(self.endpoint_pool, quotas)
+    # Picks the model and max_tokens of each request (cheap model first, escalating on trouble)
+    self.model_router = ModelRouter(config["client"], config.get("model_routing", {}) or {})
+    # Encode each message once and reuse the bytes in every later request body
+    # Only with an openai SDK that can send a pre-encoded body
+    self.encoder = RequestEncoder() if config["client"].get("incremental_encoding", True) and RAW_BODY_SUPPORTED else None
+    max_concurrent_tools = quotas.get("max_concurrent_tool_calls")
+    self.tool_semaphore = asyncio.Semaphore(max_concurrent_tools) if max_concurrent_tools else None
+
+    self.system_prompt = load_system_prompt(config["system_prompts"], self.config_dir)
+    self.add_message(self.system_prompt, role="system")
+
+    #TODO: avoid `ValueError: No MCP servers defined in the config` if no mcp servers defined
+    mcp_servers_config = load_mcp_servers(config["mcp_servers"], self.config_dir)
+    mcp_startup = config.get("mcp_startup", {}) or {}
+    # With lazy startup servers are spawned on first use; tool schemas come from an on-disk cache
+    schema_cache_dir = resolve_schema_cache_dir(mcp_startup, self.config_dir)
+    self.mcp_client = LazyMCPClient(mcp_servers_config, schema_cache_dir, mcp_startup.get("refresh", True), pool, mcp_startup.get("lazy", False))
+    self.dispatcher = ToolDispatcher(mcp_servers_config["mcpServers"].keys(), config.get("tool_dispatch", {}) or {})
+    self.tool_cache = ToolResultCache(config.get("tool_cache", {}) or {})
+    # Catches malformed MCP tool arguments locally instead of after a round trip
+    self.arg_validator = ToolArgumentValidator(config.get("tool_validation", {}) or {})
+
+    self.builtin_tools = dict(BUILTIN_TOOLS)
+    self.tool_spill = ToolSpill(config.get("tool_spill", {}) or {}, self.config_dir)
+    if self.tool_spill.enabled:
+      self.builtin_tools["read_spill"] = make_read_spill(self.tool_spill.store)
+    self.tool_router = None
+    tool_routing = config.get("tool_routing", {}) or {}
+    if tool_routing.get("enabled", False):
+      # Tools are filled in by setup_tools once the MCP tool list is known
+      self.tool_router = ToolRouter([], [], tool_routing)
+      self.builtin_tools["search_tools"] = make_search_tools(self.tool_router)
+    # Python tool modules mounted in-process, called like the built-ins
+    self.builtin_tools.update(load_tool_modules(config.get("tool_modules"), self.config_dir))
+    delegation = config.get("delegation", {}) or {}
+    if delegation.get("enabled", False):
+      self.builtin_tools["delegate"] = make_delegate(self, delegation)
+
+    self.sampling_stats = {"rounds": 0, "failed_rounds": 0, "candidates": 0, "wasted_tokens": 0}
+    self.tracer = Tracer(config.get("telemetry", {}) or {}, self.name, self.config_dir)
+
+    self.journal_config = config.get("journal", {}) or {}
+    self.resume = resume
+    # Tool results recorded by a crashed session, replayed instead of calling the tool again
+    self.replay_results = {}
+    # Set in run() when loop mode hot-reloads the config
+    self.config_watcher = None
+
+  def apply_settings(self, config):
+    """Settings that can change between loop cycles without rebuilding anything."""
+    self.max_iters = config["max_iters"]
+    self.max_tools_per_iter = config["max_tools_per_iter"]
+    self.num_retries = config.get("num_retries", 10)
+    self.sleep_time = config.get("sleep_time", 60)
+    # Keep history byte-identical between requests; per-turn status goes in a trailing ephemeral message
+    self.stable_prefix = config.get("stable_prefix", False)
+    self.sampling = config.get("sampling", {}) or {}
+    self.user_prompt = config.get("user_prompt", USER_PROMPT)
+
+  def log(self, text):
+    print(f"{self.log_prefix}{text}")
+
+  def append_message(self, message):
+    self.messages.append(message)
+    if self.journal is not None:
+      self.journal.message(message)
+
+  def add_message(self, message, role="user"):
+    self.append_message({"role": role, "content": message})
+
+  def add_tool_message(self, tool_call_id, name, content):
+    self.append_message({"role": "tool", "tool_call_id": tool_call_id, "content": f"<tool_response name=\"{name}\">\n{content}\n"})
+
+  def reset(self):
+    """Start a fresh conversation, e.g. for the next loop cycle."""
+    self.messages.clear()
+    self.compactor.estimator.forget(self.messages)
+    self.model_router.reset()
+    if self.tool_router is not None:
+      self.tool_router.reset()
+    self.add_message(self.system_prompt, role="system")
+    if self.journal is not None:
+      self.journal.snapshot(self.messages, step=0)
+
+  def start_mcp_tool_call(self, batch, tool_call):
+    self.log(f"🔧 [MCP] {format_tool_call(tool_call.function.name, tool_call.function.arguments)}")
+    batch.submit(tool_call.function.name, tool_call, key=tool_call.id)
+
+  async def sample_tool_calls(self, request_messages, request_tools, model, max_tokens):
+    """
+    Request several candidate completions concurrently and return the first one with valid tool calls.
+    The other candidates are cancelled or discarded and never added to history.
+    Returns None if no candidate had valid tool calls.
+    """
+    num_candidates = self.sampling.get("candidates", 3)
+    tasks = [asyncio.create_task(run_model(self.client, model, request_messages, request_tools, max_tokens, self.encoder)) for _ in range(num_candidates)]
+    self.sampling_stats["rounds"] += 1
+    self.sampling_stats["candidates"] += num_candidates
+    chosen = None
+    error = None
+    try:
+      for next_done in asyncio.as_completed(tasks):
+        try:
+          result = await next_done
+        except Exception as e:
+          error = e
+          continue
+        if has_valid_tool_calls(result[1]):
+          chosen = result
+          break
+        self.sampling_stats["wasted_tokens"] += result[4]
+    finally:
+      for task in tasks:
+        task.cancel()
+    if chosen is None:
+      self.sampling_stats["failed_rounds"] += 1
+      if error is not None and all(task.done() and not task.cancelled() and task.exception() for task in tasks):
+        raise error
+    return chosen
+
+  async def get_tool_calls(self, status=None):
+    """
+    Get tool calls from the model, retrying if necessary.
+    `status` is sent as a trailing ephemeral user message that is never added to history.
+    Also returns the dispatch batch, which may already hold MCP calls started while streaming.
+    """
+    retry_count = 0
+    while retry_count <= self.num_retries:
+      status_messages = [{"role": "user", "content": status}] if status else []
+      request_tools = self.tools
+      if self.tool_router is not None:
+        request_tools, saved_tokens = self.tool_router.select(self.messages + status_messages)
+        self.log(f"🧭 Sending {len(request_tools)}/{len(self.tools)} tools (~{saved_tokens:,} tokens saved, ~{self.tool_router.tokens_saved:,} total)")
+      # Against the tools actually sent, like the calibration of the estimate below
+      with self.tracer.span("compaction") as span:
+        compacted = self.compactor.compact(self.messages, request_tools)
+        span.set(compacted=compacted is not None)
+      if compacted is not None:
+        self.log(f"🗜 Compacted context: ~{compacted[0]:,} → ~{compacted[1]:,} tokens")
+        if self.journal is not None:
+          self.journal.snapshot(self.messages)
+      request_messages = self.messages + status_messages if status else self.messages
+
+      # Only the cascade needs the estimate, and it costs a pass over the whole request
+      prompt_estimate = self.compactor.estimator.estimate(request_messages, request_tools) if len(self.model_router.tiers) > 1 else 0
+      model, max_tokens = self.model_router.select(self.messages, prompt_estimate, retry_count, self.log)
+      batch = self.dispatcher.batch(self.dispatch_tool_call)
+      retries_before = self.endpoint_pool.stats["retries"]
+      with self.tracer.span("model_request", model=model, max_tokens=max_tokens, attempt=retry_count, tools=len(request_tools)) as span:
+        if self.sampling.get("enabled", False):
+          # No early dispatch here: tool calls of losing candidates must never run
+          result = await self.sample_tool_calls(request_messages, request_tools, model, max_tokens) or (None, None, None, 0, 0, None, None)
+        elif self.stream:
+          def on_tool_call(index, tool_call):
+            # Start MCP tools as soon as their arguments are complete; built-ins run afterwards
+            if index < self.max_tools_per_iter and tool_call.function.name not in self.builtin_tools:
+              self.start_mcp_tool_call(batch, tool_call)
+          def on_first_token():
+            span.set(ttft=time.monotonic() - span.start)
+          try:
+            result = await run_model_streaming(self.client, model, request_messages, request_tools, max_tokens, on_tool_call, self.encoder, on_first_token)
+          except BaseException:
+            # Calls started from a broken stream never reach history, so a retry would repeat them
+            await batch.cancel()
+            raise
+        else:
+          result = await run_model(self.client, model, request_messages, request_tools, max_tokens, self.encoder)
+        content, tool_calls, reasoning_content, up_tokens, down_tokens, cached_tokens, finish_reason = result
+        self.model_router.record(model, time.monotonic() - span.start, up_tokens, down_tokens, finish_reason)
+        span.set(prompt_tokens=up_tokens, completion_tokens=down_tokens, cached_tokens=cached_tokens, tool_calls=len(tool_calls or []), retries=self.endpoint_pool.stats["retries"] - retries_before)
+      cached_str = f" / ⚡ {cached_tokens} cached" if cached_tokens is not None else ""
+      model_str = f" {model}" if len(self.model_router.tiers) > 1 else ""
+      self.log(f"⇄ API Request{model_str} [⬆ {up_tokens} / ⬇ {down_tokens}{cached_str}]")
+      if self.compactor.enabled or len(self.model_router.tiers) > 1:
+        # Only compaction and the model cascade use the estimate
+        self.compactor.estimator.calibrate(request_messages, request_tools, up_tokens)
+        # The cache holds its messages: drop the ephemeral status message and anything no longer in history
+        self.compactor.estimator.forget(self.messages)
+
+      tool_calls = tool_calls or []
+      if len(tool_calls) > 0:
+        return content, tool_calls, reasoning_content, up_tokens, down_tokens, batch
+
+      if retry_count < self.num_retries:
+        retry_count += 1
+        self.log(f"🔄 No tool calls detected. Retry {retry_count}/{self.num_retries}...")
+        if self.sampling.get("enabled", False):
+          # Failed candidates never reach history, so neither does the nag
+          status = f"{status}\n\n{NO_TOOL_CALL_PROMPT}" if status else NO_TOOL_CALL_PROMPT
+        elif status:
+          # Keep the nag in the ephemeral slot so history stays stable
+          status = f"{status}\n\n{NO_TOOL_CALL_PROMPT}"
+        else:
+          self.add_message(NO_TOOL_CALL_PROMPT)
+      else:
+        self.log(f"✅ Agent completed (no more tools requested)")
+        self.log(f"\n⏹ Stopped: Agent finished (no more tools after {self.num_retries} retries)")
+        return None, None, None, 0, 0, None
+
+  async def dispatch_tool_call(self, tool_call):
+    """Run one call from a dispatch batch, in-process or on its MCP server, and journal its result."""
+    # Results recorded before a crash are replayed, whichever kind of tool produced them
+    if tool_call.id in self.replay_results:
+      self.log(f"↺ Replayed from journal: {tool_call.function.name}")
+      return self.replay_results.pop(tool_call.id)
+    if tool_call.function.name in self.builtin_tools:
+      result_content = await self.call_builtin_tool(tool_call)
+    else:
+      result_content = await self.call_mcp_tool(tool_call)
+    if self.journal is not None:
+      self.journal.tool_result(tool_call.id, result_content)
+    return result_content
+
+  async def call_mcp_tool(self, tool_call):
+    """Call a single MCP tool and return its result content (or a ToolError string)."""
+    if self.tool_semaphore is None:
+      return await self._call_mcp_tool(tool_call)
+    async with self.tool_semaphore:
+      return await self._call_mcp_tool(tool_call)
+
+  async def _call_mcp_tool(self, tool_call):
+    return self.tool_spill.apply(tool_call.function.name, await self._invoke_mcp_tool(tool_call))
+
+  async def _invoke_mcp_tool(self, tool_call):
+    tool_cache = self.tool_cache
+    try:
+      # Parse arguments from JSON string to dictionary
+      # OpenAI returns arguments as a JSON string, but MCP client expects a dict
+      arguments = json.loads(tool_call.function.arguments) if isinstance(tool_call.function.arguments, str) else tool_call.function.arguments
+      name = tool_call.function.name
+      if name not in self.tool_names:
+        raise ValueError(f"Tool {name} is not available")
+      arguments = self.arg_validator.validate(name, arguments)
+      cacheable = tool_cache.is_cacheable(name)
+      if cacheable:
+        cached = tool_cache.get(name, arguments)
+        if cached is not None:
+          self.log(f"🗃 Cache hit: {name}")
+          return cached
+        generation = tool_cache.generation
+      else:
+        tool_cache.invalidate_for(name)
+      try:
+        with self.tracer.span("tool_call", tool=name, server=self.mcp_client.server_for_tool(name)):
+          tool_result = await self.mcp_client.call_tool(name, arguments)
+      finally:
+        if not cacheable:
+          # Invalidate again so reads that overlapped the write don't leave stale entries
+          tool_cache.invalidate_for(name)
+      # Extract content from result objects - only TextContent is allowed
+      result_content = extract_tool_results(tool_result)
+      if cacheable:
+        tool_cache.put(name, arguments, result_content, generation)
+      return result_content
+    except ArgumentError as e:
+      self.tracer.metrics.inc("otto_tool_argument_errors_total", {"agent": self.name, "tool": tool_call.function.name})
+      self.log(f"❌ Rejected before dispatch: {e}")
+      return f"ToolError: {str(e)}"
+    except (ToolError, ValueError, json.JSONDecodeError) as e:
+      self.log(f"❌ Tool error: {e}")
+      return f"ToolError: {str(e)}"
+
+  async def append_message_and_call_tools(self, content, reasoning_content, tool_calls, batch=None):
+    tool_calls = tool_calls or []
+
+    # Log reasoning content (thought bubble) if present
+    if reasoning_content and reasoning_content.strip():
+      self.log(f"💭 Agent reasoning:")
+      for line in reasoning_content.strip().split('\n'):
+        if line.strip():
+          self.log(f"   {line}")
+
+    # Log content (speech bubble) if present
+    if content and content.strip():
+      self.log(f"� Agent response:")
+      for line in content.strip().split('\n'):
+        if line.strip():
+          self.log(f"   {line}")
+
+    # Always add assistant message when there are tool calls
+    # This is required by the OpenAI API - tool messages must follow an assistant message with tool_calls
+    if len(tool_calls) > 0:
+      assistant_msg = {"role": "assistant", "content": content or ""}
+      # Add tool_calls to the assistant message
+      assistant_msg["tool_calls"] = [
+        {
+          "id": tc.id,
+          "type": "function",
+          "function": {"name": tc.function.name, "arguments": tc.function.arguments}
+        }
+        for tc in tool_calls
+      ]
+      self.append_message(assistant_msg)
+    elif content is not None and content.strip() != "":
+      # No tool calls, just add content if present
+      self.add_message(content, role="assistant")
+
+    await self.call_tools(tool_calls, batch)
+
+  async def call_tools(self, tool_calls, batch=None):
+    """Run the tool calls of the latest assistant message and append their results."""
+    if len(tool_calls) > self.max_tools_per_iter:
+      self.log(f"⚠ Limiting tool execution to {self.max_tools_per_iter} of {len(tool_calls)} requested tools")
+
+    tool_calls = tool_calls[:self.max_tools_per_iter]
+
+    # Check for built-in tools first (like complete_task)
+    built_in_tool_calls = []
+    mcp_tool_calls = []
+
+    for tool_call in tool_calls:
+      if tool_call.function.name in self.builtin_tools:
+        built_in_tool_calls.append(tool_call)
+      else:
+        mcp_tool_calls.append(tool_call)
+
+    # Handle MCP tools
+    # Calls may already have been started while the response was streaming
+    batch = batch or self.dispatcher.batch(self.dispatch_tool_call)
+    for tool_call in mcp_tool_calls:
+      if tool_call.id not in batch.started:
+        self.start_mcp_tool_call(batch, tool_call)
+    # In-process tools go through the same batch, so `serialized` and concurrent dispatch apply to them too
+    for tool_call in built_in_tool_calls:
+      self.log(f"🔧 [Built-in] {format_tool_call(tool_call.function.name, tool_call.function.arguments)}")
+      batch.submit(tool_call.function.name, tool_call, key=tool_call.id, server=BUILTIN_SERVER)
+
+    try:
+      for tool_call in built_in_tool_calls:
+        result_content = await batch.started[tool_call.id]
+        self.add_tool_message(tool_call.id, tool_call.function.name, result_content)
+
+      # Append in the original tool_calls order so the conversation is unchanged
+      for tool_call in mcp_tool_calls:
+        result_content = await batch.started[tool_call.id]
+        self.add_tool_message(tool_call.id, tool_call.function.name, result_content)
+        # print_message(self.messages[-1])
+    except BaseException:
+      # E.g. a delegated sub-agent timing out: don't leave its tool calls running
+      await batch.cancel()
+      raise
+
+  async def call_builtin_tool(self, tool_call):
+    """Call a built-in or mounted module tool in-process and return its result content."""
+    name = tool_call.function.name
+    try:
+      # For built-in tools, we call the function directly
+      arguments = json.loads(tool_call.function.arguments) if tool_call.function.arguments else {}
+      arguments = self.arg_validator.validate(name, arguments)
+      with self.tracer.span("tool_call", tool=name, server="builtin"):
+        tool_result = await call_tool_function(self.builtin_tools[name], arguments)
+      result_content = tool_result if isinstance(tool_result, str) else json.dumps(tool_result, indent=2)
+    except ArgumentError as e:
+      self.tracer.metrics.inc("otto_tool_argument_errors_total", {"agent": self.name, "tool": name})
+      self.log(f"❌ Rejected before dispatch: {e}")
+      return f"ToolError: {str(e)}"
+    except Exception as e:
+      self.log(f"❌ {name}: {e}")
+      return f"ToolError: {str(e)}"
+    # Spilling read_spill's own output would only point at another spill
+    if name == "read_spill":
+      return result_content
+    return self.tool_spill.apply(name, result_content)
+
+  async def resume_session(self):
+    """
+    Restore the conversation from the journal and finish the turn that was interrupted,
+    replaying recorded tool results. Returns (steps, stopped); stopped is None if the session continues.
+    """
+    state = self.journal.load()
+    self.journal.open()
+    if state is None:
+      self.log(f"📓 Nothing to resume in {self.journal.path}, starting a new session")
+      self.journal.snapshot(self.messages, step=0)
+      return 0, None
+    self.messages[:] = state["messages"]
+    steps = state["step"]
+    self.log(f"📓 Resumed session from {self.journal.path} ({len(self.messages)} messages, {steps} steps)")
+    if not state["open_turn"]:
+      return steps, None
+
+    assistant_index = max(i for i, message in enumerate(self.messages) if message.get("tool_calls"))
+    answered = {message.get("tool_call_id") for message in self.messages[assistant_index + 1:]}
+    tool_calls = [
+      SimpleNamespace(id=tc["id"], type="function", function=SimpleNamespace(name=tc["function"]["name"], arguments=tc["function"]["arguments"]))
+      for tc in self.messages[assistant_index]["tool_calls"][:self.max_tools_per_iter]
+    ]
+    pending = [tc for tc in tool_calls if tc.id not in answered]
+    self.replay_results = {tc.id: state["tool_results"][tc.id] for tc in pending if tc.id in state["tool_results"]}
+    self.log(f"↺ Finishing interrupted turn: {len(pending)} tool calls ({len(self.replay_results)} recorded in the journal)")
+    await self.call_tools(pending)
+    self.replay_results = {}
+    steps += 1
+    self.journal.end_step(steps, self.messages)
+
+    if any(tc.function.name == "sleep" for tc in tool_calls):
+      return steps, "sleep"
+    if steps >= self.max_iters:
+      return steps, "max_iters"
+    return steps, None
+
+  async def agent_loop(self, resume=False):
+    """Run one session. Returns a dict with the number of steps taken and why it stopped."""
+    self.log(f"🚀 Starting agent loop (max steps: {self.max_iters}, max retries: {self.num_retries})")
+
+    steps = 0
+    current_tokens = 0
+    stopped = None
+    self.tracer.new_trace()
+    if resume:
+      steps, stopped = await self.resume_session()
+
+    while stopped is None:
+      iteration = self.tracer.start_span("iteration", step=steps + 1)
+      # Add user prompt with context information before each iteration
+      if steps == 0:
+        # First iteration - no token info yet
+        status = f"Iteration: {steps + 1}/{self.max_iters}"
+      else:
+        # Subsequent iterations - include token usage
+        context_pct = int((current_tokens / self.context_length) * 100)
+        status = f"Iteration: {steps + 1}/{self.max_iters} | Context: {current_tokens:,}/{self.context_length:,} tokens ({context_pct}%)"
+
+      if self.stable_prefix:
+        # The task prompt goes into history once; status only ever lives in the trailing slot
+        if steps == 0:
+          self.add_message(self.user_prompt, role="user")
+        result = await self.get_tool_calls(status)
+      else:
+        self.add_message(f"{self.user_prompt}\n\n{status}", role="user")
+        result = await self.get_tool_calls()
+      content, tool_calls, reasoning_content, up_tokens, down_tokens, batch = result
+      if tool_calls is None:
+        stopped = "no_tool_calls"
+        self.tracer.end_span(iteration)
+        break
+
+      current_tokens = up_tokens
+
+      await self.append_message_and_call_tools(content, reasoning_content, tool_calls, batch)
+      steps += 1
+      if self.journal is not None:
+        self.journal.end_step(steps, self.messages)
+
+      # Show iteration counter
+      context_pct = int((current_tokens / self.context_length) * 100)
+      self.log(f"📊 Iteration {steps}/{self.max_iters} | Context: {current_tokens:,}/{self.context_length:,} tokens ({context_pct}%)")
+
+      if any(tool_call.function.name == "sleep" for tool_call in tool_calls):
+        self.log(f"✅ Agent completed (sleep called)")
+        stopped = "sleep"
+      elif steps >= self.max_iters:
+        self.log(f"\n⏹ Stopped: Reached max steps ({self.max_iters})")
+        stopped = "max_iters"
+      self.tracer.end_span(iteration)
+
+    if len(self.model_router.tiers) > 1 or self.model_router.adaptive:
+      for line in self.model_router.report():
+        self.log(f"🪜 {line}")
+    if self.sampling.get("enabled", False):
+      stats = self.sampling_stats
+      self.log(f"🎲 Sampling: {stats['rounds']} rounds, {stats['failed_rounds']} retried, {stats['candidates']} candidates, ⬇ {stats['wasted_tokens']} wasted tokens")
+
+    if self.tool_cache.tools:
+      stats = self.tool_cache.stats()
+      self.log(f"🗃 Tool cache: {stats['hits']} hits / {stats['misses']} misses ({stats['hits']} round trips saved, {stats['invalidations']} invalidated)")
+
+    if self.arg_validator.stats["checked"]:
+      stats = self.arg_validator.stats
+      self.log(f"🧪 Argument checks: {stats['checked']} calls in {1000 * stats['seconds']:.1f} ms, {stats['rejected']} rejected before dispatch ({stats['rejected']} round trips saved), {stats['coerced']} coerced")
+
+    if self.tool_spill.stats["spilled"]:
+      stats = self.tool_spill.stats
+      self.log(f"📦 Spilled {stats['spilled']} oversized tool results (~{stats['tokens_saved']:,} tokens kept out of context)")
+
+    if self.journal is not None:
+      self.journal.done()
+
+    return {"steps": steps, "stopped": stopped}
+
+  def setup_tools(self, mcp_tools, strict=True):
+    mcp_tools = format_tools(mcp_tools)
+    builtin_tools = format_builtin_tools(self.builtin_tools)
+
+    available_mcp_tool_names = {tool["function"]["name"] for tool in mcp_tools}
+    shadowed = available_mcp_tool_names & set(self.builtin_tools)
+    if shadowed:
+      self.log(f"⚠ Built-in tools shadow MCP tools of the same name: {', '.join(sorted(shadowed))}")
+    allowed_mcp_tool_names = self.config.get("tools", []) or [] #handle cases where it's just `tools:`
+    total_mcp_tool_count = len(mcp_tools)
+
+    allowed_mcp_tools = [tool for tool in mcp_tools if tool["function"]["name"] in allowed_mcp_tool_names]
+    disallowed_mcp_tools = [tool for tool in mcp_tools if tool["function"]["name"] not in allowed_mcp_tool_names]
+    allowed_mcp_tool_count = len(allowed_mcp_tools)
+
+    missing_tools = set(allowed_mcp_tool_names) - available_mcp_tool_names
+
+    if missing_tools:
+      self.log(f"❌ Error: The following tools in config were not found: {', '.join(missing_tools)}")
+      if strict:
+        # Not sys.exit: under the supervisor or a worker that would take every other agent down too
+        raise ConfigError(f"Tools in config not found: {', '.join(sorted(missing_tools))}")
+      # On a hot reload, keep running with the tools that do exist
+      self.log("Skipping them until the config is fixed")
+
+    self.log(f"🔒 Allowing {allowed_mcp_tool_count} of {total_mcp_tool_count} tools:")
+    print_tools(allowed_mcp_tools, disallowed_mcp_tools)
+
+    self.tools = allowed_mcp_tools + builtin_tools
+    self.tool_names = {tool["function"]["name"] for tool in self.tools}
+    self.arg_validator.set_tools(allowed_mcp_tools + builtin_tools)
+    if self.tool_router is not None:
+      self.tool_router.set_tools(self.tools)
+      self.tool_router.builtin_names = set(self.builtin_tools)
+    return self.tools
+
+  def delegable_tools(self):
+    """Names of the tools a `delegate` sub-agent may be given."""
+    return self.tool_names - PARENT_ONLY_TOOLS
+
+  def make_child(self, name, system_prompt, task, tool_names, max_iters, sleep):
+    """
+    A sub-agent for `delegate`, with fresh messages and its own subset of tools.
+    It shares MCP servers, dispatch, the tool cache and spill store and the model client with this agent.
+    """
+    child = copy.copy(self)
+    child.name = f"{self.name}/{name}"
+    child.log_prefix = f"{self.log_prefix}[{name}] "
+    child.loop = False
+    child.journal = None
+    child.replay_results = {}
+    child.config_watcher = None
+    child.tool_router = None
+    child.max_iters = max_iters
+    child.system_prompt = system_prompt
+    child.user_prompt = task
+    child.messages = []
+    child.sampling_stats = {key: 0 for key in self.sampling_stats}
+    child.compactor = ContextCompactor(self.context_length, self.config.get("compaction", {}) or {})
+    child.encoder = RequestEncoder() if self.encoder is not None else None
+    child.model_router = ModelRouter(self.config["client"], self.config.get("model_routing", {}) or {})
+    child.tracer = copy.copy(self.tracer)
+    child.tracer.iteration = None
+
+    selected = set(tool_names) if tool_names else self.delegable_tools()
+    child.builtin_tools = {tool_name: fn for tool_name, fn in self.builtin_tools.items() if tool_name in selected or tool_name == "read_spill"}
+    child.builtin_tools["sleep"] = sleep
+    mcp_tools = [tool for tool in self.tools if tool["function"]["name"] in selected and tool["function"]["name"] not in self.builtin_tools]
+    child.tools = mcp_tools + format_builtin_tools(child.builtin_tools)
+    child.tool_names = {tool["function"]["name"] for tool in child.tools}
+    child.arg_validator = ToolArgumentValidator(self.config.get("tool_validation", {}) or {})
+    child.arg_validator.set_tools(child.tools)
+    child.reset()
+    return child
+
+  def reload_wakes(self):
+    return (self.config.get("hot_reload", {}) or {}).get("wake", True)
+
+  def make_triggers(self):
+    triggers = Triggers(self.config.get("triggers", {}) or {}, self.probe_tool, self.config_dir)
+    if self.config_watcher is not None and self.reload_wakes():
+      # Wake the loop as soon as the config changes, so it's reloaded right away
+      poll_interval = (self.config.get("hot_reload", {}) or {}).get("poll_interval", DEFAULT_RELOAD_POLL_INTERVAL)
+      triggers.sources.append(FileWatcher(triggers.wakeup, self.config_watcher.paths, poll_interval))
+    return triggers
+
+  async def probe_tool(self, name, arguments):
+    """Call an MCP tool for a trigger probe, bypassing the result cache."""
+    return extract_tool_results(await self.mcp_client.call_tool(name, arguments))
+
+  async def reload_config(self):
+    """
+    Reload the config files and apply them in place between loop cycles.
+    Returns the sections that changed, or None if the new config could not be loaded.
+    """
+    start = time.monotonic()
+    try:
+      config = load_config(self.config["_config_path"])
+      system_prompt = load_system_prompt(config["system_prompts"], self.config_dir)
+      mcp_servers_config = load_mcp_servers(config["mcp_servers"], self.config_dir)
+    except Exception as e:
+      self.log(f"❌ Config reload failed, keeping the current config: {e}")
+      self.config_watcher.arm()
+      return None
+    sections = {key for key in config.keys() | self.config.keys() if not key.startswith("_") and config.get(key) != self.config.get(key)}
+
+    old_servers_config = {"mcpServers": self.mcp_client.servers}
+    servers_updated = False
+    try:
+      # Doesn't change the server set if a new server fails to start
+      added, removed, changed = await self.mcp_client.update_servers(mcp_servers_config)
+      servers_updated = True
+      servers_changed = bool(added or removed or changed)
+      mcp_tools = await self.mcp_client.list_tools() if servers_changed or "tools" in sections else None
+    except Exception as e:
+      self.log(f"❌ Config reload failed, keeping the current config: {e}")
+      if servers_updated:
+        # Listing the new servers' tools failed: go back to the old server set
+        try:
+          await self.mcp_client.update_servers(old_servers_config)
+        except Exception as rollback_error:
+          self.log(f"❌ Could not restore the previous MCP servers: {rollback_error}")
+      self.config_watcher.arm()
+      return None
+    old_config = self.config
+    self.config = config
+    self.config_watcher.update(config)
+
+    if mcp_tools is not None:
+      self.setup_tools(mcp_tools, strict=False)
+    if servers_changed or "tool_dispatch" in sections:
+      self.dispatcher = ToolDispatcher(mcp_servers_config["mcpServers"].keys(), config.get("tool_dispatch", {}) or {})
+    if "model_routing" in sections:
+      self.model_router = ModelRouter(config["client"], config.get("model_routing", {}) or {})
+    if servers_changed or "tool_cache" in sections:
+      # Results from a replaced server may no longer hold
+      self.tool_cache = ToolResultCache(config.get("tool_cache", {}) or {})
+    # Takes effect with the next reset()
+    self.system_prompt = system_prompt
+    self.apply_settings(config)
+
+    elapsed = 1000 * (time.monotonic() - start)
+    servers = ", ".join([f"+{name}" for name in added] + [f"-{name}" for name in removed] + [f"~{name}" for name in changed])
+    self.log(f"♻ Reloaded config in {elapsed:.0f} ms" + (f" (MCP servers: {servers})" if servers else ""))
+    pending = restart_required(old_config, config)
+    if pending:
+      self.log(f"⚠ Changes to {', '.join(pending)} need a restart to apply")
+    return sections
+
+  async def run(self):
+    """Set up tools and run agent loops until done. Returns the result of the last loop."""
+    self.log("🔌 Initializing MCP client...")
+    self.tracer.agent_name = self.name
+    self.tracer.start()
+    async with self.mcp_client:
+      self.log(f"📋 Fetching available tools from MCP servers...")
+      mcp_tools = await self.mcp_client.list_tools()
+      self.setup_tools(mcp_tools)
+
+      if self.resume or self.journal_config.get("enabled", False):
+        journal_path = os.path.join(self.config_dir, self.journal_config.get("path", f"{self.name}.journal.jsonl"))
+        self.journal = Journal(journal_path, self.journal_config)
+        if not self.resume:
+          self.journal.open()
+          self.journal.snapshot(self.messages, step=0)
+
+      hot_reload = self.config.get("hot_reload", {}) or {}
+      if self.loop and hot_reload.get("enabled", True) and "_config_path" in self.config:
+        self.config_watcher = ConfigWatcher(self.config)
+      triggers = self.make_triggers()
+      if self.loop:
+        triggers.start()
+
+      resume = self.resume
+      try:
+        while True:
+          result = await self.agent_loop(resume)
+          resume = False
+          if not self.loop:
+            break
+          # sleep_time is the fallback max interval when trigger sources are configured
+          if self.config_watcher is not None and self.reload_wakes() and self.config_watcher.changed():
+            # Edited while the loop was running; the file watcher only sees changes made during the wait
+            reason = "config changed"
+          else:
+            self.log(f"💤 Waiting up to {self.sleep_time} seconds for a wakeup before next loop...")
+            reason = await triggers.wait(self.sleep_time)
+          self.log(f"⏰ Woke up ({reason})")
+          if self.config_watcher is not None and self.config_watcher.changed():
+            sections = await self.reload_config()
+            if sections and sections & {"triggers", "hot_reload", "system_prompts", "mcp_servers"}:
+              # Rebuilt so watched paths and probes follow the new config
+              triggers.stop()
+              triggers = self.make_triggers()
+              triggers.start()
+          # Reset messages for next loop
+          self.reset()
+      finally:
+        triggers.stop()
+        if self.journal is not None:
+          self.journal.close()
+        self.tracer.stop()
+      return result
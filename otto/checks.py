@@ -0,0 +1,111 @@
+"""
+Fast, offline config checks behind `otto check-config` and `otto list-tools`.
+
+Neither starts the model client. Tool schemas come from the on-disk schema
+cache (see lazy_mcp), so no MCP server is spawned unless `--live` is given;
+only then are fastmcp and mcp imported.
+"""
+
+import os
+
+from .config import load_config, load_mcp_servers
+from .lazy_mcp import resolve_schema_cache_dir, schema_cache_path, read_schema_cache
+
+REQUIRED_KEYS = ["system_prompts", "mcp_servers", "max_iters"]
+REQUIRED_CLIENT_KEYS = ["model", "context_length"]
+
+def public_tool_name(server, tool_name, prefixed):
+  return f"{server}_{tool_name}" if prefixed else tool_name
+
+def cached_tools(config, servers):
+  """
+  Map server name -> list of tool dicts (name already public) from the schema cache,
+  or None for servers without a cache entry.
+  """
+  schema_cache_dir = resolve_schema_cache_dir(config.get("mcp_startup"), config["_config_dir"])
+  prefixed = len(servers) > 1
+  tools = {}
+  for name, server_config in servers.items():
+    cached = read_schema_cache(schema_cache_path(schema_cache_dir, name, server_config))
+    tools[name] = None if cached is None else [
+      {**tool, "name": public_tool_name(name, tool["name"], prefixed)} for tool in cached
+    ]
+  return tools
+
+async def live_tools(config, servers):
+  from .lazy_mcp import LazyMCPClient
+  schema_cache_dir = resolve_schema_cache_dir(config.get("mcp_startup"), config["_config_dir"])
+  client = LazyMCPClient({"mcpServers": servers}, schema_cache_dir, lazy=False)
+  tools = {name: [] for name in servers}
+  async with client:
+    for tool in await client.list_tools():
+      tools[client.server_for_tool(tool.name)].append(tool.model_dump(mode="json", exclude_none=True))
+  return tools
+
+def check_config(path):
+  """Validate a config file without starting anything. Returns (errors, warnings)."""
+  errors = []
+  warnings = []
+  if not os.path.exists(path):
+    return ["file not found"], warnings
+  try:
+    config = load_config(path)
+  except Exception as e:
+    return [f"could not parse: {e}"], warnings
+  if not isinstance(config, dict):
+    return ["expected a mapping at the top level"], warnings
+  base_dir = config["_config_dir"]
+
+  for key in REQUIRED_KEYS:
+    if key not in config:
+      errors.append(f"missing `{key}`")
+  client = config.get("client") or {}
+  for key in REQUIRED_CLIENT_KEYS:
+    if key not in client:
+      errors.append(f"missing `client.{key}`")
+
+  for filename in config.get("system_prompts") or []:
+    if not os.path.exists(os.path.join(base_dir, filename)):
+      errors.append(f"system prompt not found: {filename}")
+
+  servers = {}
+  try:
+    servers = load_mcp_servers(config.get("mcp_servers"), base_dir)["mcpServers"]
+  except (OSError, ValueError, KeyError) as e:
+    errors.append(f"could not load MCP server definitions: {e}")
+  if not servers and not errors:
+    errors.append("no MCP servers defined")
+
+  if config.get("tool_modules"):
+    from .tool_registry import load_tool_modules
+    try:
+      load_tool_modules(config["tool_modules"], base_dir)
+    except Exception as e:
+      errors.append(f"could not mount tool modules: {e}")
+
+  allowed = config.get("tools", []) or []
+  tools = cached_tools(config, servers) if servers else {}
+  uncached = [name for name, server_tools in tools.items() if server_tools is None]
+  if uncached:
+    warnings.append(f"tool names not verified for {', '.join(uncached)}: no cached schemas (run `otto list-tools --live` once)")
+  else:
+    available = {tool["name"] for server_tools in tools.values() for tool in server_tools}
+    missing = [name for name in allowed if name not in available]
+    if missing:
+      errors.append(f"tools not found in cached schemas: {', '.join(missing)}")
+  return errors, warnings
+
+async def list_tools(path, live=False):
+  config = load_config(path)
+  servers = load_mcp_servers(config.get("mcp_servers"), config["_config_dir"])["mcpServers"]
+  tools = await live_tools(config, servers) if live else cached_tools(config, servers)
+  allowed = set(config.get("tools", []) or [])
+  for server, server_tools in tools.items():
+    if server_tools is None:
+      print(f"{server}: no cached schemas (run with --live to start the server and fetch them)")
+      continue
+    print(f"{server}: {len(server_tools)} tools")
+    for tool in server_tools:
+      mark = "✓" if tool["name"] in allowed else "✗"
+      description = (tool.get("description") or "").strip().split("\n")[0]
+      print(f"  {mark} {tool['name']}" + (f" - {description}" if description else ""))
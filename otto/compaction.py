@@ -0,0 +1,168 @@
+"""
+Token-budgeted context compaction.
+
+Keeps a cheap local token estimate per message and, once the estimated prompt
+crosses a high watermark of the context length, shrinks history until it is
+under a low watermark:
+  1. old tool responses are replaced with a short head/tail summary
+  2. if that is not enough, whole old turns are dropped (user messages, the
+     assistant tool calls and their tool responses go together, so pairing stays valid)
+The system prompt, the first user message and the most recent messages are never touched.
+"""
+
+import json
+
+# Rough average for English text / JSON with BPE tokenizers
+CHARS_PER_TOKEN = 4
+# Per-message overhead for role/formatting tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+DEFAULT_HIGH_WATERMARK = 0.8
+DEFAULT_LOW_WATERMARK = 0.6
+DEFAULT_KEEP_RECENT = 6
+DEFAULT_TOOL_RESPONSE_CHARS = 200
+
+COMPACTED_MARKER = "[compacted:"
+# Written by otto.spill; the line carrying it holds the spill handle and survives compaction
+SPILL_MARKER = "[spilled:"
+
+def estimate_text_tokens(text):
+  return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def estimate_message_tokens(message):
+  tokens = MESSAGE_OVERHEAD_TOKENS
+  content = message.get("content")
+  if isinstance(content, str):
+    tokens += estimate_text_tokens(content)
+  elif content is not None:
+    tokens += estimate_text_tokens(json.dumps(content))
+  if message.get("tool_calls"):
+    tokens += estimate_text_tokens(json.dumps(message["tool_calls"]))
+  return tokens
+
+class TokenEstimator:
+  """
+  Incremental token estimator. Each message is measured once and cached;
+  the estimate is scaled by a factor calibrated against real usage from the API.
+  """
+  def __init__(self):
+    self._cache = {}
+    self._tools_cache = (None, 0)
+    self.scale = 1.0
+
+  def message_tokens(self, message):
+    key = id(message)
+    cached = self._cache.get(key)
+    # Keep a reference to the message so its id can't be reused while cached
+    if cached is None or cached[0] is not message:
+      cached = (message, estimate_message_tokens(message))
+      self._cache[key] = cached
+    return cached[1]
+
+  def raw_estimate(self, messages, tools=None):
+    total = sum(self.message_tokens(m) for m in messages)
+    if tools:
+      if self._tools_cache[0] is not tools:
+        self._tools_cache = (tools, estimate_text_tokens(json.dumps(tools)))
+      total += self._tools_cache[1]
+    return total
+
+  def estimate(self, messages, tools=None):
+    return int(self.raw_estimate(messages, tools) * self.scale)
+
+  def calibrate(self, messages, tools, actual_tokens):
+    """Update the scale factor from the prompt token count the API reported."""
+    raw = self.raw_estimate(messages, tools)
+    if raw > 0 and actual_tokens > 0:
+      self.scale = actual_tokens / raw
+
+  def forget(self, messages):
+    """Drop cache entries for messages no longer in the history."""
+    live = {id(m) for m in messages}
+    self._cache = {k: v for k, v in self._cache.items() if k in live}
+
+def summarize_tool_response(message, max_chars):
+  content = message.get("content") or ""
+  if COMPACTED_MARKER in content or len(content) <= max_chars:
+    return None
+  head = content[:max_chars // 2]
+  tail = content[-(max_chars // 2):]
+  omitted = len(content) - len(head) - len(tail)
+  notes = [f"{COMPACTED_MARKER} {omitted} characters of this old tool response omitted]"]
+  # Keep the spill handle so the full result stays reachable
+  notes += [line for line in content.split("\n") if SPILL_MARKER in line][:1]
+  summary = "\n".join([head, *notes, tail])
+  return {**message, "content": summary}
+
+def split_turns(messages):
+  """
+  Split droppable messages into turns: optional user messages, then an assistant message and its tool responses.
+  System messages and the first user message (the task prompt) are pinned and never part of a turn.
+  """
+  turns = []
+  pinned_user = False
+  previous_role = None
+  for index, message in enumerate(messages):
+    role = message["role"]
+    if role == "system":
+      continue
+    if role == "user" and not pinned_user:
+      pinned_user = True
+      continue
+    starts_turn = role == "user" and previous_role != "user"
+    starts_turn = starts_turn or (role == "assistant" and previous_role != "user")
+    if starts_turn or not turns:
+      turns.append([])
+    turns[-1].append(index)
+    previous_role = role
+  return turns
+
+class ContextCompactor:
+  def __init__(self, context_length, compaction_config=None):
+    compaction_config = compaction_config or {}
+    self.enabled = compaction_config.get("enabled", False)
+    self.context_length = context_length
+    self.high_watermark = compaction_config.get("high_watermark", DEFAULT_HIGH_WATERMARK)
+    self.low_watermark = compaction_config.get("low_watermark", DEFAULT_LOW_WATERMARK)
+    self.keep_recent = compaction_config.get("keep_recent", DEFAULT_KEEP_RECENT)
+    self.tool_response_chars = compaction_config.get("tool_response_chars", DEFAULT_TOOL_RESPONSE_CHARS)
+    self.estimator = TokenEstimator()
+
+  def compact(self, messages, tools=None):
+    """
+    Compact `messages` in place if the estimate crosses the high watermark.
+    Returns (tokens_before, tokens_after), or None if nothing was done.
+    """
+    if not self.enabled:
+      return None
+    before = self.estimator.estimate(messages, tools)
+    if before <= self.high_watermark * self.context_length:
+      return None
+    target = self.low_watermark * self.context_length
+    protected_from = max(len(messages) - self.keep_recent, 0)
+
+    # Pass 1: summarize old tool responses, oldest first
+    for index in range(protected_from):
+      if messages[index]["role"] != "tool":
+        continue
+      summarized = summarize_tool_response(messages[index], self.tool_response_chars)
+      if summarized is not None:
+        messages[index] = summarized
+        if self.estimator.estimate(messages, tools) <= target:
+          break
+
+    # Pass 2: drop whole old turns, oldest first, never the turn holding the protected tail
+    if self.estimator.estimate(messages, tools) > target:
+      drop = set()
+      for turn in split_turns(messages):
+        if turn[-1] >= protected_from:
+          break
+        drop.update(turn)
+        remaining = [m for i, m in enumerate(messages) if i not in drop]
+        if self.estimator.estimate(remaining, tools) <= target:
+          break
+      if drop:
+        messages[:] = [m for i, m in enumerate(messages) if i not in drop]
+
+    self.estimator.forget(messages)
+    return before, self.estimator.estimate(messages, tools)
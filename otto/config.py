@@ -6,6 +6,9 @@ from dotenv import load_dotenv
 
 DEFAULT_MAX_TOOLS_PER_ITER = 1
 
+class ConfigError(ValueError):
+  """The config refers to something that doesn't exist. The CLI turns it into exit code 1."""
+
 def expand_env_vars(text):
   """
   Expand environment variables in text using ${VAR} or $VAR syntax.
@@ -42,6 +45,8 @@ def load_config(path="otto.yaml"):
   
   # Store config directory for resolving relative paths
   config["_config_dir"] = config_dir
+  # Kept so loop mode can reload the config in place
+  config["_config_path"] = os.path.abspath(path)
   return config
   
 def load_system_prompt(prompt_files, base_dir="."):
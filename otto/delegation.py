@@ -0,0 +1,129 @@
+"""
+The `delegate` built-in: hand independent subtasks to child agent loops.
+
+Each child starts from fresh messages (a short system prompt and its task),
+sees only the tools it was given and stops after `max_iters` steps. Children
+share the parent's MCP servers, dispatcher, tool cache and model client, run
+concurrently (up to `max_concurrency` at once), and finish by calling their
+own `sleep(summary)`. Only those summaries go back into the parent's context,
+so the parent stays small while subtasks run in parallel.
+"""
+
+import asyncio
+import time
+
+DEFAULT_MAX_ITERS = 10
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_TASKS = 8
+DEFAULT_MAX_SUMMARY_CHARS = 2000
+
+CHILD_SYSTEM_PROMPT = (
+  "You are a sub-agent working on one task delegated by another agent. "
+  "Work only on that task, using the tools you have. When you are done, or cannot make progress, "
+  "call `sleep` with a compact summary of what you did and found: the other agent only sees that summary."
+)
+
+# Built-ins a child never gets: no nested delegation, and the full tool list is the parent's to search
+PARENT_ONLY_TOOLS = {"delegate", "search_tools", "sleep"}
+
+def make_child_sleep():
+  """A `sleep` that also hands the child's summary back."""
+  report = {}
+  def sleep(summary: str):
+    """
+    Finish the delegated task.
+
+    Args:
+      summary: Compact summary of what was done and found, for the agent that delegated the task
+    """
+    report["summary"] = summary
+    return {"completed": True, "message": "Summary handed back. Exiting agent loop."}
+  return sleep, report
+
+def last_assistant_text(messages):
+  for message in reversed(messages):
+    if message.get("role") == "assistant" and (message.get("content") or "").strip():
+      return message["content"].strip()
+  return None
+
+def make_delegate(agent, delegation_config=None):
+  """Create the `delegate` built-in for `agent`."""
+  delegation_config = delegation_config or {}
+  default_max_iters = delegation_config.get("max_iters", DEFAULT_MAX_ITERS)
+  max_tasks = delegation_config.get("max_tasks", DEFAULT_MAX_TASKS)
+  max_summary_chars = delegation_config.get("max_summary_chars", DEFAULT_MAX_SUMMARY_CHARS)
+  timeout = delegation_config.get("timeout")
+  system_prompt = delegation_config.get("system_prompt", CHILD_SYSTEM_PROMPT)
+  workers = asyncio.Semaphore(delegation_config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))
+  counter = [0]
+
+  async def run_child(task):
+    counter[0] += 1
+    name = f"sub{counter[0]}"
+    max_iters = min(task.get("max_iters") or default_max_iters, default_max_iters)
+    sleep, report = make_child_sleep()
+    child = agent.make_child(name, system_prompt, task["task"], task.get("tools"), max_iters, sleep)
+    async with workers:
+      # Not counting time spent waiting for a free slot
+      start = time.monotonic()
+      try:
+        # On timeout the loop is cancelled, which also cancels its in-flight tool calls
+        result = await asyncio.wait_for(child.agent_loop(), timeout)
+        outcome = result["stopped"]
+        steps = result["steps"]
+      except asyncio.TimeoutError:
+        outcome, steps = "timeout", None
+      except Exception as e:
+        # Reported in the child's summary; its siblings carry on
+        child.log(f"❌ Sub-agent failed: {e}")
+        outcome, steps = f"failed, {type(e).__name__}: {e}", None
+      elapsed = time.monotonic() - start
+    summary = report.get("summary") or last_assistant_text(child.messages) or "No summary"
+    if len(summary) > max_summary_chars:
+      summary = summary[:max_summary_chars] + " [...]"
+    status = "done" if "summary" in report else f"stopped: {outcome}"
+    steps_str = f"{steps} steps, " if steps is not None else ""
+    return f"[{name}] {task['task'][:80]} ({status}, {steps_str}{elapsed:.1f}s)\n{summary}"
+
+  async def delegate(tasks):
+    """Run independent subtasks concurrently in sub-agents with fresh context and return a summary of each. Give each task everything it needs to know: sub-agents don't see this conversation."""
+    if not tasks:
+      raise ValueError("No tasks given")
+    if len(tasks) > max_tasks:
+      raise ValueError(f"At most {max_tasks} tasks per call, got {len(tasks)}")
+    available = agent.delegable_tools()
+    for task in tasks:
+      unknown = sorted(set(task.get("tools") or []) - available)
+      if unknown:
+        raise ValueError(f"Unknown tools for task \"{task['task'][:40]}\": {', '.join(unknown)}")
+    agent.log(f"🪢 Delegating {len(tasks)} tasks")
+    children = [asyncio.create_task(run_child(task)) for task in tasks]
+    try:
+      results = await asyncio.gather(*children)
+    finally:
+      # If the parent's call is cancelled, no child is left running unobserved
+      for child in children:
+        child.cancel()
+      await asyncio.gather(*children, return_exceptions=True)
+    return "\n\n".join(results)
+
+  delegate.parameters = {
+    "type": "object",
+    "properties": {
+      "tasks": {
+        "type": "array",
+        "minItems": 1,
+        "items": {
+          "type": "object",
+          "properties": {
+            "task": {"type": "string", "description": "Self-contained description of the subtask"},
+            "tools": {"type": "array", "items": {"type": "string"}, "description": "Tools the sub-agent may use (default: all of yours except delegate)"},
+            "max_iters": {"type": "integer", "minimum": 1, "description": f"Step budget (at most {default_max_iters})"}
+          },
+          "required": ["task"]
+        }
+      }
+    },
+    "required": ["tasks"]
+  }
+  return delegate
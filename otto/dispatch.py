@@ -0,0 +1,114 @@
+"""
+Concurrent dispatch of tool calls.
+
+Calls are fanned out with asyncio, capped per MCP server. Tools marked as
+serialized act as barriers on their server: they wait for every earlier call
+on that server to finish, and later calls on that server wait for them.
+In-process tools (built-ins and mounted tool modules) are scheduled the same
+way, as if they all belonged to one server named BUILTIN_SERVER.
+"""
+
+import asyncio
+
+DEFAULT_MAX_CONCURRENCY_PER_SERVER = 4
+BUILTIN_SERVER = "builtin"
+
+def server_for_tool(tool_name, server_names):
+  """
+  Return the MCP server a (prefixed) tool name belongs to.
+  FastMCP prefixes tools as `<server>_<tool>` when more than one server is configured.
+  """
+  matches = [name for name in server_names if tool_name.startswith(f"{name}_")]
+  if not matches:
+    return None
+  # Longest prefix wins in case server names share a prefix
+  return max(matches, key=len)
+
+class DispatchBatch:
+  """
+  Scheduling state for one iteration's tool calls.
+  Calls can be submitted one at a time (e.g. while a response is still streaming).
+  """
+  def __init__(self, dispatcher, call_fn, serial=False):
+    self.dispatcher = dispatcher
+    self.call_fn = call_fn
+    # In serial mode every call is a barrier, i.e. calls run one after another in order
+    self.serial = serial
+    # Per-server scheduling state: last barrier task and calls started since it
+    self._barriers = {}
+    self._pending = {}
+    self.tasks = []
+    # Tasks by caller-supplied key (e.g. tool call id)
+    self.started = {}
+
+  async def _run_parallel(self, call, server, barrier):
+    if barrier is not None:
+      await asyncio.gather(barrier, return_exceptions=True)
+    async with self.dispatcher._semaphore(server):
+      return await self.call_fn(call)
+
+  async def _run_serialized(self, call, waits):
+    if waits:
+      await asyncio.gather(*waits, return_exceptions=True)
+    return await self.call_fn(call)
+
+  def submit(self, tool_name, call, key=None, server=None):
+    """Schedule a call and return its task. `server` defaults to the MCP server the tool belongs to."""
+    # Serial mode chains everything through a single group
+    server = None if self.serial else (server or server_for_tool(tool_name, self.dispatcher.server_names))
+    barrier = self._barriers.get(server)
+    if self.serial or self.dispatcher.is_serialized(tool_name):
+      waits = ([barrier] if barrier is not None else []) + self._pending.get(server, [])
+      task = asyncio.create_task(self._run_serialized(call, waits))
+      self._barriers[server] = task
+      self._pending[server] = []
+    else:
+      task = asyncio.create_task(self._run_parallel(call, server, barrier))
+      self._pending.setdefault(server, []).append(task)
+    self.tasks.append(task)
+    if key is not None:
+      self.started[key] = task
+    return task
+
+  async def cancel(self):
+    """Cancel the calls that haven't finished and wait until they have stopped."""
+    for task in self.tasks:
+      task.cancel()
+    await asyncio.gather(*self.tasks, return_exceptions=True)
+
+class ToolDispatcher:
+  def __init__(self, server_names, dispatch_config=None):
+    dispatch_config = dispatch_config or {}
+    self.server_names = list(server_names)
+    self.concurrent = dispatch_config.get("concurrent", False)
+    self.max_concurrency = dispatch_config.get("max_concurrency_per_server", DEFAULT_MAX_CONCURRENCY_PER_SERVER)
+    self.parallel_safe = set(dispatch_config.get("parallel_safe", []) or [])
+    self.serialized = set(dispatch_config.get("serialized", []) or [])
+    # Tools not listed in either set fall back to this mode
+    self.default_mode = dispatch_config.get("default", "serialized")
+    self._semaphores = {}
+
+  def is_serialized(self, tool_name):
+    if tool_name in self.serialized:
+      return True
+    if tool_name in self.parallel_safe:
+      return False
+    return self.default_mode != "parallel"
+
+  def _semaphore(self, server):
+    if server not in self._semaphores:
+      self._semaphores[server] = asyncio.Semaphore(self.max_concurrency)
+    return self._semaphores[server]
+
+  def batch(self, call_fn):
+    """Start a new batch; calls run one at a time unless concurrent dispatch is enabled."""
+    return DispatchBatch(self, call_fn, serial=not self.concurrent)
+
+  async def run(self, calls, call_fn):
+    """
+    Run `call_fn(call)` for each (tool_name, call) pair.
+    Returns results in the same order as `calls`.
+    """
+    batch = self.batch(call_fn)
+    tasks = [batch.submit(tool_name, call) for tool_name, call in calls]
+    return await asyncio.gather(*tasks)
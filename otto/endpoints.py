@@ -0,0 +1,231 @@
+"""
+Resilient model endpoint pool.
+
+Wraps one AsyncOpenAI client per configured endpoint (base_url/api_key) and
+exposes the same `chat.completions.create` interface, so `run_model` works
+unchanged. Adds:
+  - health tracking: endpoints that keep failing are benched for a cooldown
+  - jittered exponential backoff on transient errors (429, 5xx, timeouts, connection errors)
+  - tunable HTTP connection pooling/keep-alive
+  - optional hedged requests: if the first endpoint exceeds a latency percentile,
+    the same request is sent to a second endpoint and the first response wins
+"""
+
+import asyncio
+import inspect
+import json
+import random
+import sys
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import openai
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 30.0
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 30.0
+DEFAULT_HEDGE_PERCENTILE = 0.95
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+# Weight of the newest sample in the per-endpoint latency moving average
+EWMA_ALPHA = 0.2
+
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# Pre-encoded bodies need the SDK's `post(content=...)`, which older openai 1.x releases lack
+RAW_BODY_SUPPORTED = "content" in inspect.signature(openai.AsyncOpenAI.post).parameters
+
+def is_transient(error):
+  if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, asyncio.TimeoutError)):
+    return True
+  if isinstance(error, openai.APIStatusError):
+    return error.status_code in TRANSIENT_STATUS_CODES
+  return False
+
+def retry_after(error):
+  """Seconds the provider asked us to wait, if it said so."""
+  response = getattr(error, "response", None)
+  if response is None:
+    return None
+  try:
+    return float(response.headers.get("retry-after"))
+  except (TypeError, ValueError):
+    return None
+
+def sdk_http_module():
+  """The HTTP package (httpx or a fork) the installed openai SDK is built on."""
+  base = openai.DefaultAsyncHttpxClient.__mro__[1]
+  return sys.modules[base.__module__.partition(".")[0]]
+
+def make_http_client(http_config=None, log=print):
+  """A pooled HTTP client tuned by `client.http`, or None to let the SDK use its default."""
+  if not http_config:
+    return None
+  try:
+    limits = sdk_http_module().Limits(
+      max_connections=http_config.get("max_connections", 100),
+      max_keepalive_connections=http_config.get("max_keepalive_connections", 20),
+      keepalive_expiry=http_config.get("keepalive_expiry", 60.0)
+    )
+  except (AttributeError, IndexError, KeyError) as e:
+    log(f"⚠ Ignoring client.http, can't tune this openai SDK's HTTP client: {e}")
+    return None
+  return openai.DefaultAsyncHttpxClient(limits=limits, http2=http_config.get("http2", False))
+
+class Endpoint:
+  def __init__(self, base_url, api_key, http_client, timeout):
+    self.base_url = base_url or "https://api.openai.com/v1"
+    # Retries are handled by the pool so they can move to another endpoint
+    self.client = openai.AsyncOpenAI(api_key=api_key, base_url=self.base_url, http_client=http_client, timeout=timeout, max_retries=0)
+    self.in_flight = 0
+    self.consecutive_failures = 0
+    self.benched_until = 0.0
+    self.latency = None
+
+  async def create(self, raw_body=None, **kwargs):
+    if raw_body is not None and not RAW_BODY_SUPPORTED:
+      # Decoding loses the encoding savings but keeps the request valid
+      kwargs = {**json.loads(raw_body), **kwargs}
+      raw_body = None
+    if raw_body is None:
+      return await self.client.chat.completions.create(**kwargs)
+    # Pre-encoded request body: skip the SDK's per-request validation and encoding
+    stream = kwargs.get("stream", False)
+    return await self.client.post(
+      "/chat/completions",
+      cast_to=ChatCompletion,
+      content=raw_body,
+      options={"headers": {"Content-Type": "application/json"}},
+      stream=stream,
+      stream_cls=openai.AsyncStream[ChatCompletionChunk] if stream else None
+    )
+
+  def is_healthy(self, now):
+    return now >= self.benched_until
+
+  def record_success(self, latency):
+    self.consecutive_failures = 0
+    self.benched_until = 0.0
+    self.latency = latency if self.latency is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+
+  def record_failure(self, failure_threshold, cooldown):
+    self.consecutive_failures += 1
+    if self.consecutive_failures >= failure_threshold:
+      self.benched_until = time.monotonic() + cooldown
+
+class EndpointPool:
+  def __init__(self, client_config, log=print):
+    # The owning agent's log, so messages carry its prefix
+    self.log = log
+    http_client = make_http_client(client_config.get("http"), log)
+    timeout = client_config.get("timeout", DEFAULT_TIMEOUT)
+    endpoints = client_config.get("endpoints") or [{"base_url": client_config.get("base_url"), "api_key": client_config.get("api_key")}]
+    self.endpoints = [
+      Endpoint(e.get("base_url"), e.get("api_key", client_config.get("api_key")), http_client, timeout)
+      for e in endpoints
+    ]
+    self.max_retries = client_config.get("max_retries", DEFAULT_MAX_RETRIES)
+    self.backoff_base = client_config.get("backoff_base", DEFAULT_BACKOFF_BASE)
+    self.backoff_max = client_config.get("backoff_max", DEFAULT_BACKOFF_MAX)
+    self.failure_threshold = client_config.get("failure_threshold", DEFAULT_FAILURE_THRESHOLD)
+    self.cooldown = client_config.get("cooldown", DEFAULT_COOLDOWN)
+    hedge_config = client_config.get("hedge", {}) or {}
+    self.hedge = hedge_config.get("enabled", False) and len(self.endpoints) > 1
+    self.hedge_percentile = hedge_config.get("percentile", DEFAULT_HEDGE_PERCENTILE)
+    self.hedge_min_samples = hedge_config.get("min_samples", DEFAULT_HEDGE_MIN_SAMPLES)
+    self.latencies = deque(maxlen=LATENCY_WINDOW)
+    self.stats = {"requests": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+    # Mimic the AsyncOpenAI surface used by run_model
+    self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+  def pick(self, exclude=()):
+    """Healthy endpoint with the fewest recent failures, then least loaded, then fastest; falls back to benched ones if all are down."""
+    now = time.monotonic()
+    candidates = [e for e in self.endpoints if e not in exclude]
+    healthy = [e for e in candidates if e.is_healthy(now)] or candidates
+    if not healthy:
+      return None
+    return min(healthy, key=lambda e: (e.consecutive_failures, e.in_flight, e.latency if e.latency is not None else 0.0))
+
+  def hedge_delay(self):
+    if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+      return None
+    ordered = sorted(self.latencies)
+    return ordered[min(int(len(ordered) * self.hedge_percentile), len(ordered) - 1)]
+
+  async def _attempt(self, endpoint, kwargs):
+    endpoint.in_flight += 1
+    start = time.monotonic()
+    try:
+      response = await endpoint.create(**kwargs)
+    except Exception as e:
+      if is_transient(e):
+        endpoint.record_failure(self.failure_threshold, self.cooldown)
+      raise
+    finally:
+      endpoint.in_flight -= 1
+    latency = time.monotonic() - start
+    endpoint.record_success(latency)
+    self.latencies.append(latency)
+    return response
+
+  async def _hedged(self, endpoint, kwargs):
+    delay = self.hedge_delay()
+    if delay is None:
+      return await self._attempt(endpoint, kwargs)
+    primary = asyncio.create_task(self._attempt(endpoint, kwargs))
+    pending = {primary}
+    try:
+      done, _ = await asyncio.wait(pending, timeout=delay)
+      if done:
+        return primary.result()
+      backup_endpoint = self.pick(exclude=(endpoint,))
+      if backup_endpoint is None:
+        return await primary
+      self.stats["hedges"] += 1
+      backup = asyncio.create_task(self._attempt(backup_endpoint, kwargs))
+      pending = {primary, backup}
+      error = None
+      while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+          if task.exception() is None:
+            if task is backup:
+              self.stats["hedge_wins"] += 1
+            return task.result()
+          error = task.exception()
+      raise error
+    finally:
+      # The losing request, or both if our caller was cancelled (e.g. a discarded sampling candidate)
+      for task in pending:
+        task.cancel()
+
+  async def create(self, **kwargs):
+    """Same as `client.chat.completions.create`, with failover, backoff and hedging."""
+    self.stats["requests"] += 1
+    attempt = 0
+    while True:
+      endpoint = self.pick()
+      try:
+        return await self._hedged(endpoint, kwargs)
+      except Exception as e:
+        if not is_transient(e) or attempt >= self.max_retries:
+          raise
+        attempt += 1
+        self.stats["retries"] += 1
+        delay = retry_after(e)
+        if delay is None:
+          # Full jitter exponential backoff
+          delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        self.log(f"⚠ Model request failed on {endpoint.base_url} ({type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+  async def close(self):
+    """Close the endpoints' HTTP clients and their keep-alive connections."""
+    for endpoint in self.endpoints:
+      await endpoint.client.close()
@@ -0,0 +1,245 @@
+"""
+Native filesystem tools, mounted in-process as a tool module:
+  tool_modules:
+  - module: otto.filesystem_tools
+    prefix: fs_
+    options: {roots: [/workspace]}
+
+A drop-in for the common tools of @modelcontextprotocol/server-filesystem
+without its node subprocess. Every path must resolve (symlinks included)
+inside one of `roots`, which are relative to the config file and default to
+its directory. Blocking I/O runs in a worker thread.
+"""
+
+import asyncio
+import difflib
+import fnmatch
+import json
+import os
+import shutil
+import stat
+from datetime import datetime, timezone
+from typing import Optional
+
+MAX_SEARCH_RESULTS = 1000
+
+def make_tools(options, base_dir="."):
+  roots = [os.path.realpath(os.path.join(base_dir, root)) for root in options.get("roots", ["."])]
+
+  def resolve(path):
+    """Absolute, symlink-free path, checked to be inside a root. Relative paths are relative to the first root."""
+    real = os.path.realpath(os.path.join(roots[0], os.path.expanduser(path)))
+    if not any(real == root or real.startswith(root + os.sep) for root in roots):
+      raise ValueError(f"Access denied - path outside allowed directories: {path}")
+    return real
+
+  def read_text(path):
+    with open(resolve(path), "r", encoding="utf8") as f:
+      return f.read()
+
+  def write_text(path, content):
+    # Replace atomically so a failed write never leaves a truncated file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf8") as f:
+      f.write(content)
+    if os.path.exists(path):
+      # The replacement keeps the original's permissions, e.g. an executable script
+      shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
+
+  def excluded(name, relative, exclude_patterns):
+    return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative, pattern) for pattern in exclude_patterns or [])
+
+  async def read_text_file(path: str, head: Optional[int] = None, tail: Optional[int] = None):
+    """
+    Read a text file.
+
+    Args:
+      path: File to read
+      head: Only return the first N lines
+      tail: Only return the last N lines
+    """
+    content = await asyncio.to_thread(read_text, path)
+    if head is not None:
+      return "\n".join(content.split("\n")[:head])
+    if tail is not None:
+      return "\n".join(content.split("\n")[-tail:]) if tail > 0 else ""
+    return content
+
+  async def read_multiple_files(paths: list[str]):
+    """
+    Read several text files at once. A file that fails doesn't stop the others.
+
+    Args:
+      paths: Files to read
+    """
+    def read_all():
+      results = []
+      for path in paths:
+        try:
+          results.append(f"{path}:\n{read_text(path)}\n")
+        except (OSError, ValueError) as e:
+          results.append(f"{path}: Error - {e}")
+      return "\n---\n".join(results)
+    return await asyncio.to_thread(read_all)
+
+  async def write_file(path: str, content: str):
+    """
+    Create a file or overwrite it with new content.
+
+    Args:
+      path: File to write
+      content: New file content
+    """
+    await asyncio.to_thread(write_text, resolve(path), content)
+    return f"Successfully wrote to {path}"
+
+  async def edit_file(path: str, edits: list[dict], dry_run: bool = False):
+    """
+    Replace text in a file and return a unified diff of the change.
+
+    Args:
+      path: File to edit
+      edits: Replacements, each {"oldText": text to find, "newText": replacement}; applied in order, first occurrence only
+      dry_run: Only return the diff, don't write
+    """
+    def apply():
+      real = resolve(path)
+      original = read_text(path)
+      content = original
+      for edit in edits:
+        old_text = edit.get("oldText", edit.get("old_text"))
+        new_text = edit.get("newText", edit.get("new_text"))
+        if old_text is None or new_text is None:
+          raise ValueError("Each edit needs oldText and newText")
+        if old_text not in content:
+          raise ValueError(f"Could not find text to replace: {old_text[:80]}")
+        content = content.replace(old_text, new_text, 1)
+      diff = "".join(difflib.unified_diff(original.splitlines(True), content.splitlines(True), path, path))
+      if not dry_run:
+        write_text(real, content)
+      return diff or "No changes"
+    return await asyncio.to_thread(apply)
+
+  async def create_directory(path: str):
+    """
+    Create a directory, including missing parents. Succeeds if it already exists.
+
+    Args:
+      path: Directory to create
+    """
+    await asyncio.to_thread(os.makedirs, resolve(path), exist_ok=True)
+    return f"Successfully created directory {path}"
+
+  async def list_directory(path: str):
+    """
+    List a directory's entries, marked [DIR] or [FILE].
+
+    Args:
+      path: Directory to list
+    """
+    def scan():
+      with os.scandir(resolve(path)) as entries:
+        return "\n".join(f"{'[DIR]' if entry.is_dir() else '[FILE]'} {entry.name}" for entry in sorted(entries, key=lambda entry: entry.name))
+    return await asyncio.to_thread(scan)
+
+  async def directory_tree(path: str, exclude_patterns: Optional[list[str]] = None):
+    """
+    Recursive tree of a directory as JSON: entries with name, type and children.
+
+    Args:
+      path: Root directory of the tree
+      exclude_patterns: Glob patterns of names or relative paths to leave out
+    """
+    def build(directory, relative):
+      tree = []
+      with os.scandir(directory) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+          entry_relative = os.path.join(relative, entry.name)
+          if excluded(entry.name, entry_relative, exclude_patterns):
+            continue
+          if entry.is_dir(follow_symlinks=False):
+            tree.append({"name": entry.name, "type": "directory", "children": build(entry.path, entry_relative)})
+          else:
+            tree.append({"name": entry.name, "type": "file"})
+      return tree
+    tree = await asyncio.to_thread(build, resolve(path), "")
+    return json.dumps(tree, indent=2)
+
+  async def move_file(source: str, destination: str):
+    """
+    Move or rename a file or directory. Fails if the destination exists.
+
+    Args:
+      source: Path to move
+      destination: New path
+    """
+    real_source = resolve(source)
+    real_destination = resolve(destination)
+    if os.path.exists(real_destination):
+      raise ValueError(f"Destination already exists: {destination}")
+    await asyncio.to_thread(os.rename, real_source, real_destination)
+    return f"Successfully moved {source} to {destination}"
+
+  async def search_files(path: str, pattern: str, exclude_patterns: Optional[list[str]] = None):
+    """
+    Recursively find files and directories whose name matches a pattern.
+
+    Args:
+      path: Directory to search
+      pattern: Glob pattern, or a case-insensitive substring if it has no wildcards
+      exclude_patterns: Glob patterns of names or relative paths to skip
+    """
+    glob = any(char in pattern for char in "*?[")
+    def search():
+      root = resolve(path)
+      matches = []
+      for directory, dirs, files in os.walk(root):
+        relative_directory = os.path.relpath(directory, root)
+        dirs[:] = [name for name in dirs if not excluded(name, os.path.normpath(os.path.join(relative_directory, name)), exclude_patterns)]
+        for name in dirs + files:
+          relative = os.path.normpath(os.path.join(relative_directory, name))
+          if name in files and excluded(name, relative, exclude_patterns):
+            continue
+          if (fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative, pattern)) if glob else pattern.lower() in name.lower():
+            matches.append(os.path.join(directory, name))
+            if len(matches) >= MAX_SEARCH_RESULTS:
+              return "\n".join(matches) + f"\n... stopped after {MAX_SEARCH_RESULTS} matches"
+      return "\n".join(matches) or "No matches found"
+    return await asyncio.to_thread(search)
+
+  async def get_file_info(path: str):
+    """
+    Size, timestamps, type and permissions of a file or directory.
+
+    Args:
+      path: File or directory to inspect
+    """
+    info = await asyncio.to_thread(os.stat, resolve(path))
+    timestamp = lambda seconds: datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+    return "\n".join([
+      f"size: {info.st_size}",
+      f"modified: {timestamp(info.st_mtime)}",
+      f"accessed: {timestamp(info.st_atime)}",
+      f"isDirectory: {stat.S_ISDIR(info.st_mode)}",
+      f"isFile: {stat.S_ISREG(info.st_mode)}",
+      f"permissions: {oct(info.st_mode & 0o777)[2:]}"
+    ])
+
+  def list_allowed_directories():
+    """List the directories these tools may access."""
+    return "Allowed directories:\n" + "\n".join(roots)
+
+  return {
+    "read_text_file": read_text_file,
+    "read_multiple_files": read_multiple_files,
+    "write_file": write_file,
+    "edit_file": edit_file,
+    "create_directory": create_directory,
+    "list_directory": list_directory,
+    "directory_tree": directory_tree,
+    "move_file": move_file,
+    "search_files": search_files,
+    "get_file_info": get_file_info,
+    "list_allowed_directories": list_allowed_directories
+  }
@@ -0,0 +1,171 @@
+"""
+Task queue for worker mode.
+
+A job is a config file path plus an initial prompt. Workers claim a job under
+a lease and keep extending it with heartbeats while the agent runs. If a
+worker dies, its lease runs out and the job becomes claimable again, up to
+`max_attempts` claims.
+
+JobQueue is the interface; SQLiteJobQueue is the default backend and needs
+nothing beyond a file every worker can reach. Other backends (e.g. Redis) can
+be registered in QUEUE_BACKENDS under their URL scheme.
+"""
+
+import json
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+DEFAULT_QUEUE_URL = "sqlite:///otto-jobs.db"
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_LEASE = 60
+DEFAULT_POLL_INTERVAL = 2
+
+class JobQueue(ABC):
+  """
+  Queue interface. Jobs are dicts with at least id, config, prompt, status,
+  attempts, worker, result and error. Methods taking a worker_id return False
+  (or None) when the worker no longer holds the job's lease.
+  """
+  @abstractmethod
+  def enqueue(self, config, prompt=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Add a pending job. Returns its id."""
+
+  @abstractmethod
+  def claim(self, worker_id, lease):
+    """Lease the oldest pending or abandoned job for `lease` seconds. Returns the job or None."""
+
+  @abstractmethod
+  def heartbeat(self, job_id, worker_id, lease):
+    """Extend the worker's lease on the job by `lease` seconds."""
+
+  @abstractmethod
+  def complete(self, job_id, worker_id, result):
+    """Mark the job done with its result."""
+
+  @abstractmethod
+  def fail(self, job_id, worker_id, error):
+    """Record a failed attempt; the job is retried unless it is out of attempts."""
+
+  @abstractmethod
+  def get(self, job_id):
+    """The job with this id, or None."""
+
+  def close(self):
+    pass
+
+class SQLiteJobQueue(JobQueue):
+  def __init__(self, path):
+    self.path = path
+    # Workers in other processes share the file; wait for their write locks instead of failing
+    self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    self.db.row_factory = sqlite3.Row
+    self.db.execute("PRAGMA journal_mode=WAL")
+    self.db.execute("""
+      CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        config TEXT NOT NULL,
+        prompt TEXT,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        worker TEXT,
+        lease_until REAL,
+        result TEXT,
+        error TEXT,
+        created REAL NOT NULL,
+        updated REAL NOT NULL
+      )
+    """)
+    self.db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+  def _row(self, row):
+    if row is None:
+      return None
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+  def enqueue(self, config, prompt=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    self.db.execute(
+      "INSERT INTO jobs (id, config, prompt, status, max_attempts, created, updated) VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+      (job_id, config, prompt, max_attempts, now, now)
+    )
+    return job_id
+
+  def claim(self, worker_id, lease):
+    now = time.time()
+    # IMMEDIATE takes the write lock up front so two workers can't claim the same row
+    self.db.execute("BEGIN IMMEDIATE")
+    try:
+      # Jobs whose lease ran out without a heartbeat were abandoned by a dead worker
+      self.db.execute(
+        "UPDATE jobs SET status = 'failed', worker = NULL, error = 'lease expired', updated = ? "
+        "WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+        (now, now)
+      )
+      row = self.db.execute(
+        "SELECT id FROM jobs WHERE status = 'pending' OR (status = 'running' AND lease_until < ?) ORDER BY created LIMIT 1",
+        (now,)
+      ).fetchone()
+      if row is None:
+        self.db.execute("COMMIT")
+        return None
+      self.db.execute(
+        "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+        (worker_id, now + lease, now, row["id"])
+      )
+      self.db.execute("COMMIT")
+    except BaseException:
+      self.db.execute("ROLLBACK")
+      raise
+    return self.get(row["id"])
+
+  def _update_owned(self, job_id, worker_id, assignments, params):
+    cursor = self.db.execute(
+      f"UPDATE jobs SET {assignments}, updated = ? WHERE id = ? AND worker = ? AND status = 'running'",
+      (*params, time.time(), job_id, worker_id)
+    )
+    return cursor.rowcount == 1
+
+  def heartbeat(self, job_id, worker_id, lease):
+    return self._update_owned(job_id, worker_id, "lease_until = ?", (time.time() + lease,))
+
+  def complete(self, job_id, worker_id, result):
+    return self._update_owned(job_id, worker_id, "status = 'done', lease_until = NULL, result = ?", (json.dumps(result),))
+
+  def fail(self, job_id, worker_id, error):
+    return self._update_owned(
+      job_id, worker_id,
+      "status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END, worker = NULL, lease_until = NULL, error = ?",
+      (error,)
+    )
+
+  def get(self, job_id):
+    return self._row(self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+  def close(self):
+    self.db.close()
+
+def open_sqlite_queue(location):
+  return SQLiteJobQueue(location or "otto-jobs.db")
+
+# URL scheme -> factory taking the rest of the URL
+QUEUE_BACKENDS = {
+  "sqlite": open_sqlite_queue
+}
+
+def open_queue(url=DEFAULT_QUEUE_URL):
+  """Open a queue from a URL like sqlite:///path/to/jobs.db. A bare path means SQLite."""
+  scheme, sep, location = url.partition("://")
+  if not sep:
+    scheme, location = "sqlite", url
+  elif scheme == "sqlite":
+    # sqlite:///relative.db -> relative.db, sqlite:////abs.db -> /abs.db
+    location = location[1:] if location.startswith("/") else location
+  if scheme not in QUEUE_BACKENDS:
+    raise ValueError(f"Unknown queue backend: {scheme} (available: {', '.join(QUEUE_BACKENDS)})")
+  return QUEUE_BACKENDS[scheme](location)
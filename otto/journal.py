@@ -0,0 +1,161 @@
+"""
+Crash-safe session journal.
+
+Every message added to the conversation and every tool result (MCP, built-in
+and mounted module tools alike) is appended to a JSONL file as it happens.
+Writes are flushed and fsynced in batches (at most every `fsync_interval`
+seconds and at the end of every iteration) rather than per record. With
+`--resume`, the session is rebuilt from the journal: tool calls whose results
+were recorded are replayed from it instead of being called again (so a
+finished `delegate` doesn't rerun its sub-agents), and only calls that never
+finished are re-run.
+
+Context compaction, loop resets and a `max_bytes` cap rewrite the journal as a
+single snapshot record, so its size (and resume time) stays bounded for long
+running loop agents.
+
+Record types:
+  {"type": "snapshot", "step": n, "messages": [...]}
+  {"type": "message", "message": {...}}
+  {"type": "tool_result", "id": tool_call_id, "content": "..."}
+  {"type": "step", "step": n}
+  {"type": "done"}
+"""
+
+import json
+import os
+import time
+
+DEFAULT_FSYNC_INTERVAL = 1.0
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+def read_records(path):
+  """Read journal records, dropping a torn last line left by a crash mid-write."""
+  records = []
+  with open(path, "r", encoding="utf8") as f:
+    for line in f:
+      if not line.endswith("\n"):
+        break
+      try:
+        records.append(json.loads(line))
+      except json.JSONDecodeError:
+        break
+  return records
+
+class Journal:
+  def __init__(self, path, journal_config=None):
+    journal_config = journal_config or {}
+    self.path = path
+    self.fsync_interval = journal_config.get("fsync_interval", DEFAULT_FSYNC_INTERVAL)
+    self.max_bytes = journal_config.get("max_bytes", DEFAULT_MAX_BYTES)
+    self.step = 0
+    self._file = None
+    self._dirty = False
+    self._last_sync = time.monotonic()
+    self.stats = {"records": 0, "syncs": 0, "snapshots": 0}
+
+  def load(self):
+    """
+    Rebuild the last session from the journal. Returns None if there is nothing
+    to resume, otherwise a dict with messages, step, tool_results (id -> content)
+    and open_turn (an assistant turn whose tools didn't all finish).
+    """
+    if not os.path.exists(self.path):
+      return None
+    messages = None
+    step = 0
+    tool_results = {}
+    open_turn = False
+    done = False
+    for record in read_records(self.path):
+      kind = record.get("type")
+      if kind == "snapshot":
+        messages = list(record["messages"])
+        step = record.get("step", 0)
+        tool_results = {}
+        open_turn = False
+        done = False
+      elif kind == "message" and messages is not None:
+        messages.append(record["message"])
+        if record["message"].get("tool_calls"):
+          open_turn = True
+      elif kind == "tool_result":
+        tool_results[record["id"]] = record["content"]
+      elif kind == "step":
+        step = record["step"]
+        open_turn = False
+      elif kind == "done":
+        done = True
+    self.step = step
+    if messages is None or done:
+      return None
+    return {"messages": messages, "step": step, "tool_results": tool_results, "open_turn": open_turn}
+
+  def open(self):
+    # Cut off a torn last line so new records don't get glued onto it
+    if os.path.exists(self.path):
+      with open(self.path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+          f.truncate(data.rfind(b"\n") + 1)
+    self._file = open(self.path, "a", encoding="utf8")
+
+  def _write(self, record):
+    if self._file is None:
+      return
+    self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+    self._dirty = True
+    self.stats["records"] += 1
+    if time.monotonic() - self._last_sync >= self.fsync_interval:
+      self.sync()
+
+  def sync(self):
+    if self._file is None or not self._dirty:
+      return
+    self._file.flush()
+    os.fsync(self._file.fileno())
+    self._dirty = False
+    self._last_sync = time.monotonic()
+    self.stats["syncs"] += 1
+
+  def message(self, message):
+    self._write({"type": "message", "message": message})
+
+  def tool_result(self, tool_call_id, content):
+    self._write({"type": "tool_result", "id": tool_call_id, "content": content})
+
+  def end_step(self, step, messages):
+    """Mark an iteration complete, sync, and compact the journal if it grew past max_bytes."""
+    self.step = step
+    self._write({"type": "step", "step": step})
+    self.sync()
+    if self._file is not None and self._file.tell() > self.max_bytes:
+      self.snapshot(messages)
+
+  def done(self):
+    self._write({"type": "done"})
+    self.sync()
+
+  def snapshot(self, messages, step=None):
+    """Atomically replace the journal with one record holding the current state."""
+    if self._file is None:
+      return
+    if step is not None:
+      self.step = step
+    self._file.close()
+    tmp_path = f"{self.path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf8") as f:
+      f.write(json.dumps({"type": "snapshot", "step": self.step, "messages": messages}, separators=(",", ":")) + "\n")
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_path, self.path)
+    self._file = open(self.path, "a", encoding="utf8")
+    self._dirty = False
+    self._last_sync = time.monotonic()
+    self.stats["snapshots"] += 1
+
+  def close(self):
+    if self._file is not None:
+      self.sync()
+      self._file.close()
+      self._file = None
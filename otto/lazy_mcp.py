@@ -0,0 +1,231 @@
+"""
+Shared, lazily started MCP servers with a persisted tool-schema cache.
+
+MCP server sessions live in a process-wide MCPServerPool, keyed by a hash of
+the server definition, so agents with identical server definitions share one
+session. Sessions are reference counted and stopped when the last agent
+releases them.
+
+With lazy startup, tool schemas are read from disk (keyed by the same hash), so
+startup does no subprocess work. A server is only spawned on the first call to
+one of its tools; at that point its live schemas are compared against the
+cache in the background to detect drift.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+
+# fastmcp and mcp are imported where they are used: reading the schema cache
+# (e.g. for `otto list-tools`) shouldn't pay for importing them
+
+def default_schema_cache_dir():
+  cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+  return os.path.join(cache_home, "otto", "tool_schemas")
+
+def resolve_schema_cache_dir(mcp_startup, base_dir="."):
+  """The schema cache directory configured in `mcp_startup`, or None for the default."""
+  schema_cache_dir = (mcp_startup or {}).get("schema_cache_dir")
+  return os.path.join(base_dir, schema_cache_dir) if schema_cache_dir else None
+
+def server_config_hash(server_config):
+  encoded = json.dumps(server_config, sort_keys=True, separators=(",", ":"))
+  return hashlib.sha256(encoded.encode("utf8")).hexdigest()[:16]
+
+def dump_tools(tools):
+  return [tool.model_dump(mode="json", exclude_none=True) for tool in tools]
+
+def schema_cache_path(schema_cache_dir, name, server_config):
+  return os.path.join(schema_cache_dir or default_schema_cache_dir(), f"{name}-{server_config_hash(server_config)}.json")
+
+def read_schema_cache(path):
+  """Cached tool schemas as plain dicts, or None if there is no cache entry."""
+  if not os.path.exists(path):
+    return None
+  with open(path, "r", encoding="utf8") as f:
+    return json.load(f)
+
+class MCPServerPool:
+  """Reference-counted MCP server sessions shared by every agent in the process."""
+  def __init__(self):
+    self._clients = {}
+    self._refcounts = {}
+    self._locks = {}
+
+  def acquire(self, server_config):
+    key = server_config_hash(server_config)
+    self._refcounts[key] = self._refcounts.get(key, 0) + 1
+    self._locks.setdefault(key, asyncio.Lock())
+    return key
+
+  async def get_client(self, key, name, server_config):
+    """
+    Return the session for `key`, starting the server on first use.
+    Concurrent callers share a single start. Returns (client, started_now).
+    """
+    async with self._locks[key]:
+      if key in self._clients:
+        return self._clients[key], False
+      from fastmcp import Client as MCPClient
+      from fastmcp.exceptions import ToolError
+      print(f"🔌 Starting MCP server: {name}")
+      client = MCPClient({"mcpServers": {name: server_config}})
+      try:
+        await client.__aenter__()
+      except Exception as e:
+        # Reported to the model as a failed call instead of ending the agent loop
+        raise ToolError(f"MCP server {name} failed to start: {e}") from e
+      self._clients[key] = client
+      return client, True
+
+  async def release(self, key):
+    self._refcounts[key] -= 1
+    if self._refcounts[key] > 0:
+      return
+    del self._refcounts[key]
+    client = self._clients.pop(key, None)
+    if client is not None:
+      try:
+        # close() also stops keep-alive stdio subprocesses, which __aexit__ leaves running
+        await client.close()
+      except Exception as e:
+        print(f"⚠ Error stopping MCP server: {e}")
+
+class LazyMCPClient:
+  """
+  Drop-in replacement for a multi-server fastmcp Client supporting
+  `async with`, `list_tools()` and `call_tool()`, backed by an MCPServerPool.
+  Tool names are prefixed `<server>_<tool>` when more than one server is configured, as fastmcp does.
+  """
+  def __init__(self, mcp_servers_config, schema_cache_dir=None, refresh=True, pool=None, lazy=True):
+    self.servers = mcp_servers_config["mcpServers"]
+    if not self.servers:
+      raise ValueError("No MCP servers defined in the config")
+    self.schema_cache_dir = schema_cache_dir or default_schema_cache_dir()
+    self.refresh = refresh
+    self.lazy = lazy
+    self.pool = pool or MCPServerPool()
+    self.prefix = len(self.servers) > 1
+    self._keys = {}
+    # Prefixed tool name -> (server name, unprefixed tool name)
+    self._tool_routes = {}
+    self._background = set()
+
+  async def __aenter__(self):
+    self._keys = {name: self.pool.acquire(server) for name, server in self.servers.items()}
+    if not self.lazy:
+      await asyncio.gather(*(self._get_client(name) for name in self.servers))
+    return self
+
+  async def __aexit__(self, *exc_info):
+    for task in self._background:
+      task.cancel()
+    for key in self._keys.values():
+      await self.pool.release(key)
+    self._keys = {}
+
+  def _cache_path(self, name):
+    return schema_cache_path(self.schema_cache_dir, name, self.servers[name])
+
+  def _read_cached_tools(self, name):
+    from mcp.types import Tool
+    path = self._cache_path(name)
+    try:
+      tools = read_schema_cache(path)
+      return [Tool.model_validate(tool) for tool in tools] if tools is not None else None
+    except (OSError, ValueError) as e:
+      print(f"⚠ Ignoring unreadable tool schema cache {path}: {e}")
+      return None
+
+  def _write_cached_tools(self, name, tools):
+    os.makedirs(self.schema_cache_dir, exist_ok=True)
+    path = self._cache_path(name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf8") as f:
+      json.dump(dump_tools(tools), f, indent=2)
+    os.replace(tmp_path, path)
+
+  def _public_name(self, server, tool_name):
+    return f"{server}_{tool_name}" if self.prefix else tool_name
+
+  async def _get_client(self, name):
+    client, started_now = await self.pool.get_client(self._keys[name], name, self.servers[name])
+    if started_now and self.lazy and self.refresh:
+      task = asyncio.create_task(self._check_drift(name, client))
+      self._background.add(task)
+      task.add_done_callback(self._background.discard)
+    return client
+
+  async def _check_drift(self, name, client):
+    try:
+      live_tools = await client.list_tools()
+    except Exception as e:
+      print(f"⚠ Could not refresh tool schemas for {name}: {e}")
+      return
+    cached_tools = self._read_cached_tools(name)
+    if cached_tools is None or dump_tools(cached_tools) != dump_tools(live_tools):
+      self._write_cached_tools(name, live_tools)
+      if cached_tools is not None:
+        print(f"⚠ Tool schemas for MCP server {name} changed; cache updated (applies on next start)")
+
+  async def update_servers(self, mcp_servers_config):
+    """
+    Switch to a new server set in place. Only servers that were removed or whose
+    definition changed are released, and only added or changed ones are started
+    (on first use when lazy). Returns (added, removed, changed) server names.
+    """
+    servers = mcp_servers_config["mcpServers"]
+    if not servers:
+      raise ValueError("No MCP servers defined in the config")
+    added = [name for name in servers if name not in self.servers]
+    removed = [name for name in self.servers if name not in servers]
+    changed = [name for name in servers if name in self.servers and server_config_hash(servers[name]) != server_config_hash(self.servers[name])]
+    # Acquire before releasing, so a definition that merely moved to another name keeps its session
+    new_keys = {name: self.pool.acquire(servers[name]) for name in added + changed}
+    if not self.lazy:
+      try:
+        # Start new servers before touching the current set, so a failed start changes nothing
+        await asyncio.gather(*(self.pool.get_client(new_keys[name], name, servers[name]) for name in new_keys))
+      except BaseException:
+        for key in new_keys.values():
+          await self.pool.release(key)
+        raise
+    old_keys = [self._keys.pop(name) for name in removed + changed if name in self._keys]
+    self.servers = servers
+    self.prefix = len(servers) > 1
+    self._keys.update(new_keys)
+    for key in old_keys:
+      await self.pool.release(key)
+    return added, removed, changed
+
+  async def list_tools(self):
+    tools = []
+    # Rebuilt on every call so routes of removed servers disappear
+    tool_routes = {}
+    for name in self.servers:
+      server_tools = self._read_cached_tools(name) if self.lazy else None
+      if server_tools is None:
+        if self.lazy:
+          # Cache miss: the server has to be started once to learn its tools
+          print(f"📋 No cached tool schemas for {name}, fetching...")
+        client = await self._get_client(name)
+        server_tools = await client.list_tools()
+        self._write_cached_tools(name, server_tools)
+      for tool in server_tools:
+        public_name = self._public_name(name, tool.name)
+        tool_routes[public_name] = (name, tool.name)
+        tools.append(tool.model_copy(update={"name": public_name}))
+    self._tool_routes = tool_routes
+    return tools
+
+  def server_for_tool(self, name):
+    route = self._tool_routes.get(name)
+    return route[0] if route else None
+
+  async def call_tool(self, name, arguments=None):
+    if name not in self._tool_routes:
+      raise ValueError(f"Unknown tool: {name}")
+    server, tool_name = self._tool_routes[name]
+    client = await self._get_client(server)
+    return await client.call_tool(tool_name, arguments)
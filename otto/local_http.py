@@ -0,0 +1,37 @@
+"""
+Just enough HTTP for the small local endpoints (webhook wakeups, metrics).
+
+A handler reads the request line, drains the headers, writes one response and
+closes the connection; request bodies are ignored. Clients get READ_TIMEOUT
+seconds to send their request, so one that never finishes can't hold a
+connection open.
+"""
+
+import asyncio
+
+# Seconds a client gets to send its request line and headers
+READ_TIMEOUT = 5
+
+NOT_FOUND = b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+
+async def read_request(reader):
+  """(method, target) of the request, or None if no well-formed request line and headers arrived in time."""
+  async def read():
+    request_line = (await reader.readline()).decode("latin1").split()
+    # Drain headers
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+      pass
+    return request_line
+  try:
+    request_line = await asyncio.wait_for(read(), READ_TIMEOUT)
+  except (asyncio.TimeoutError, ConnectionError):
+    return None
+  return (request_line[0], request_line[1]) if len(request_line) >= 2 else None
+
+async def listen(handle, host, port, name):
+  """Start a server for `handle`, or log why it couldn't listen and return None."""
+  try:
+    return await asyncio.start_server(handle, host, port)
+  except OSError as e:
+    print(f"❌ {name} could not listen on {host}:{port}: {e}")
+    return None
@@ -0,0 +1,67 @@
+"""
+Incremental request serialization.
+
+Handing the full `messages` list to the OpenAI SDK makes it re-validate and
+re-encode the whole history on every request, so client-side work per turn
+grows with the session. RequestEncoder keeps the encoded JSON of each message
+and tool schema and builds the request body by concatenating cached fragments;
+only messages that are new (or were replaced, e.g. by compaction) are encoded.
+
+Messages are treated as immutable once added: a message that changes must be
+replaced by a new dict, as compaction already does.
+"""
+
+import json
+
+def encode_json(value):
+  return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf8")
+
+class FragmentCache:
+  """Encoded JSON per object identity. Holds a reference so ids can't be reused while cached."""
+  def __init__(self):
+    self._fragments = {}
+    self.hits = 0
+    self.misses = 0
+
+  def __len__(self):
+    return len(self._fragments)
+
+  def encode(self, value):
+    entry = self._fragments.get(id(value))
+    if entry is not None and entry[0] is value:
+      self.hits += 1
+      return entry[1]
+    self.misses += 1
+    fragment = encode_json(value)
+    self._fragments[id(value)] = (value, fragment)
+    return fragment
+
+  def encode_list(self, values):
+    return b"[" + b",".join(self.encode(value) for value in values) + b"]"
+
+  def retain(self, values):
+    """Drop fragments of objects no longer in `values`."""
+    live = {id(value) for value in values}
+    self._fragments = {k: v for k, v in self._fragments.items() if k in live}
+
+class RequestEncoder:
+  def __init__(self):
+    self.messages = FragmentCache()
+    self.tools = FragmentCache()
+
+  def encode(self, messages, tools=None, **params):
+    """Build a chat completions request body. `params` are the other top-level fields (model, max_tokens, ...)."""
+    # Forget history that compaction or a reset dropped
+    if len(self.messages) > 2 * len(messages):
+      self.messages.retain(messages)
+    parts = [b'"messages":' + self.messages.encode_list(messages)]
+    if tools:
+      if len(self.tools) > 2 * len(tools):
+        self.tools.retain(tools)
+      parts.append(b'"tools":' + self.tools.encode_list(tools))
+    for key, value in params.items():
+      parts.append(encode_json(key) + b":" + encode_json(value))
+    return b"{" + b",".join(parts) + b"}"
+
+  def stats(self):
+    return {"hits": self.messages.hits + self.tools.hits, "misses": self.messages.misses + self.tools.misses}
@@ -0,0 +1,209 @@
+"""
+Model cascade routing and adaptive max_tokens.
+
+Each step goes to the cheapest model in `model_routing.models` first (the last
+tier is always `client.model`) and moves one tier up when the previous step
+showed a sign of trouble:
+  - tool_errors: at least this many of its tool results were ToolErrors
+  - no_tool_calls: the model answered without tool calls and the step is retried
+  - truncated: the completion hit its max_tokens
+  - context_fraction: the context is above this fraction of a tier's context length
+  - after_tools: it called a tool matching one of these patterns (e.g. a step
+    that is followed by a hard decision)
+An escalated step sticks for `sticky_steps` further steps, then the cascade
+starts from the bottom again. A tier whose own `context_length` is too small
+for the request is skipped.
+
+With adaptive max_tokens, each model's limit follows the `percentile` of its
+recent completion lengths times `headroom`, between `min_tokens` and the tier's
+configured max_tokens, and goes back to the ceiling after a truncation.
+Per-model request, latency and token stats are kept to tune the policy.
+"""
+
+import fnmatch
+import math
+from collections import deque
+
+DEFAULT_STICKY_STEPS = 2
+DEFAULT_WINDOW = 50
+DEFAULT_MIN_SAMPLES = 10
+DEFAULT_PERCENTILE = 0.95
+DEFAULT_HEADROOM = 1.5
+DEFAULT_MIN_TOKENS = 64
+TOOL_ERROR_PREFIX = "ToolError:"
+
+def is_tool_error(content):
+  # Tool messages wrap the result in a <tool_response> line
+  if content.startswith("<tool_response"):
+    content = content.split("\n", 1)[1] if "\n" in content else ""
+  return content.startswith(TOOL_ERROR_PREFIX)
+
+def percentile(samples, fraction):
+  ordered = sorted(samples)
+  return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+class ModelStats:
+  def __init__(self, window):
+    self.requests = 0
+    self.escalations = 0
+    self.truncated = 0
+    self.prompt_tokens = 0
+    self.completion_tokens = 0
+    self.seconds = 0.0
+    self.latencies = deque(maxlen=window)
+    self.completions = deque(maxlen=window)
+    # Next request uses the full max_tokens, set after a truncation
+    self.boost = False
+
+  def summary(self):
+    return {
+      "requests": self.requests,
+      "escalations": self.escalations,
+      "truncated": self.truncated,
+      "prompt_tokens": self.prompt_tokens,
+      "completion_tokens": self.completion_tokens,
+      "seconds": self.seconds,
+      "p50_seconds": percentile(self.latencies, 0.5) if self.latencies else None,
+      "p95_seconds": percentile(self.latencies, 0.95) if self.latencies else None
+    }
+
+class ModelRouter:
+  def __init__(self, client_config, routing_config=None):
+    routing_config = routing_config or {}
+    ceiling = client_config.get("max_tokens", 256)
+    default_tier = {"model": client_config["model"], "max_tokens": ceiling, "context_length": client_config["context_length"]}
+    self.enabled = routing_config.get("enabled", False)
+    tiers = [self.make_tier(tier, default_tier) for tier in routing_config.get("models", []) or []] if self.enabled else []
+    if not tiers or tiers[-1]["model"] != default_tier["model"]:
+      tiers.append(default_tier)
+    self.tiers = tiers
+
+    escalate = routing_config.get("escalate_on", {}) or {}
+    self.tool_errors = escalate.get("tool_errors", 1)
+    self.no_tool_calls = escalate.get("no_tool_calls", True)
+    self.escalate_truncated = escalate.get("truncated", True)
+    self.context_fraction = escalate.get("context_fraction")
+    self.after_tools = escalate.get("after_tools", []) or []
+    self.sticky_steps = routing_config.get("sticky_steps", DEFAULT_STICKY_STEPS)
+
+    adaptive = routing_config.get("adaptive_max_tokens", {}) or {}
+    self.adaptive = adaptive.get("enabled", False)
+    self.min_samples = adaptive.get("min_samples", DEFAULT_MIN_SAMPLES)
+    self.percentile = adaptive.get("percentile", DEFAULT_PERCENTILE)
+    self.headroom = adaptive.get("headroom", DEFAULT_HEADROOM)
+    self.min_tokens = adaptive.get("min_tokens", DEFAULT_MIN_TOKENS)
+    window = adaptive.get("window", DEFAULT_WINDOW)
+    self.stats = {tier["model"]: ModelStats(window) for tier in self.tiers}
+
+    self.level = 0
+    self.sticky_left = 0
+    self.last_truncated = False
+
+  @staticmethod
+  def make_tier(tier, default_tier):
+    if isinstance(tier, str):
+      tier = {"model": tier}
+    return {**default_tier, **tier}
+
+  def reset(self):
+    """Start the next session from the bottom of the cascade."""
+    self.level = 0
+    self.sticky_left = 0
+    self.last_truncated = False
+
+  def step_signals(self, messages):
+    """Reasons to escalate found in the last step: its tool calls and their results."""
+    reasons = []
+    tool_results = []
+    last_call = None
+    for message in reversed(messages):
+      if message.get("role") == "tool":
+        tool_results.append(message.get("content") or "")
+      elif message.get("tool_calls"):
+        last_call = message
+        break
+      elif message.get("role") == "assistant":
+        break
+    if last_call is None:
+      return reasons
+    errors = sum(1 for content in tool_results if is_tool_error(content))
+    if self.tool_errors and errors >= self.tool_errors:
+      reasons.append(f"{errors} tool errors")
+    used = [tool_call["function"]["name"] for tool_call in last_call["tool_calls"]]
+    hard = [name for name in used if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.after_tools)]
+    if hard:
+      reasons.append(f"after {', '.join(hard)}")
+    return reasons
+
+  def escalate(self, reasons, log):
+    if self.level >= len(self.tiers) - 1:
+      return
+    self.stats[self.tiers[self.level]["model"]].escalations += 1
+    self.level += 1
+    self.sticky_left = self.sticky_steps
+    log(f"🪜 Escalating to {self.tiers[self.level]['model']} ({'; '.join(reasons)})")
+
+  def select(self, messages, prompt_tokens, retry_count, log=print):
+    """Pick the model and max_tokens for the next request. Returns (model, max_tokens)."""
+    if len(self.tiers) > 1:
+      if retry_count == 0:
+        if self.sticky_left > 0:
+          self.sticky_left -= 1
+        else:
+          self.level = 0
+        reasons = self.step_signals(messages)
+        if self.escalate_truncated and self.last_truncated:
+          reasons.append("truncated")
+        if reasons:
+          self.escalate(reasons, log)
+      elif self.no_tool_calls:
+        self.escalate(["no tool calls"], log)
+      # Skip tiers whose context can't take the request (or is past the configured fraction)
+      while self.level < len(self.tiers) - 1:
+        tier = self.tiers[self.level]
+        limit = tier["context_length"] * (self.context_fraction or 1)
+        if prompt_tokens + (0 if self.context_fraction else self.max_tokens_for(tier)) <= limit:
+          break
+        self.escalate([f"context ~{prompt_tokens:,} tokens"], log)
+    tier = self.tiers[self.level]
+    return tier["model"], self.max_tokens_for(tier)
+
+  def max_tokens_for(self, tier):
+    ceiling = tier["max_tokens"]
+    stats = self.stats[tier["model"]]
+    if not self.adaptive or stats.boost or len(stats.completions) < self.min_samples:
+      return ceiling
+    return max(self.min_tokens, min(ceiling, math.ceil(percentile(stats.completions, self.percentile) * self.headroom)))
+
+  def record(self, model, seconds, prompt_tokens, completion_tokens, finish_reason=None):
+    """Record a finished request. It was truncated if the API stopped it for length."""
+    stats = self.stats.get(model)
+    if stats is None:
+      return
+    stats.requests += 1
+    stats.seconds += seconds
+    stats.latencies.append(seconds)
+    stats.prompt_tokens += prompt_tokens or 0
+    stats.completion_tokens += completion_tokens or 0
+    truncated = finish_reason == "length"
+    self.last_truncated = truncated
+    if truncated:
+      stats.truncated += 1
+    else:
+      stats.completions.append(completion_tokens or 0)
+    stats.boost = truncated
+
+  def report(self):
+    """One line per model that served requests."""
+    lines = []
+    for tier in self.tiers:
+      stats = self.stats[tier["model"]]
+      if not stats.requests:
+        continue
+      summary = stats.summary()
+      lines.append(
+        f"{tier['model']}: {stats.requests} requests, p50 {summary['p50_seconds']:.2f}s / p95 {summary['p95_seconds']:.2f}s, "
+        f"⬆ {stats.prompt_tokens:,} / ⬇ {stats.completion_tokens:,} tokens, max_tokens {self.max_tokens_for(tier)}, "
+        f"{stats.truncated} truncated, {stats.escalations} escalated"
+      )
+    return lines
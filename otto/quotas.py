@@ -0,0 +1,46 @@
+"""
+Per-agent quotas for model requests.
+
+QuotaClient wraps a model client and exposes the same `chat.completions.create`
+surface, limiting how many requests an agent may have in flight (for streamed
+requests, until the response starts) and how many it may start per minute.
+This keeps one busy agent from starving the others.
+"""
+
+import asyncio
+import time
+from collections import deque
+from types import SimpleNamespace
+
+WINDOW_SECONDS = 60.0
+
+class QuotaClient:
+  def __init__(self, client, quota_config=None):
+    quota_config = quota_config or {}
+    self.client = client
+    max_concurrent = quota_config.get("max_concurrent_model_requests")
+    self._semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+    self.requests_per_minute = quota_config.get("model_requests_per_minute")
+    self._started = deque()
+    self._rate_lock = asyncio.Lock()
+    self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+  async def _wait_for_rate(self):
+    if not self.requests_per_minute:
+      return
+    async with self._rate_lock:
+      while True:
+        now = time.monotonic()
+        while self._started and now - self._started[0] >= WINDOW_SECONDS:
+          self._started.popleft()
+        if len(self._started) < self.requests_per_minute:
+          self._started.append(now)
+          return
+        await asyncio.sleep(WINDOW_SECONDS - (now - self._started[0]))
+
+  async def create(self, **kwargs):
+    await self._wait_for_rate()
+    if self._semaphore is None:
+      return await self.client.chat.completions.create(**kwargs)
+    async with self._semaphore:
+      return await self.client.chat.completions.create(**kwargs)
@@ -0,0 +1,67 @@
+"""
+Hot config reload for loop mode.
+
+ConfigWatcher stat-polls the files an agent's config is built from (the config
+file, its system prompt files and MCP server definitions). Between loop cycles
+the agent checks it and applies a changed config in place (Agent.reload_config):
+  - MCP servers are diffed by definition, so only added or changed servers are
+    started and only removed or changed ones are stopped
+  - system prompts, the tool allow-list and the settings in RELOADABLE_KEYS are
+    swapped without touching running servers
+Changes to any other section are reported as needing a restart.
+"""
+
+import os
+
+from .triggers import snapshot_paths
+
+DEFAULT_POLL_INTERVAL = 2
+
+# Top-level config keys Agent.reload_config applies in place
+RELOADABLE_KEYS = {
+  "system_prompts",
+  "mcp_servers",
+  "tools",
+  "user_prompt",
+  "max_iters",
+  "max_tools_per_iter",
+  "num_retries",
+  "sleep_time",
+  "stable_prefix",
+  "sampling",
+  "model_routing",
+  "tool_dispatch",
+  "tool_cache",
+  "triggers",
+  "hot_reload"
+}
+
+def config_paths(config):
+  """Files the config is built from."""
+  base_dir = config["_config_dir"]
+  paths = [config["_config_path"]]
+  paths += [os.path.join(base_dir, filename) for filename in config.get("system_prompts") or []]
+  paths += [os.path.join(base_dir, filename) for filename in config.get("mcp_servers") or []]
+  return paths
+
+def restart_required(old_config, new_config):
+  """Top-level keys that changed but can't be applied in place."""
+  keys = (old_config.keys() | new_config.keys()) - RELOADABLE_KEYS
+  return sorted(key for key in keys if not key.startswith("_") and old_config.get(key) != new_config.get(key))
+
+class ConfigWatcher:
+  def __init__(self, config):
+    self.paths = []
+    self.baseline = {}
+    self.update(config)
+
+  def update(self, config):
+    """Watch the files of `config`, treating their current state as unchanged."""
+    self.paths = config_paths(config)
+    self.arm()
+
+  def arm(self):
+    self.baseline = snapshot_paths(self.paths)
+
+  def changed(self):
+    return snapshot_paths(self.paths) != self.baseline
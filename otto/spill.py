@@ -0,0 +1,149 @@
+"""
+Spill oversized tool results out of the context window.
+
+A tool result larger than its cap (bytes and/or estimated tokens, per tool) is
+written to a content-addressed store on disk, and only a head/tail preview plus
+a handle goes into the conversation. The `read_spill` built-in pages through a
+spilled result or greps it, so the model can still get at any part of it.
+Identical results share one file, and handles stay valid across restarts.
+"""
+
+import fnmatch
+import hashlib
+import os
+import re
+
+from .compaction import estimate_text_tokens, SPILL_MARKER
+
+DEFAULT_MAX_TOKENS = 4000
+DEFAULT_PREVIEW_CHARS = 1500
+DEFAULT_PAGE_LINES = 100
+DEFAULT_PAGE_CHARS = 8000
+# Very long lines (minified JSON, ...) are paged as several lines of this length
+LINE_WRAP = 1000
+
+def default_spill_dir():
+  cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+  return os.path.join(cache_home, "otto", "spill")
+
+def split_lines(content):
+  lines = []
+  for line in content.split("\n"):
+    if len(line) <= LINE_WRAP:
+      lines.append(line)
+    else:
+      lines.extend(line[i:i + LINE_WRAP] for i in range(0, len(line), LINE_WRAP))
+  return lines
+
+class SpillStore:
+  def __init__(self, directory=None):
+    self.directory = directory or default_spill_dir()
+
+  def _path(self, handle):
+    if not re.fullmatch(r"[0-9a-f]{16}", handle or ""):
+      raise ValueError(f"Invalid spill handle: {handle}")
+    return os.path.join(self.directory, handle[:2], f"{handle}.txt")
+
+  def put(self, content):
+    handle = hashlib.sha256(content.encode("utf8")).hexdigest()[:16]
+    path = self._path(handle)
+    if not os.path.exists(path):
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      tmp_path = f"{path}.{os.getpid()}.tmp"
+      with open(tmp_path, "w", encoding="utf8") as f:
+        f.write(content)
+      os.replace(tmp_path, path)
+    return handle
+
+  def get(self, handle):
+    path = self._path(handle)
+    if not os.path.exists(path):
+      raise ValueError(f"Unknown spill handle: {handle}")
+    with open(path, "r", encoding="utf8") as f:
+      return f.read()
+
+class ToolSpill:
+  """Applies the `tool_spill` config: decides which results are too big and replaces them with a preview."""
+  def __init__(self, spill_config=None, base_dir="."):
+    spill_config = spill_config or {}
+    self.enabled = spill_config.get("enabled", False)
+    self.max_tokens = spill_config.get("max_tokens", DEFAULT_MAX_TOKENS)
+    self.max_bytes = spill_config.get("max_bytes")
+    self.preview_chars = spill_config.get("preview_chars", DEFAULT_PREVIEW_CHARS)
+    # Tool name pattern -> {max_tokens, max_bytes} overriding the defaults
+    self.tools = spill_config.get("tools", {}) or {}
+    directory = spill_config.get("dir")
+    self.store = SpillStore(os.path.join(base_dir, directory) if directory else None)
+    self.stats = {"spilled": 0, "tokens_saved": 0}
+
+  def limits(self, tool_name):
+    for pattern, limits in self.tools.items():
+      if fnmatch.fnmatchcase(tool_name, pattern):
+        limits = limits or {}
+        return limits.get("max_tokens", self.max_tokens), limits.get("max_bytes", self.max_bytes)
+    return self.max_tokens, self.max_bytes
+
+  def is_oversized(self, tool_name, content):
+    max_tokens, max_bytes = self.limits(tool_name)
+    if max_tokens is not None and estimate_text_tokens(content) > max_tokens:
+      return True
+    return max_bytes is not None and len(content.encode("utf8")) > max_bytes
+
+  def apply(self, tool_name, content):
+    """Return `content`, or a preview with a spill handle if it is over the tool's cap."""
+    if not self.enabled or not self.is_oversized(tool_name, content):
+      return content
+    if self.preview_chars >= len(content):
+      # The preview would be the whole result
+      return content
+    handle = self.store.put(content)
+    # Clamped, and never content[-0:], which would be all of it
+    keep = max(self.preview_chars, 0) // 2
+    head = content[:keep]
+    tail = content[len(content) - keep:]
+    num_lines = len(split_lines(content))
+    preview = (
+      f"{head}\n"
+      f"{SPILL_MARKER} {len(content) - len(head) - len(tail):,} of {len(content):,} characters ({num_lines:,} lines) omitted. "
+      f"Use read_spill with handle \"{handle}\" to page through or grep the full result]\n"
+      f"{tail}"
+    )
+    self.stats["spilled"] += 1
+    self.stats["tokens_saved"] += estimate_text_tokens(content) - estimate_text_tokens(preview)
+    return preview
+
+def make_read_spill(store):
+  """Create the `read_spill` built-in bound to `store`."""
+  def read_spill(handle, offset=0, limit=DEFAULT_PAGE_LINES, pattern=None):
+    """Read a tool result that was too large for the context: page through its lines, or grep it with a regex pattern."""
+    lines = split_lines(store.get(handle))
+    if pattern:
+      regex = re.compile(pattern)
+      numbered = [(number, line) for number, line in enumerate(lines) if regex.search(line)]
+    else:
+      numbered = list(enumerate(lines))
+    page = []
+    chars = 0
+    for number, line in numbered[offset:offset + limit]:
+      if page and chars + len(line) > DEFAULT_PAGE_CHARS:
+        break
+      page.append(f"{number}: {line}")
+      chars += len(line)
+    next_offset = offset + len(page)
+    result = {"total_lines": len(lines)}
+    if pattern:
+      result["matches"] = len(numbered)
+    result["lines"] = "\n".join(page)
+    result["next_offset"] = next_offset if next_offset < len(numbered) else None
+    return result
+  read_spill.parameters = {
+    "type": "object",
+    "properties": {
+      "handle": {"type": "string", "description": "Spill handle from the truncated tool result"},
+      "offset": {"type": "integer", "description": "Line (or match, with pattern) to start from", "default": 0},
+      "limit": {"type": "integer", "description": "Maximum number of lines to return", "default": DEFAULT_PAGE_LINES},
+      "pattern": {"type": "string", "description": "Optional regex; only matching lines are returned"}
+    },
+    "required": ["handle"]
+  }
+  return read_spill
@@ -0,0 +1,34 @@
+"""
+Run many agents concurrently in one process.
+
+Each config file becomes an Agent. All agents share one MCPServerPool, so MCP
+servers with identical definitions (same command, args, env, ...) are started
+once and reference counted instead of once per agent.
+"""
+
+import asyncio
+
+from .config import load_config
+from .agent import Agent
+from .lazy_mcp import MCPServerPool
+
+async def run_agents(config_paths, resume=False):
+  """Run one agent per config file until all have finished. Returns the names of the agents that failed."""
+  pool = MCPServerPool()
+  agents = [Agent(load_config(path), pool=pool, resume=resume) for path in config_paths]
+
+  # Disambiguate agents whose config dirs share a name
+  names = [agent.name for agent in agents]
+  for index, agent in enumerate(agents):
+    if names.count(agent.name) > 1:
+      agent.name = f"{agent.name}-{index}"
+    agent.log_prefix = f"[{agent.name}] "
+
+  print(f"👥 Starting {len(agents)} agents: {', '.join(agent.name for agent in agents)}")
+  results = await asyncio.gather(*(agent.run() for agent in agents), return_exceptions=True)
+  failed = []
+  for agent, result in zip(agents, results):
+    if isinstance(result, BaseException):
+      print(f"❌ Agent {agent.name} failed: {result!r}")
+      failed.append(agent.name)
+  return failed
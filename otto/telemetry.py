@@ -0,0 +1,241 @@
+"""
+Per-iteration tracing and Prometheus-style metrics.
+
+Tracer records spans (iteration, model_request, tool_call, compaction) with
+their duration and attributes. Spans are appended to a JSONL trace file when
+`telemetry.trace_file` is set, and always feed the process-wide METRICS
+registry. A small HTTP endpoint serves the registry in the Prometheus text
+format:
+  - latency histograms per span kind (tool calls labelled by server and tool),
+    plus time to first token for streamed responses
+  - token counters (prompt, completion, cached)
+  - tool call and tool error counters, for error rates, and calls rejected
+    by argument validation
+  - model retry counter
+All series are labelled with the agent name, so agents sharing a process can be told apart.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from .local_http import NOT_FOUND, read_request, listen
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9464
+DEFAULT_METRICS_PATH = "/metrics"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+HISTOGRAM_HELP = {
+  "otto_iteration_seconds": "Wall time of one agent iteration",
+  "otto_model_request_seconds": "Model request latency",
+  "otto_model_ttft_seconds": "Time to first streamed token",
+  "otto_tool_call_seconds": "MCP tool call latency",
+  "otto_compaction_seconds": "Context compaction time"
+}
+COUNTER_HELP = {
+  "otto_tokens_total": "Model tokens by type (prompt, completion, cached)",
+  "otto_model_requests_total": "Model requests",
+  "otto_model_retries_total": "Model requests retried by the endpoint pool",
+  "otto_tool_calls_total": "MCP tool calls",
+  "otto_tool_errors_total": "MCP tool calls that failed",
+  "otto_tool_argument_errors_total": "MCP tool calls rejected by argument validation before dispatch"
+}
+
+def escape_label(value):
+  return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labels):
+  if not labels:
+    return ""
+  return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels) + "}"
+
+class Metrics:
+  def __init__(self, buckets=LATENCY_BUCKETS):
+    self.buckets = buckets
+    # name -> {sorted label tuple -> value}
+    self.counters = {}
+    # name -> {sorted label tuple -> [bucket counts..., sum, count]}
+    self.histograms = {}
+
+  def inc(self, name, labels, value=1):
+    series = self.counters.setdefault(name, {})
+    key = tuple(sorted(labels.items()))
+    series[key] = series.get(key, 0) + value
+
+  def observe(self, name, labels, value):
+    series = self.histograms.setdefault(name, {})
+    key = tuple(sorted(labels.items()))
+    state = series.get(key)
+    if state is None:
+      state = series[key] = [0] * len(self.buckets) + [0.0, 0]
+    for index, bound in enumerate(self.buckets):
+      if value <= bound:
+        state[index] += 1
+    state[-2] += value
+    state[-1] += 1
+
+  def render(self):
+    lines = []
+    for name, series in sorted(self.histograms.items()):
+      lines.append(f"# HELP {name} {HISTOGRAM_HELP.get(name, name)}")
+      lines.append(f"# TYPE {name} histogram")
+      for key, state in series.items():
+        for bound, count in zip(self.buckets, state):
+          lines.append(f"{name}_bucket{format_labels(key + (('le', bound),))} {count}")
+        lines.append(f"{name}_bucket{format_labels(key + (('le', '+Inf'),))} {state[-1]}")
+        lines.append(f"{name}_sum{format_labels(key)} {state[-2]}")
+        lines.append(f"{name}_count{format_labels(key)} {state[-1]}")
+    for name, series in sorted(self.counters.items()):
+      lines.append(f"# HELP {name} {COUNTER_HELP.get(name, name)}")
+      lines.append(f"# TYPE {name} counter")
+      for key, value in series.items():
+        lines.append(f"{name}{format_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+# Shared by every agent in the process, so one endpoint serves them all
+METRICS = Metrics()
+
+class MetricsServer:
+  def __init__(self, metrics, host=DEFAULT_METRICS_HOST, port=DEFAULT_METRICS_PORT, path=DEFAULT_METRICS_PATH):
+    self.metrics = metrics
+    self.host = host
+    self.port = port
+    self.path = path
+
+  async def handle(self, reader, writer):
+    try:
+      request = await read_request(reader)
+      if request is None:
+        return
+      method, target = request
+      if method == "GET" and target.split("?")[0] == self.path:
+        body = self.metrics.render().encode("utf8")
+        writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin1") + body)
+      else:
+        writer.write(NOT_FOUND)
+      await writer.drain()
+    finally:
+      writer.close()
+
+  async def run(self):
+    server = await listen(self.handle, self.host, self.port, "Metrics endpoint")
+    if server is None:
+      return
+    print(f"📈 Serving metrics on http://{self.host}:{self.port}{self.path}")
+    async with server:
+      await server.serve_forever()
+
+# (host, port) -> task, so agents configured with the same endpoint share one server
+_metrics_servers = {}
+
+def start_metrics_server(metrics_config):
+  host = metrics_config.get("host", DEFAULT_METRICS_HOST)
+  port = metrics_config.get("port", DEFAULT_METRICS_PORT)
+  task = _metrics_servers.get((host, port))
+  if task is None or task.done():
+    server = MetricsServer(METRICS, host, port, metrics_config.get("path", DEFAULT_METRICS_PATH))
+    _metrics_servers[(host, port)] = asyncio.create_task(server.run())
+
+class Span:
+  def __init__(self, name, parent_id, attributes):
+    self.name = name
+    self.span_id = uuid.uuid4().hex[:16]
+    self.parent_id = parent_id
+    self.attributes = attributes
+    self.start_time = time.time()
+    self.start = time.monotonic()
+    self.duration = None
+
+  def set(self, **attributes):
+    self.attributes.update(attributes)
+
+class Tracer:
+  def __init__(self, telemetry_config=None, agent_name="otto", base_dir="."):
+    telemetry_config = telemetry_config or {}
+    self.agent_name = agent_name
+    trace_file = telemetry_config.get("trace_file")
+    self.trace_path = os.path.join(base_dir, trace_file) if trace_file else None
+    self.metrics_config = telemetry_config.get("metrics", {}) or {}
+    self.metrics = METRICS
+    self.trace_id = None
+    self.iteration = None
+    self._file = None
+
+  def start(self):
+    if self.trace_path:
+      self._file = open(self.trace_path, "a", encoding="utf8")
+    if self.metrics_config.get("enabled", False):
+      start_metrics_server(self.metrics_config)
+
+  def stop(self):
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+
+  def new_trace(self):
+    """Start a new trace (one agent loop session)."""
+    self.trace_id = uuid.uuid4().hex
+
+  def start_span(self, name, **attributes):
+    parent_id = self.iteration.span_id if self.iteration is not None and name != "iteration" else None
+    span = Span(name, parent_id, attributes)
+    if name == "iteration":
+      self.iteration = span
+    return span
+
+  def end_span(self, span, error=None):
+    span.duration = time.monotonic() - span.start
+    if error is not None:
+      span.attributes["error"] = error
+    if span is self.iteration:
+      self.iteration = None
+    self.record_metrics(span)
+    if self._file is not None:
+      record = {
+        "trace_id": self.trace_id,
+        "span_id": span.span_id,
+        "parent_id": span.parent_id,
+        "agent": self.agent_name,
+        "name": span.name,
+        "start": span.start_time,
+        "duration": span.duration,
+        **span.attributes
+      }
+      # Flushed per record so agents sharing a trace file never interleave partial lines
+      self._file.write(json.dumps(record, default=str) + "\n")
+      self._file.flush()
+
+  @contextmanager
+  def span(self, name, **attributes):
+    span = self.start_span(name, **attributes)
+    try:
+      yield span
+    except BaseException as e:
+      self.end_span(span, error=type(e).__name__)
+      raise
+    self.end_span(span)
+
+  def record_metrics(self, span):
+    labels = {"agent": self.agent_name}
+    attributes = span.attributes
+    if span.name == "model_request":
+      labels["model"] = attributes.get("model", "")
+      self.metrics.inc("otto_model_requests_total", labels)
+      for token_type in ("prompt", "completion", "cached"):
+        if attributes.get(f"{token_type}_tokens"):
+          self.metrics.inc("otto_tokens_total", {**labels, "type": token_type}, attributes[f"{token_type}_tokens"])
+      if attributes.get("retries"):
+        self.metrics.inc("otto_model_retries_total", labels, attributes["retries"])
+      if attributes.get("ttft") is not None:
+        self.metrics.observe("otto_model_ttft_seconds", labels, attributes["ttft"])
+    elif span.name == "tool_call":
+      labels["server"] = attributes.get("server") or ""
+      labels["tool"] = attributes.get("tool", "")
+      self.metrics.inc("otto_tool_calls_total", labels)
+      if attributes.get("error"):
+        self.metrics.inc("otto_tool_errors_total", labels)
+    self.metrics.observe(f"otto_{span.name}_seconds", labels, span.duration)
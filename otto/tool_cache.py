@@ -0,0 +1,80 @@
+"""
+LRU/TTL cache for results of read-only MCP tools.
+
+Only tools listed in config are cached. Entries are keyed on the tool name plus
+the canonicalized JSON arguments. Calling a tool that matches an invalidation
+rule evicts every cached entry whose tool name matches the rule's patterns.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from fnmatch import fnmatch
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 300
+
+def cache_key(tool_name, arguments):
+  return tool_name + ":" + json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"))
+
+class ToolResultCache:
+  def __init__(self, cache_config=None):
+    cache_config = cache_config or {}
+    self.max_entries = cache_config.get("max_entries", DEFAULT_MAX_ENTRIES)
+    self.ttl = cache_config.get("ttl", DEFAULT_TTL)
+    self.tools = set(cache_config.get("tools", []) or [])
+    # {tool name pattern: [cached tool name patterns to evict]}
+    self.invalidate_rules = cache_config.get("invalidate", {}) or {}
+    self._entries = OrderedDict()
+    # Bumped on every invalidation so in-flight reads don't store stale results
+    self.generation = 0
+    self.hits = 0
+    self.misses = 0
+    self.invalidations = 0
+
+  def is_cacheable(self, tool_name):
+    return tool_name in self.tools
+
+  def get(self, tool_name, arguments):
+    key = cache_key(tool_name, arguments)
+    entry = self._entries.get(key)
+    if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return entry[1]
+    if entry is not None:
+      del self._entries[key]
+    self.misses += 1
+    return None
+
+  def put(self, tool_name, arguments, result, generation):
+    """Store a result, unless an invalidation happened since the call started at `generation`."""
+    if generation != self.generation:
+      return
+    key = cache_key(tool_name, arguments)
+    self._entries[key] = (time.monotonic(), result)
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.max_entries:
+      self._entries.popitem(last=False)
+
+  def invalidate_for(self, tool_name):
+    """Apply invalidation rules triggered by a call to `tool_name`."""
+    patterns = []
+    for trigger, targets in self.invalidate_rules.items():
+      if fnmatch(tool_name, trigger):
+        patterns.extend(targets or [])
+    if not patterns:
+      return
+    self.generation += 1
+    stale = [key for key in self._entries if any(fnmatch(key.split(":", 1)[0], p) for p in patterns)]
+    for key in stale:
+      del self._entries[key]
+    self.invalidations += len(stale)
+
+  def stats(self):
+    return {
+      "hits": self.hits,
+      "misses": self.misses,
+      "invalidations": self.invalidations,
+      "entries": len(self._entries)
+    }
@@ -0,0 +1,150 @@
+"""
+In-process tools: the built-ins plus Python tool modules mounted from config.
+
+A tool is a plain function, sync or async. Its JSON schema is derived from the
+signature and type hints (str, int, float, bool, None, list[...], dict[...],
+Optional/Union, Literal), parameter descriptions come from an `Args:` section
+in the docstring, and a `parameters` attribute overrides the derived schema.
+
+Modules are mounted with `tool_modules` in the config, by import name or by
+path relative to the config file:
+  tool_modules:
+  - module: otto.filesystem_tools
+    prefix: fs_
+    options: {roots: [/workspace]}
+A module provides either `make_tools(options, base_dir)` returning a dict of
+name -> function (like make_read_spill), or a `TOOLS` dict/list. Calls skip
+MCP entirely: no subprocess, no JSON-RPC round trip.
+"""
+
+import importlib
+import importlib.util
+import inspect
+import os
+import re
+import types
+import typing
+
+JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", type(None): "null"}
+
+def type_schema(annotation):
+  """JSON schema for a type hint. Unknown types map to an unconstrained schema."""
+  if annotation is inspect.Parameter.empty or annotation is typing.Any:
+    return {}
+  if annotation in JSON_TYPES:
+    return {"type": JSON_TYPES[annotation]}
+  origin = typing.get_origin(annotation)
+  type_args = typing.get_args(annotation)
+  if origin in (typing.Union, types.UnionType):
+    options = [type_schema(arg) for arg in type_args if arg is not type(None)]
+    schema = options[0] if len(options) == 1 else {"anyOf": options}
+    if type(None) in type_args:
+      return {"anyOf": [schema, {"type": "null"}]} if "type" not in schema or isinstance(schema["type"], list) else {**schema, "type": [schema["type"], "null"]}
+    return schema
+  if origin is typing.Literal:
+    return {"enum": list(type_args)}
+  if annotation is list or origin in (list, tuple, set, frozenset):
+    return {"type": "array", "items": type_schema(type_args[0])} if type_args else {"type": "array"}
+  if annotation is dict or origin is dict:
+    if len(type_args) == 2:
+      return {"type": "object", "additionalProperties": type_schema(type_args[1])}
+    return {"type": "object"}
+  return {}
+
+def docstring_parts(fn):
+  """Split a docstring into (description, {parameter: description}) using its `Args:` section."""
+  doc = inspect.getdoc(fn) or ""
+  description = re.split(r"\n\s*\n|\n(?=(?:Args|Arguments|Parameters|Returns):)", doc, maxsplit=1)[0].strip()
+  parameters = {}
+  section = re.search(r"^(?:Args|Arguments|Parameters):\s*\n((?:[ \t]+.*\n?)+)", doc, re.MULTILINE)
+  if section:
+    current = None
+    for line in section.group(1).splitlines():
+      match = re.match(r"\s*(\w+)(?:\s*\([^)]*\))?:\s*(.*)", line)
+      if match:
+        current = match.group(1)
+        parameters[current] = match.group(2).strip()
+      elif current and line.strip():
+        parameters[current] += " " + line.strip()
+  return description, parameters
+
+def function_schema(fn):
+  """The JSON schema of a tool function's arguments."""
+  explicit = getattr(fn, "parameters", None)
+  if explicit is not None:
+    return explicit
+  try:
+    hints = typing.get_type_hints(fn)
+  except Exception:
+    hints = {}
+  _, descriptions = docstring_parts(fn)
+  properties = {}
+  required = []
+  for name, parameter in inspect.signature(fn).parameters.items():
+    if parameter.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+      continue
+    schema = dict(type_schema(hints.get(name, parameter.annotation)))
+    if name in descriptions:
+      schema["description"] = descriptions[name]
+    if parameter.default is inspect.Parameter.empty:
+      required.append(name)
+    elif parameter.default is not None:
+      schema["default"] = parameter.default
+    properties[name] = schema
+  schema = {"type": "object", "properties": properties}
+  if required:
+    schema["required"] = required
+  return schema
+
+def tool_description(name, fn):
+  description, _ = docstring_parts(fn)
+  return description or f"Built-in tool: {name}"
+
+async def call_tool_function(fn, arguments):
+  """Call a sync or async tool function with keyword arguments."""
+  result = fn(**(arguments or {}))
+  if inspect.isawaitable(result):
+    result = await result
+  return result
+
+def import_tool_module(module, base_dir="."):
+  """Import a tool module by dotted name, or by path (ending in .py) relative to `base_dir`."""
+  if not module.endswith(".py"):
+    return importlib.import_module(module)
+  path = os.path.join(base_dir, module)
+  name = f"otto_tool_module_{os.path.splitext(os.path.basename(path))[0]}"
+  spec = importlib.util.spec_from_file_location(name, path)
+  if spec is None:
+    raise ImportError(f"Cannot load tool module from {path}")
+  loaded = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(loaded)
+  return loaded
+
+def load_tool_module(entry, base_dir="."):
+  """Mount one `tool_modules` entry. Returns a dict of (prefixed) tool name -> function."""
+  if isinstance(entry, str):
+    entry = {"module": entry}
+  module = import_tool_module(entry["module"], base_dir)
+  options = entry.get("options", {}) or {}
+  if hasattr(module, "make_tools"):
+    tools = module.make_tools(options, base_dir)
+  elif hasattr(module, "TOOLS"):
+    tools = module.TOOLS
+  else:
+    raise ValueError(f"Tool module {entry['module']} defines neither make_tools nor TOOLS")
+  if not isinstance(tools, dict):
+    tools = {fn.__name__: fn for fn in tools}
+  selected = entry.get("tools")
+  if selected:
+    unknown = set(selected) - set(tools)
+    if unknown:
+      raise ValueError(f"Tool module {entry['module']} has no tools named {', '.join(sorted(unknown))}")
+    tools = {name: tools[name] for name in selected}
+  prefix = entry.get("prefix", "")
+  return {f"{prefix}{name}": fn for name, fn in tools.items()}
+
+def load_tool_modules(entries, base_dir="."):
+  tools = {}
+  for entry in entries or []:
+    tools.update(load_tool_module(entry, base_dir))
+  return tools
@@ -0,0 +1,129 @@
+"""
+Per-turn tool subset selection.
+
+Instead of sending every allowed tool schema on every request, pick a relevant
+subset: tools pinned in config, tools used in recent turns, tools pulled in via
+the `search_tools` built-in, and the best lexical matches (IDF-weighted term
+overlap) against recent messages. Built-in tools are always sent.
+"""
+
+import json
+import math
+import re
+
+from .compaction import estimate_text_tokens
+
+DEFAULT_MAX_TOOLS = 12
+DEFAULT_RECENT_TURNS = 3
+DEFAULT_WINDOW = 6
+# Only the tail of long messages (e.g. big tool responses) is scored
+MAX_SCORED_CHARS = 2000
+NAME_WEIGHT = 2.0
+
+def tokenize(text):
+  return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+def tool_name(tool):
+  return tool["function"]["name"]
+
+class ToolRouter:
+  def __init__(self, tools, builtin_names, routing_config=None):
+    routing_config = routing_config or {}
+    self.max_tools = routing_config.get("max_tools", DEFAULT_MAX_TOOLS)
+    self.always = set(routing_config.get("always", []) or [])
+    self.recent_turns = routing_config.get("recent_turns", DEFAULT_RECENT_TURNS)
+    self.window = routing_config.get("window", DEFAULT_WINDOW)
+    self.builtin_names = set(builtin_names)
+    self.pinned = set()
+    self.tokens_saved = 0
+    self.set_tools(tools)
+
+  def set_tools(self, tools):
+    self.tools = tools
+    self._terms = {}
+    document_frequency = {}
+    for tool in tools:
+      name_terms = set(tokenize(tool_name(tool)))
+      description_terms = set(tokenize(tool["function"].get("description"))) - name_terms
+      self._terms[tool_name(tool)] = (name_terms, description_terms)
+      for term in name_terms | description_terms:
+        document_frequency[term] = document_frequency.get(term, 0) + 1
+    self._idf = {term: math.log(1 + len(tools) / df) for term, df in document_frequency.items()}
+    self._full_tokens = estimate_text_tokens(json.dumps(tools))
+
+  def reset(self):
+    """Forget tools pulled in by search_tools, e.g. between loop cycles."""
+    self.pinned.clear()
+
+  def score(self, name, query_terms):
+    name_terms, description_terms = self._terms[name]
+    score = 0.0
+    for term in query_terms:
+      if term in name_terms:
+        score += NAME_WEIGHT * self._idf[term]
+      elif term in description_terms:
+        score += self._idf[term]
+    return score
+
+  def search(self, query, limit=5):
+    """Return the names of the best matching tools for `query` and pin them."""
+    query_terms = set(tokenize(query))
+    scored = [(self.score(tool_name(tool), query_terms), tool_name(tool)) for tool in self.tools if tool_name(tool) not in self.builtin_names]
+    matches = [name for score, name in sorted(scored, reverse=True) if score > 0][:limit]
+    self.pinned.update(matches)
+    return matches
+
+  def recently_used(self, messages):
+    used = set()
+    turns = 0
+    for message in reversed(messages):
+      if message["role"] == "assistant" and message.get("tool_calls"):
+        used.update(tc["function"]["name"] for tc in message["tool_calls"])
+        turns += 1
+        if turns >= self.recent_turns:
+          break
+    return used
+
+  def select(self, messages):
+    """Return the tool subset to send for this request, in the original tool order."""
+    selected = set(self.builtin_names) | self.always | self.pinned | self.recently_used(messages)
+
+    query_terms = set()
+    for message in messages[-self.window:]:
+      content = message.get("content")
+      if isinstance(content, str):
+        query_terms.update(tokenize(content[-MAX_SCORED_CHARS:]))
+    candidates = [tool_name(tool) for tool in self.tools if tool_name(tool) not in selected]
+    ranked = sorted(candidates, key=lambda name: self.score(name, query_terms), reverse=True)
+    for name in ranked:
+      if len(selected - self.builtin_names) >= self.max_tools:
+        break
+      if self.score(name, query_terms) <= 0:
+        break
+      selected.add(name)
+
+    subset = [tool for tool in self.tools if tool_name(tool) in selected]
+    saved = self._full_tokens - estimate_text_tokens(json.dumps(subset))
+    self.tokens_saved += saved
+    return subset, saved
+
+def make_search_tools(router):
+  """Create the `search_tools` built-in bound to `router`."""
+  def search_tools(query):
+    """Search for additional tools by keywords and make the best matches available from the next step on."""
+    matches = router.search(query)
+    if not matches:
+      return {"tools": [], "message": "No matching tools found."}
+    descriptions = {tool_name(tool): tool["function"].get("description") for tool in router.tools}
+    return {
+      "tools": [{"name": name, "description": descriptions[name]} for name in matches],
+      "message": "These tools are now available."
+    }
+  search_tools.parameters = {
+    "type": "object",
+    "properties": {
+      "query": {"type": "string", "description": "Keywords describing the tool you need"}
+    },
+    "required": ["query"]
+  }
+  return search_tools
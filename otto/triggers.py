@@ -0,0 +1,174 @@
+"""
+Event-driven wakeups for loop mode.
+
+Instead of sleeping a fixed interval between agent runs, the loop waits until
+a trigger source fires or a fallback max interval passes:
+  - file watcher: stat-polls files/directories for changes
+  - webhook: a small local HTTP endpoint, any POST wakes the loop
+  - probe: periodically calls an MCP tool and wakes when the result hash changes
+Every source is an asyncio task, so the event loop stays free to service MCP sessions.
+Sources re-baseline when a wait begins, so changes the agent made itself don't wake it again.
+"""
+
+import asyncio
+import hashlib
+import os
+
+from .local_http import NOT_FOUND, read_request, listen
+
+DEFAULT_FILE_POLL_INTERVAL = 2
+DEFAULT_PROBE_INTERVAL = 30
+DEFAULT_WEBHOOK_HOST = "127.0.0.1"
+DEFAULT_WEBHOOK_PORT = 8765
+DEFAULT_WEBHOOK_PATH = "/wake"
+
+def snapshot_paths(paths, recursive=True):
+  """Map every watched file to its (mtime, size)."""
+  snapshot = {}
+  for path in paths:
+    if os.path.isdir(path):
+      for root, dirs, files in os.walk(path):
+        for filename in files:
+          filepath = os.path.join(root, filename)
+          try:
+            stat = os.stat(filepath)
+          except OSError:
+            continue
+          snapshot[filepath] = (stat.st_mtime_ns, stat.st_size)
+        if not recursive:
+          break
+    elif os.path.exists(path):
+      stat = os.stat(path)
+      snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+  return snapshot
+
+class Wakeup:
+  def __init__(self):
+    self.event = asyncio.Event()
+    self.reason = None
+
+  def fire(self, reason):
+    if not self.event.is_set():
+      self.reason = reason
+      self.event.set()
+
+class FileWatcher:
+  def __init__(self, wakeup, paths, poll_interval=DEFAULT_FILE_POLL_INTERVAL, recursive=True):
+    self.wakeup = wakeup
+    self.paths = paths
+    self.poll_interval = poll_interval
+    self.recursive = recursive
+    self.baseline = None
+
+  async def arm(self):
+    # Walking a large tree shouldn't block MCP sessions
+    self.baseline = await asyncio.to_thread(snapshot_paths, self.paths, self.recursive)
+
+  async def run(self):
+    while True:
+      await asyncio.sleep(self.poll_interval)
+      if self.baseline is None:
+        continue
+      current = await asyncio.to_thread(snapshot_paths, self.paths, self.recursive)
+      if current != self.baseline:
+        changed = {p for p in current.keys() | self.baseline.keys() if current.get(p) != self.baseline.get(p)}
+        self.baseline = current
+        self.wakeup.fire(f"file changed: {sorted(changed)[0]}")
+
+class WebhookServer:
+  def __init__(self, wakeup, host=DEFAULT_WEBHOOK_HOST, port=DEFAULT_WEBHOOK_PORT, path=DEFAULT_WEBHOOK_PATH):
+    self.wakeup = wakeup
+    self.host = host
+    self.port = port
+    self.path = path
+
+  async def arm(self):
+    pass
+
+  async def handle(self, reader, writer):
+    try:
+      request = await read_request(reader)
+      if request is None:
+        return
+      if request == ("POST", self.path):
+        self.wakeup.fire("webhook")
+        writer.write(b"HTTP/1.1 202 Accepted\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+      else:
+        writer.write(NOT_FOUND)
+      await writer.drain()
+    finally:
+      writer.close()
+
+  async def run(self):
+    server = await listen(self.handle, self.host, self.port, "Webhook")
+    if server is None:
+      return
+    print(f"🪝 Listening for wakeups on http://{self.host}:{self.port}{self.path}")
+    async with server:
+      await server.serve_forever()
+
+class ToolProbe:
+  def __init__(self, wakeup, call_tool, tool, arguments=None, interval=DEFAULT_PROBE_INTERVAL):
+    self.wakeup = wakeup
+    self.call_tool = call_tool
+    self.tool = tool
+    self.arguments = arguments or {}
+    self.interval = interval
+    self.last_hash = None
+    self.rebaseline = True
+
+  async def arm(self):
+    self.rebaseline = True
+
+  async def run(self):
+    while True:
+      try:
+        result = await self.call_tool(self.tool, self.arguments)
+      except Exception as e:
+        print(f"⚠ Probe {self.tool} failed: {e}")
+      else:
+        result_hash = hashlib.sha256(result.encode("utf8")).hexdigest()
+        if not self.rebaseline and result_hash != self.last_hash:
+          self.wakeup.fire(f"probe changed: {self.tool}")
+        self.last_hash = result_hash
+        self.rebaseline = False
+      await asyncio.sleep(self.interval)
+
+class Triggers:
+  """Wakeup sources for loop mode, built from the `triggers` config section."""
+  def __init__(self, triggers_config, call_tool, base_dir="."):
+    triggers_config = triggers_config or {}
+    self.wakeup = Wakeup()
+    self.sources = []
+    self._tasks = []
+
+    watch = triggers_config.get("watch")
+    if watch:
+      paths = [os.path.join(base_dir, p) for p in watch.get("paths", [])]
+      self.sources.append(FileWatcher(self.wakeup, paths, watch.get("poll_interval", DEFAULT_FILE_POLL_INTERVAL), watch.get("recursive", True)))
+
+    webhook = triggers_config.get("webhook")
+    if webhook and webhook.get("enabled", False):
+      self.sources.append(WebhookServer(self.wakeup, webhook.get("host", DEFAULT_WEBHOOK_HOST), webhook.get("port", DEFAULT_WEBHOOK_PORT), webhook.get("path", DEFAULT_WEBHOOK_PATH)))
+
+    for probe in triggers_config.get("probes", []) or []:
+      self.sources.append(ToolProbe(self.wakeup, call_tool, probe["tool"], probe.get("arguments"), probe.get("interval", DEFAULT_PROBE_INTERVAL)))
+
+  def start(self):
+    self._tasks = [asyncio.create_task(source.run()) for source in self.sources]
+
+  def stop(self):
+    for task in self._tasks:
+      task.cancel()
+    self._tasks = []
+
+  async def wait(self, max_interval):
+    """Wait for a trigger or `max_interval` seconds. Returns the wakeup reason."""
+    self.wakeup.event.clear()
+    self.wakeup.reason = None
+    await asyncio.gather(*(source.arm() for source in self.sources))
+    try:
+      await asyncio.wait_for(self.wakeup.event.wait(), timeout=max_interval)
+      return self.wakeup.reason
+    except asyncio.TimeoutError:
+      return "max interval elapsed"
@@ -1,11 +1,8 @@
-import openai
 import os
 import json
+from types import SimpleNamespace
 from .config import load_config
-
-def get_openai_client(api_key, base_url=None):
-  base_url = base_url or "https://api.openai.com/v1"
-  return openai.AsyncOpenAI(api_key=api_key, base_url=base_url)
+from .tool_registry import function_schema, tool_description
 
 def format_tool_call(name, arguments_json):
   """Format a tool call as functionname(k=v, k=v, ...)"""
@@ -39,23 +36,136 @@ def format_tools(tools):
   } for tool in tools]
 
 
-async def run_model(client, model, messages, tools, max_tokens=1024):
-  response = await client.chat.completions.create(
-    model=model,
-    messages=messages,
-    tools=tools,
-    stream=False,
-    max_tokens=max_tokens
-  )
+def get_cached_tokens(usage):
+  """Prompt tokens served from the provider's prefix cache, or None if not reported."""
+  details = getattr(usage, 'prompt_tokens_details', None)
+  if details is None:
+    return None
+  return getattr(details, 'cached_tokens', None)
+
+def request_params(model, messages, tools, max_tokens, stream, encoder=None):
+  """
+  Keyword arguments for `chat.completions.create`. With an encoder, the body is
+  pre-encoded from cached message fragments and passed as `raw_body` (see EndpointPool).
+  """
+  params = {"model": model, "max_tokens": max_tokens, "stream": stream}
+  if stream:
+    params["stream_options"] = {"include_usage": True}
+  if encoder is None:
+    return {**params, "messages": messages, "tools": tools}
+  return {"raw_body": encoder.encode(messages, tools, **params), "stream": stream}
+
+async def run_model(client, model, messages, tools, max_tokens=1024, encoder=None):
+  response = await client.chat.completions.create(**request_params(model, messages, tools, max_tokens, False, encoder))
 
   up_tokens = response.usage.prompt_tokens
   down_tokens = response.usage.completion_tokens
-  message = response.choices[0].message
+  cached_tokens = get_cached_tokens(response.usage)
+  choice = response.choices[0]
+  message = choice.message
   
   # Get reasoning_content if available (for reasoning models)
   reasoning_content = getattr(message, 'reasoning_content', None)
   
-  return message.content, message.tool_calls, reasoning_content, up_tokens, down_tokens
+  return message.content, message.tool_calls, reasoning_content, up_tokens, down_tokens, cached_tokens, getattr(choice, 'finish_reason', None)
+
+def _parses_as_json(text):
+  # An object can only parse once its closing brace has arrived
+  if not text or not text.rstrip().endswith("}"):
+    return False
+  try:
+    json.loads(text)
+    return True
+  except json.JSONDecodeError:
+    return False
+
+async def run_model_streaming(client, model, messages, tools, max_tokens=1024, on_tool_call=None, encoder=None, on_first_token=None):
+  """
+  Streaming variant of run_model with the same return values.
+  `on_tool_call(index, tool_call)` is invoked as soon as a tool call's arguments JSON is complete,
+  while the rest of the response is still being generated.
+  `on_first_token()` is invoked when the first content, reasoning or tool call delta arrives.
+  """
+  stream = await client.chat.completions.create(**request_params(model, messages, tools, max_tokens, True, encoder))
+
+  content_parts = []
+  reasoning_parts = []
+  tool_calls = {}
+  dispatched = set()
+  up_tokens = 0
+  down_tokens = 0
+  cached_tokens = None
+  finish_reason = None
+
+  def maybe_dispatch(index):
+    tool_call = tool_calls[index]
+    if index in dispatched or on_tool_call is None or not tool_call.id or not tool_call.function.name:
+      return
+    if _parses_as_json(tool_call.function.arguments):
+      dispatched.add(index)
+      on_tool_call(index, tool_call)
+
+  async for chunk in stream:
+    if chunk.usage is not None:
+      up_tokens = chunk.usage.prompt_tokens
+      down_tokens = chunk.usage.completion_tokens
+      cached_tokens = get_cached_tokens(chunk.usage)
+    if not chunk.choices:
+      continue
+    if getattr(chunk.choices[0], 'finish_reason', None):
+      finish_reason = chunk.choices[0].finish_reason
+    delta = chunk.choices[0].delta
+    if on_first_token is not None and (delta.content or getattr(delta, 'reasoning_content', None) or delta.tool_calls):
+      on_first_token()
+      on_first_token = None
+
+    if delta.content:
+      content_parts.append(delta.content)
+    reasoning = getattr(delta, 'reasoning_content', None)
+    if reasoning:
+      reasoning_parts.append(reasoning)
+
+    for tc_delta in delta.tool_calls or []:
+      if tc_delta.index not in tool_calls:
+        # A new tool call starting means all earlier ones are complete
+        for index in tool_calls:
+          maybe_dispatch(index)
+        tool_calls[tc_delta.index] = SimpleNamespace(
+          id=None,
+          type="function",
+          function=SimpleNamespace(name="", arguments="")
+        )
+      tool_call = tool_calls[tc_delta.index]
+      if tc_delta.id:
+        tool_call.id = tc_delta.id
+      if tc_delta.function is not None:
+        if tc_delta.function.name:
+          tool_call.function.name += tc_delta.function.name
+        if tc_delta.function.arguments:
+          tool_call.function.arguments += tc_delta.function.arguments
+      maybe_dispatch(tc_delta.index)
+
+  for index in tool_calls:
+    maybe_dispatch(index)
+
+  content = "".join(content_parts) if content_parts else None
+  reasoning_content = "".join(reasoning_parts) if reasoning_parts else None
+  tool_calls = [tool_calls[index] for index in sorted(tool_calls)] or None
+
+  return content, tool_calls, reasoning_content, up_tokens, down_tokens, cached_tokens, finish_reason
+
+def has_valid_tool_calls(tool_calls):
+  """True if there is at least one tool call and every call's arguments parse as JSON."""
+  if not tool_calls:
+    return False
+  for tool_call in tool_calls:
+    arguments = tool_call.function.arguments
+    if isinstance(arguments, str) and arguments.strip():
+      try:
+        json.loads(arguments)
+      except json.JSONDecodeError:
+        return False
+  return True
 
 def truncate_message(content, n=100):
   #TODO: undo
@@ -127,8 +237,9 @@ def format_builtin_tools(builtin_tools_dict):
       "type": "function",
       "function": {
         "name": tool_name,
-        "description": tool_func.__doc__ or f"Built-in tool: {tool_name}",
-        "parameters": {}
+        "description": tool_description(tool_name, tool_func),
+        # Derived from type hints unless the function sets `parameters`
+        "parameters": function_schema(tool_func)
       }
     }
     tools.append(tool_def)
@@ -0,0 +1,348 @@
+"""
+Check tool arguments against the tool's inputSchema before dispatch.
+
+Malformed arguments would otherwise only be reported by the MCP server, after
+a full round trip. Each schema is compiled once into a tree of small checker
+functions, cached per tool, and run on every call:
+  - values of the wrong type are coerced where that is lossless ("5" -> 5,
+    "true" -> True, 5 -> "5", a JSON string -> the array/object it encodes)
+  - everything else is collected into one compact error naming each offending
+    argument, so the model can fix all of them in its next turn
+Only the common JSON Schema keywords are enforced (type, properties, required,
+additionalProperties, items, enum, const, anyOf/oneOf/allOf, local $ref and
+basic bounds); anything else is left to the server.
+"""
+
+import json
+import math
+import re
+import time
+
+MAX_REPORTED_ERRORS = 5
+INTEGER_PATTERN = re.compile(r"[+-]?\d+")
+
+class ArgumentError(ValueError):
+  def __init__(self, tool_name, errors):
+    self.errors = errors
+    shown = "; ".join(errors[:MAX_REPORTED_ERRORS])
+    more = f" (+{len(errors) - MAX_REPORTED_ERRORS} more)" if len(errors) > MAX_REPORTED_ERRORS else ""
+    super().__init__(f"invalid arguments for {tool_name}: {shown}{more}")
+
+def json_type(value):
+  if value is None:
+    return "null"
+  if isinstance(value, bool):
+    return "boolean"
+  if isinstance(value, int):
+    return "integer"
+  if isinstance(value, float):
+    return "number"
+  if isinstance(value, str):
+    return "string"
+  if isinstance(value, list):
+    return "array"
+  if isinstance(value, dict):
+    return "object"
+  return type(value).__name__
+
+def is_type(value, expected):
+  actual = json_type(value)
+  return actual == expected or (expected == "number" and actual == "integer")
+
+def coerce(value, expected):
+  """Losslessly convert `value` to JSON type `expected`. Returns (ok, value)."""
+  if isinstance(value, str):
+    text = value.strip()
+    if expected == "integer" and INTEGER_PATTERN.fullmatch(text):
+      return True, int(text)
+    if expected == "number":
+      if INTEGER_PATTERN.fullmatch(text):
+        return True, int(text)
+      try:
+        number = float(text)
+      except ValueError:
+        return False, value
+      return math.isfinite(number), number
+    if expected == "boolean" and text.lower() in ("true", "false"):
+      return True, text.lower() == "true"
+    if expected in ("array", "object") and text[:1] in ("[", "{"):
+      try:
+        decoded = json.loads(text)
+      except ValueError:
+        return False, value
+      return is_type(decoded, expected), decoded
+    return False, value
+  if expected == "integer" and isinstance(value, float) and value.is_integer():
+    return True, int(value)
+  if expected == "string" and json_type(value) in ("integer", "number"):
+    return True, str(value)
+  return False, value
+
+def describe(path):
+  return path or "arguments"
+
+def resolve_ref(root, ref):
+  if not ref.startswith("#"):
+    raise ValueError(f"unsupported $ref: {ref}")
+  node = root
+  for part in ref[1:].split("/")[1:]:
+    node = node[part.replace("~1", "/").replace("~0", "~")]
+  return node
+
+class SchemaCompiler:
+  """Compiles one tool's schema; `$ref`s are compiled once and shared, so recursive schemas work."""
+  def __init__(self, root, coerce_values=True):
+    self.root = root
+    self.coerce_values = coerce_values
+    self.refs = {}
+    # Number of values coerced so far, for stats
+    self.coercions = 0
+    self._strict = None
+
+  def coerce(self, value, expected):
+    ok, value = coerce(value, expected)
+    if ok:
+      self.coercions += 1
+    return ok, value
+
+  def strict(self):
+    """A compiler for the same schema that never coerces."""
+    if not self.coerce_values:
+      return self
+    if self._strict is None:
+      self._strict = SchemaCompiler(self.root, False)
+    return self._strict
+
+  def compile(self, schema):
+    """Return check(value, path, errors) -> value (possibly coerced). Errors are appended to `errors`."""
+    if schema is True or schema == {}:
+      return lambda value, path, errors: value
+    if schema is False:
+      def reject(value, path, errors):
+        errors.append(f"{describe(path)}: not allowed")
+        return value
+      return reject
+
+    if "$ref" in schema:
+      ref = schema["$ref"]
+      if ref not in self.refs:
+        # Placeholder first, so a schema that refers to itself finds it while compiling
+        self.refs[ref] = None
+        self.refs[ref] = self.compile(resolve_ref(self.root, ref))
+      return lambda value, path, errors: self.refs[ref](value, path, errors)
+
+    checks = []
+    types = schema.get("type")
+    if types is not None:
+      checks.append(self.type_check([types] if isinstance(types, str) else list(types)))
+    for keyword in ("anyOf", "oneOf"):
+      if keyword in schema:
+        checks.append(self.any_of_check(schema[keyword]))
+    for branch in schema.get("allOf", []):
+      checks.append(self.compile(branch))
+    if "enum" in schema:
+      checks.append(self.enum_check(schema["enum"]))
+    if "const" in schema:
+      checks.append(self.enum_check([schema["const"]]))
+    if "properties" in schema or "required" in schema or "additionalProperties" in schema:
+      checks.append(self.object_check(schema))
+    if "items" in schema or "minItems" in schema or "maxItems" in schema:
+      checks.append(self.array_check(schema))
+    if any(key in schema for key in ("minLength", "maxLength", "pattern")):
+      checks.append(self.string_check(schema))
+    if any(key in schema for key in ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum")):
+      checks.append(self.number_check(schema))
+
+    if len(checks) == 1:
+      return checks[0]
+    def check(value, path, errors):
+      count = len(errors)
+      for step in checks:
+        value = step(value, path, errors)
+        # Later checks would only report the same problem again
+        if len(errors) > count:
+          break
+      return value
+    return check
+
+  def type_check(self, types):
+    expected = " or ".join(types)
+    def check(value, path, errors):
+      if any(is_type(value, t) for t in types):
+        return value
+      if self.coerce_values:
+        for t in types:
+          ok, coerced = self.coerce(value, t)
+          if ok:
+            return coerced
+      errors.append(f"{describe(path)}: expected {expected}, got {json_type(value)}")
+      return value
+    return check
+
+  def any_of_check(self, schemas):
+    expected = " or ".join(sorted({str(branch["type"]) for branch in schemas if isinstance(branch, dict) and "type" in branch})) or "one of the allowed schemas"
+    # A branch that matches as-is beats one that needs coercion
+    branches = [self.strict().compile(branch) for branch in schemas]
+    if self.coerce_values:
+      branches += [self.compile(branch) for branch in schemas]
+    def check(value, path, errors):
+      for branch in branches:
+        branch_errors = []
+        result = branch(value, path, branch_errors)
+        if not branch_errors:
+          return result
+      errors.append(f"{describe(path)}: expected {expected}, got {json_type(value)}")
+      return value
+    return check
+
+  def enum_check(self, allowed):
+    shown = ", ".join(json.dumps(option) for option in allowed[:8]) + (", ..." if len(allowed) > 8 else "")
+    def check(value, path, errors):
+      if value in allowed and all(json_type(value) == json_type(option) for option in allowed if option == value):
+        return value
+      if self.coerce_values and isinstance(value, str):
+        for option in allowed:
+          ok, coerced = self.coerce(value, json_type(option))
+          if ok and coerced == option:
+            return coerced
+      errors.append(f"{describe(path)}: must be one of [{shown}], got {json.dumps(value)[:40]}")
+      return value
+    return check
+
+  def object_check(self, schema):
+    properties = {name: self.compile(subschema) for name, subschema in (schema.get("properties") or {}).items()}
+    required = schema.get("required", [])
+    additional = schema.get("additionalProperties", True)
+    additional_check = self.compile(additional) if isinstance(additional, dict) else None
+    def check(value, path, errors):
+      if not isinstance(value, dict):
+        return value
+      missing = [name for name in required if name not in value]
+      if missing:
+        errors.append(f"{describe(path)}: missing required {', '.join(missing)}")
+      result = {}
+      unexpected = []
+      for name, item in value.items():
+        item_path = f"{path}.{name}" if path else name
+        if name in properties:
+          result[name] = properties[name](item, item_path, errors)
+        elif additional_check is not None:
+          result[name] = additional_check(item, item_path, errors)
+        else:
+          if additional is False:
+            unexpected.append(name)
+          result[name] = item
+      if unexpected:
+        allowed = ", ".join(properties) or "none"
+        errors.append(f"{describe(path)}: unexpected {', '.join(unexpected)} (allowed: {allowed})")
+      return result
+    return check
+
+  def array_check(self, schema):
+    items = schema.get("items")
+    item_check = self.compile(items) if isinstance(items, dict) else None
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+    def check(value, path, errors):
+      if not isinstance(value, list):
+        return value
+      if min_items is not None and len(value) < min_items:
+        errors.append(f"{describe(path)}: expected at least {min_items} items, got {len(value)}")
+      if max_items is not None and len(value) > max_items:
+        errors.append(f"{describe(path)}: expected at most {max_items} items, got {len(value)}")
+      if item_check is None:
+        return value
+      return [item_check(item, f"{describe(path)}[{index}]", errors) for index, item in enumerate(value)]
+    return check
+
+  def string_check(self, schema):
+    min_length = schema.get("minLength")
+    max_length = schema.get("maxLength")
+    pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+    def check(value, path, errors):
+      if not isinstance(value, str):
+        return value
+      if min_length is not None and len(value) < min_length:
+        errors.append(f"{describe(path)}: shorter than {min_length} characters")
+      if max_length is not None and len(value) > max_length:
+        errors.append(f"{describe(path)}: longer than {max_length} characters")
+      if pattern is not None and not pattern.search(value):
+        errors.append(f"{describe(path)}: does not match {pattern.pattern}")
+      return value
+    return check
+
+  def number_check(self, schema):
+    bounds = [
+      (schema.get("minimum"), lambda value, bound: value >= bound, ">="),
+      (schema.get("maximum"), lambda value, bound: value <= bound, "<="),
+      (schema.get("exclusiveMinimum"), lambda value, bound: value > bound, ">"),
+      (schema.get("exclusiveMaximum"), lambda value, bound: value < bound, "<")
+    ]
+    bounds = [bound for bound in bounds if isinstance(bound[0], (int, float)) and not isinstance(bound[0], bool)]
+    def check(value, path, errors):
+      if json_type(value) not in ("integer", "number"):
+        return value
+      for bound, test, symbol in bounds:
+        if not test(value, bound):
+          errors.append(f"{describe(path)}: must be {symbol} {bound}, got {value}")
+      return value
+    return check
+
+class ToolArgumentValidator:
+  """Validators compiled from each tool's inputSchema, built on first use and cached per tool."""
+  def __init__(self, validation_config=None):
+    validation_config = validation_config or {}
+    self.enabled = validation_config.get("enabled", True)
+    self.coerce = validation_config.get("coerce", True)
+    self.schemas = {}
+    # Tool name -> (schema, compiler, compiled check); recompiled when the tool's schema object changes
+    self._validators = {}
+    self.stats = {"checked": 0, "rejected": 0, "coerced": 0, "seconds": 0.0}
+
+  def set_tools(self, tools):
+    """Take schemas from formatted (OpenAI style) tool definitions."""
+    self.schemas = {tool["function"]["name"]: tool["function"].get("parameters") for tool in tools}
+
+  def _validator(self, name):
+    schema = self.schemas.get(name)
+    if not isinstance(schema, dict):
+      return None, None
+    cached = self._validators.get(name)
+    if cached is None or cached[0] is not schema:
+      compiler = SchemaCompiler(schema, self.coerce)
+      try:
+        check = compiler.compile(schema)
+      except (ValueError, KeyError, TypeError, re.error) as e:
+        # A schema we can't compile is the server's to enforce
+        print(f"⚠ Not validating arguments of {name}: {e}")
+        check = None
+      cached = self._validators[name] = (schema, compiler, check)
+    return cached[1], cached[2]
+
+  def validate(self, name, arguments):
+    """Return the (possibly coerced) arguments, or raise ArgumentError."""
+    if not self.enabled:
+      return arguments
+    start = time.perf_counter()
+    try:
+      compiler, check = self._validator(name)
+      if check is None:
+        return arguments
+      self.stats["checked"] += 1
+      coercions = compiler.coercions
+      errors = []
+      if arguments is None:
+        arguments = {}
+      if not isinstance(arguments, dict):
+        errors.append(f"arguments: expected object, got {json_type(arguments)}")
+        result = arguments
+      else:
+        result = check(arguments, "", errors)
+      if errors:
+        self.stats["rejected"] += 1
+        raise ArgumentError(name, errors)
+      if compiler.coercions > coercions:
+        self.stats["coerced"] += 1
+      return result
+    finally:
+      self.stats["seconds"] += time.perf_counter() - start
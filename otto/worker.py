@@ -0,0 +1,130 @@
+"""
+Worker mode: pull jobs from a JobQueue and run each as a one-shot agent.
+
+A worker process runs `concurrency` job slots on one event loop; they share
+one MCPServerPool like supervised agents do. Start as many worker processes
+(on as many machines) as the queue backend can reach to scale out.
+
+While a job runs its lease is renewed every lease/3 seconds. If a renewal
+fails, another worker has taken the job over (ours was presumed dead), so the
+local run is cancelled and its result discarded.
+"""
+
+import asyncio
+import os
+import re
+import socket
+import threading
+
+from .config import load_config
+from .agent import Agent
+from .lazy_mcp import MCPServerPool
+from .jobs import DEFAULT_LEASE, DEFAULT_POLL_INTERVAL
+
+class LeaseLost(Exception):
+  pass
+
+def default_worker_id():
+  return f"{socket.gethostname()}-{os.getpid()}"
+
+def job_agent_name(slot_id, job_id):
+  """Agent name for a job, safe to use in file names (slot ids contain a slash)."""
+  return re.sub(r"[^\w.-]", "-", f"{slot_id}-{job_id[:8]}")
+
+def job_result(agent, loop_result):
+  """What gets written back to the queue for a finished job."""
+  final = None
+  for message in reversed(agent.messages):
+    if message["role"] == "assistant" and message.get("content"):
+      final = message["content"]
+      break
+  return {**(loop_result or {}), "final": final, "messages": agent.messages}
+
+class Worker:
+  def __init__(self, queue, worker_id=None, concurrency=1, lease=DEFAULT_LEASE, poll_interval=DEFAULT_POLL_INTERVAL, once=False):
+    self.queue = queue
+    self.worker_id = worker_id or default_worker_id()
+    self.concurrency = concurrency
+    self.lease = lease
+    self.poll_interval = poll_interval
+    # Exit once the queue is empty instead of polling forever
+    self.once = once
+    self.pool = MCPServerPool()
+    # Queue backends are synchronous; calls run in a thread, one at a time per process
+    self._queue_lock = threading.Lock()
+    self.stats = {"done": 0, "failed": 0, "lost": 0}
+
+  async def _queue_call(self, method, *args):
+    def call():
+      with self._queue_lock:
+        return getattr(self.queue, method)(*args)
+    return await asyncio.to_thread(call)
+
+  async def _heartbeat(self, job_id, slot_id):
+    while True:
+      await asyncio.sleep(self.lease / 3)
+      if not await self._queue_call("heartbeat", job_id, slot_id, self.lease):
+        raise LeaseLost(job_id)
+
+  async def run_job(self, job, slot_id):
+    config = load_config(job["config"])
+    config["loop"] = False
+    # A failed attempt is retried from the start by the queue, never resumed, and
+    # concurrent jobs sharing a config would write the same journal
+    config["journal"] = {"enabled": False}
+    if job["prompt"]:
+      config["user_prompt"] = job["prompt"]
+    agent = Agent(config, name=job_agent_name(slot_id, job["id"]), pool=self.pool)
+    agent.log_prefix = f"[{agent.name}] "
+
+    run = asyncio.create_task(agent.run())
+    heartbeat = asyncio.create_task(self._heartbeat(job["id"], slot_id))
+    try:
+      await asyncio.wait({run, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+      heartbeat.cancel()
+      run.cancel()
+      # Let the agent release its MCP servers before the slot moves on
+      await asyncio.gather(run, heartbeat, return_exceptions=True)
+      # Every job has its own model client; don't leave its keep-alive connections open
+      await agent.endpoint_pool.close()
+    if run.cancelled():
+      # The heartbeat ended first: the lease was lost or the queue is unreachable
+      raise heartbeat.exception()
+    return job_result(agent, run.result())
+
+  async def slot(self, index):
+    # Leases are held per slot so a slot can't heartbeat another slot's job
+    slot_id = f"{self.worker_id}/{index}"
+    while True:
+      job = await self._queue_call("claim", slot_id, self.lease)
+      if job is None:
+        if self.once:
+          return
+        await asyncio.sleep(self.poll_interval)
+        continue
+
+      print(f"📥 [{slot_id}] Claimed job {job['id']} (attempt {job['attempts']}/{job['max_attempts']})")
+      try:
+        result = await self.run_job(job, slot_id)
+      except LeaseLost:
+        self.stats["lost"] += 1
+        print(f"⚠ [{slot_id}] Lost lease on job {job['id']}; abandoning it")
+        continue
+      except Exception as e:
+        self.stats["failed"] += 1
+        print(f"❌ [{slot_id}] Job {job['id']} failed: {e!r}")
+        await self._queue_call("fail", job["id"], slot_id, repr(e))
+        continue
+
+      if await self._queue_call("complete", job["id"], slot_id, result):
+        self.stats["done"] += 1
+        print(f"✅ [{slot_id}] Job {job['id']} done ({result.get('stopped')}, {result.get('steps')} steps)")
+      else:
+        self.stats["lost"] += 1
+        print(f"⚠ [{slot_id}] Job {job['id']} finished after its lease was taken over; result discarded")
+
+  async def run(self):
+    print(f"👷 Worker {self.worker_id} starting {self.concurrency} slot(s)")
+    await asyncio.gather(*(self.slot(index) for index in range(self.concurrency)))
+    print(f"👷 Worker {self.worker_id} finished: {self.stats['done']} done, {self.stats['failed']} failed, {self.stats['lost']} lost")
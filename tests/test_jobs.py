@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from otto.jobs import SQLiteJobQueue, open_queue
+from otto.worker import Worker, job_agent_name
+
+@pytest.fixture
+def queue(tmp_path):
+  queue = SQLiteJobQueue(str(tmp_path / "jobs.db"))
+  yield queue
+  queue.close()
+
+def test_claim_leases_oldest_pending_job(queue):
+  first = queue.enqueue("a.yaml", "first")
+  queue.enqueue("b.yaml", "second")
+  job = queue.claim("w1", 60)
+  assert job["id"] == first
+  assert job["status"] == "running"
+  assert job["worker"] == "w1"
+  assert job["attempts"] == 1
+  assert queue.claim("w2", 60)["config"] == "b.yaml"
+  # Both jobs are leased
+  assert queue.claim("w3", 60) is None
+
+def test_only_the_lease_holder_can_heartbeat_and_complete(queue):
+  job_id = queue.enqueue("a.yaml")
+  queue.claim("w1", 60)
+  assert queue.heartbeat(job_id, "w1", 60)
+  assert not queue.heartbeat(job_id, "w2", 60)
+  assert not queue.complete(job_id, "w2", {"steps": 1})
+  assert queue.complete(job_id, "w1", {"steps": 1})
+  job = queue.get(job_id)
+  assert job["status"] == "done"
+  assert job["result"] == {"steps": 1}
+  # A finished job can't be heartbeated back to life
+  assert not queue.heartbeat(job_id, "w1", 60)
+
+def test_expired_lease_is_reclaimed_by_another_worker(queue):
+  job_id = queue.enqueue("a.yaml")
+  # A negative lease has already run out, as if w1 died without heartbeating
+  queue.claim("w1", -1)
+  job = queue.claim("w2", 60)
+  assert job["id"] == job_id
+  assert job["worker"] == "w2"
+  assert job["attempts"] == 2
+  # The presumed-dead worker lost the job and its result is discarded
+  assert not queue.heartbeat(job_id, "w1", 60)
+  assert not queue.complete(job_id, "w1", {})
+  assert queue.complete(job_id, "w2", {})
+
+def test_expired_lease_on_last_attempt_fails_the_job(queue):
+  job_id = queue.enqueue("a.yaml", max_attempts=1)
+  queue.claim("w1", -1)
+  assert queue.claim("w2", 60) is None
+  job = queue.get(job_id)
+  assert job["status"] == "failed"
+  assert job["error"] == "lease expired"
+
+def test_fail_requeues_until_out_of_attempts(queue):
+  job_id = queue.enqueue("a.yaml", max_attempts=2)
+  queue.claim("w1", 60)
+  assert queue.fail(job_id, "w1", "boom")
+  job = queue.get(job_id)
+  assert job["status"] == "pending"
+  assert job["worker"] is None
+  queue.claim("w1", 60)
+  assert queue.fail(job_id, "w1", "boom again")
+  job = queue.get(job_id)
+  assert job["status"] == "failed"
+  assert job["error"] == "boom again"
+  assert queue.claim("w1", 60) is None
+
+def test_fail_by_a_worker_without_the_lease_is_ignored(queue):
+  job_id = queue.enqueue("a.yaml")
+  queue.claim("w1", 60)
+  assert not queue.fail(job_id, "w2", "boom")
+  assert queue.get(job_id)["status"] == "running"
+
+def test_open_queue_urls(tmp_path):
+  path = tmp_path / "jobs.db"
+  queue = open_queue(f"sqlite:///{path}")
+  assert queue.path == str(path)
+  queue.close()
+  with pytest.raises(ValueError):
+    open_queue("redis://localhost")
+
+def test_job_agent_name_is_safe_in_file_names():
+  name = job_agent_name("host-123/0", "0123456789abcdef")
+  assert name == "host-123-0-01234567"
+  assert "/" not in name
+
+def test_worker_records_failed_attempts(queue):
+  job_id = queue.enqueue("a.yaml", max_attempts=2)
+  worker = Worker(queue, "w", once=True)
+  async def run_job(job, slot_id):
+    raise RuntimeError("agent crashed")
+  worker.run_job = run_job
+  asyncio.run(worker.run())
+  job = queue.get(job_id)
+  assert job["status"] == "failed"
+  assert job["attempts"] == 2
+  assert "agent crashed" in job["error"]
+  assert worker.stats == {"done": 0, "failed": 2, "lost": 0}
+
+def test_worker_completes_jobs(queue):
+  job_id = queue.enqueue("a.yaml")
+  worker = Worker(queue, "w", once=True)
+  async def run_job(job, slot_id):
+    return {"stopped": "sleep", "steps": 1}
+  worker.run_job = run_job
+  asyncio.run(worker.run())
+  assert queue.get(job_id)["status"] == "done"
+  assert worker.stats["done"] == 1
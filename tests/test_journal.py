@@ -0,0 +1,161 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from mcp.types import Tool
+
+from otto.agent import Agent
+from otto.config import load_config
+from otto.journal import Journal
+
+SYSTEM = {"role": "system", "content": "You are a test."}
+TASK = {"role": "user", "content": "Go."}
+
+def tool_call(call_id, name, arguments):
+  return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+def tear_off(path, text):
+  """Append the first half of a record, as a crash in the middle of a write leaves it."""
+  with open(path, "a", encoding="utf8") as f:
+    f.write(text[:len(text) // 2])
+
+def test_missing_journal_has_nothing_to_resume(tmp_path):
+  assert Journal(str(tmp_path / "j.jsonl")).load() is None
+
+def test_snapshot_then_appended_records(tmp_path):
+  journal = Journal(str(tmp_path / "j.jsonl"))
+  journal.open()
+  journal.tool_result("old", "dropped by the snapshot")
+  journal.snapshot([SYSTEM, TASK], step=3)
+  assistant = {"role": "assistant", "content": "", "tool_calls": [tool_call("c1", "lookup", {})]}
+  journal.message(assistant)
+  journal.tool_result("c1", "result")
+  journal.close()
+
+  state = Journal(journal.path).load()
+  assert state["messages"] == [SYSTEM, TASK, assistant]
+  assert state["step"] == 3
+  assert state["tool_results"] == {"c1": "result"}
+  assert state["open_turn"]
+
+def test_finished_step_closes_the_turn(tmp_path):
+  journal = Journal(str(tmp_path / "j.jsonl"))
+  journal.open()
+  journal.snapshot([SYSTEM, TASK], step=0)
+  journal.message({"role": "assistant", "content": "", "tool_calls": [tool_call("c1", "lookup", {})]})
+  journal.message({"role": "tool", "tool_call_id": "c1", "content": "result"})
+  journal.end_step(1, [])
+  journal.close()
+  state = Journal(journal.path).load()
+  assert state["step"] == 1
+  assert not state["open_turn"]
+
+def test_done_session_is_not_resumed(tmp_path):
+  journal = Journal(str(tmp_path / "j.jsonl"))
+  journal.open()
+  journal.snapshot([SYSTEM, TASK], step=0)
+  journal.done()
+  journal.close()
+  assert Journal(journal.path).load() is None
+
+def test_torn_last_record_is_dropped_and_cut_off(tmp_path):
+  path = str(tmp_path / "j.jsonl")
+  journal = Journal(path)
+  journal.open()
+  journal.snapshot([SYSTEM, TASK], step=0)
+  journal.tool_result("c1", "complete")
+  journal.close()
+  tear_off(path, json.dumps({"type": "tool_result", "id": "c2", "content": "torn"}) + "\n")
+
+  assert Journal(path).load()["tool_results"] == {"c1": "complete"}
+  # Reopening cuts the torn line, so the next record starts on a line of its own
+  journal = Journal(path)
+  journal.open()
+  journal.tool_result("c3", "after the crash")
+  journal.close()
+  assert Journal(path).load()["tool_results"] == {"c1": "complete", "c3": "after the crash"}
+
+@pytest.fixture
+def config_path(tmp_path):
+  (tmp_path / "prompt.md").write_text("You are a test.")
+  (tmp_path / "servers.json").write_text(json.dumps({"mcpServers": {"fake": {"command": "false"}}}))
+  (tmp_path / "note_tools.py").write_text(
+    "CALLS = []\n"
+    "def note(text: str):\n"
+    "  \"\"\"\n  Take a note.\n\n  Args:\n    text: The note\n  \"\"\"\n"
+    "  CALLS.append(text)\n"
+    "  return 'noted'\n"
+    "TOOLS = [note]\n"
+  )
+  (tmp_path / "otto.yaml").write_text(
+    "mcp_servers: [servers.json]\n"
+    "system_prompts: [prompt.md]\n"
+    "tools: [lookup]\n"
+    "tool_modules: [note_tools.py]\n"
+    "max_iters: 5\n"
+    "max_tools_per_iter: 5\n"
+    "journal: {enabled: true}\n"
+    "client: {api_key: x, model: m, context_length: 1000}\n"
+  )
+  return str(tmp_path / "otto.yaml")
+
+def make_resumed_agent(config_path):
+  agent = Agent(load_config(config_path), name="test", resume=True)
+  agent.log = lambda text: None
+  agent.setup_tools([Tool(name="lookup", description="Look up a key", inputSchema={"type": "object", "properties": {"key": {"type": "string"}}})])
+  calls = []
+  async def call_tool(name, arguments):
+    calls.append(arguments["key"])
+    return SimpleNamespace(content=[SimpleNamespace(text=f"live {arguments['key']}")])
+  agent.mcp_client.call_tool = call_tool
+  agent.journal = Journal(str(agent.config_dir) + "/test.journal.jsonl")
+  return agent, calls
+
+def test_resume_replays_recorded_results_and_reruns_the_rest(config_path):
+  agent, mcp_calls = make_resumed_agent(config_path)
+  assistant = {"role": "assistant", "content": "", "tool_calls": [
+    tool_call("c1", "lookup", {"key": "a"}),
+    tool_call("c2", "lookup", {"key": "b"}),
+    tool_call("c3", "note", {"text": "x"}),
+    tool_call("c4", "note", {"text": "y"})
+  ]}
+  # The crashed session: c1 and c3 finished, c2's result was torn mid-write, c4 never ran
+  crashed = Journal(agent.journal.path)
+  crashed.open()
+  crashed.snapshot([SYSTEM, TASK], step=2)
+  crashed.message(assistant)
+  crashed.tool_result("c1", "recorded a")
+  crashed.tool_result("c3", "recorded note")
+  crashed.close()
+  tear_off(crashed.path, json.dumps({"type": "tool_result", "id": "c2", "content": "recorded b"}) + "\n")
+
+  steps, stopped = asyncio.run(agent.resume_session())
+  agent.journal.close()
+
+  assert (steps, stopped) == (3, None)
+  # Only the calls without a complete record run again, MCP and in-process tools alike
+  assert mcp_calls == ["b"]
+  assert agent.builtin_tools["note"].__globals__["CALLS"] == ["y"]
+  results = {message["tool_call_id"]: message["content"] for message in agent.messages if message["role"] == "tool"}
+  assert "recorded a" in results["c1"]
+  assert "live b" in results["c2"]
+  assert "recorded note" in results["c3"]
+  assert "noted" in results["c4"]
+  # The finished turn is journaled: a second crash now resumes after it
+  state = Journal(agent.journal.path).load()
+  assert state["step"] == 3
+  assert not state["open_turn"]
+  assert state["messages"] == agent.messages
+
+def test_resume_without_open_turn_runs_nothing(config_path):
+  agent, mcp_calls = make_resumed_agent(config_path)
+  crashed = Journal(agent.journal.path)
+  crashed.open()
+  crashed.snapshot([SYSTEM, TASK], step=1)
+  crashed.close()
+  steps, stopped = asyncio.run(agent.resume_session())
+  agent.journal.close()
+  assert (steps, stopped) == (1, None)
+  assert agent.messages == [SYSTEM, TASK]
+  assert mcp_calls == []
@@ -0,0 +1,63 @@
+import asyncio
+import socket
+
+from otto import local_http
+from otto.telemetry import Metrics, MetricsServer
+from otto.triggers import Wakeup, WebhookServer
+
+def free_port():
+  with socket.socket() as sock:
+    sock.bind(("127.0.0.1", 0))
+    return sock.getsockname()[1]
+
+async def request(port, data):
+  reader, writer = await asyncio.open_connection("127.0.0.1", port)
+  writer.write(data)
+  await writer.drain()
+  response = await asyncio.wait_for(reader.read(), 2)
+  writer.close()
+  return response
+
+async def serving(server, coroutine):
+  task = asyncio.create_task(server.run())
+  await asyncio.sleep(0.1)
+  try:
+    return await coroutine
+  finally:
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+def test_webhook_wakes_on_post():
+  wakeup = Wakeup()
+  server = WebhookServer(wakeup, port=free_port())
+  response = asyncio.run(serving(server, request(server.port, b"POST /wake HTTP/1.1\r\nHost: x\r\n\r\n")))
+  assert response.startswith(b"HTTP/1.1 202")
+  assert wakeup.reason == "webhook"
+
+def test_metrics_served_on_get():
+  metrics = Metrics()
+  metrics.inc("otto_tool_calls_total", {"agent": "a"})
+  server = MetricsServer(metrics, port=free_port())
+  response = asyncio.run(serving(server, request(server.port, b"GET /metrics HTTP/1.1\r\n\r\n")))
+  assert response.startswith(b"HTTP/1.1 200")
+  assert b'otto_tool_calls_total{agent="a"} 1' in response
+
+def test_unfinished_request_is_dropped(monkeypatch):
+  monkeypatch.setattr(local_http, "READ_TIMEOUT", 0.1)
+  wakeup = Wakeup()
+  server = WebhookServer(wakeup, port=free_port())
+  # Headers never end: the server closes the connection without a response
+  response = asyncio.run(serving(server, request(server.port, b"POST /wake HTTP/1.1\r\nHost: x\r\n")))
+  assert response == b""
+  assert wakeup.reason is None
+
+def test_busy_port_is_logged(capsys):
+  with socket.socket() as busy:
+    busy.bind(("127.0.0.1", 0))
+    busy.listen()
+    port = busy.getsockname()[1]
+    asyncio.run(MetricsServer(Metrics(), port=port).run())
+    asyncio.run(WebhookServer(Wakeup(), port=port).run())
+  output = capsys.readouterr().out
+  assert f"❌ Metrics endpoint could not listen on 127.0.0.1:{port}" in output
+  assert f"❌ Webhook could not listen on 127.0.0.1:{port}" in output